@@ -0,0 +1,104 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
+
+from core.api.grpc import core_pb2, grpcutils
+from core.emulator.session import Session
+from core.nodes.network import PtpNet
+
+# max number of converted events kept for sharing between subscribers
+EVENT_CACHE_SIZE: int = 1000
+
+
+class ProtoCache:
+    """
+    Caches protobuf conversions of session data, so that repeated session
+    requests and multiple event subscribers share a single conversion.
+    """
+
+    def __init__(self, session: Session) -> None:
+        """
+        Create a ProtoCache instance.
+
+        :param session: session to cache conversions for
+        """
+        self.session: Session = session
+        self.lock: threading.Lock = threading.Lock()
+        self.nodes_version: Optional[int] = None
+        self.nodes: List[core_pb2.Node] = []
+        self.links_version: Optional[int] = None
+        self.links: List[core_pb2.Link] = []
+        # converted events keyed by data id, retaining data to keep id unique
+        self.events: "OrderedDict[int, Tuple[Any, core_pb2.Event]]" = OrderedDict()
+
+    def get_nodes(self) -> List[core_pb2.Node]:
+        """
+        Retrieve protobuf nodes for the session, converting nodes again only
+        when they have changed.
+
+        :return: node protos
+        """
+        with self.lock:
+            version = self.session.nodes_version
+            if version != self.nodes_version:
+                nodes = []
+                for node in list(self.session.nodes.values()):
+                    if not isinstance(node, PtpNet):
+                        nodes.append(grpcutils.get_node_proto(self.session, node))
+                self.nodes = nodes
+                self.nodes_version = version
+            return self.nodes
+
+    def get_links(self) -> List[core_pb2.Link]:
+        """
+        Retrieve protobuf links for the session, converting links again only
+        when they have changed.
+
+        :return: link protos
+        """
+        with self.lock:
+            version = self.session.links_version
+            if version != self.links_version:
+                links = []
+                for node in list(self.session.nodes.values()):
+                    links.extend(grpcutils.get_links(node))
+                self.links = links
+                self.links_version = version
+            return self.links
+
+    def get_session(self) -> core_pb2.Session:
+        """
+        Retrieve protobuf representation of the session.
+
+        :return: session proto
+        """
+        return core_pb2.Session(
+            state=self.session.state.value,
+            nodes=self.get_nodes(),
+            links=self.get_links(),
+            dir=self.session.session_dir,
+        )
+
+    def get_event(
+        self, data: Any, convert: Callable[[Any], core_pb2.Event]
+    ) -> core_pb2.Event:
+        """
+        Retrieve the event for broadcast data, only converting data once for
+        all subscribers. Cached events are shared and should not be modified.
+
+        :param data: broadcast data to convert
+        :param convert: function to convert data to an event
+        :return: converted event
+        """
+        key = id(data)
+        with self.lock:
+            cached = self.events.get(key)
+            if cached is not None:
+                return cached[1]
+        event = convert(data)
+        event.session_id = self.session.id
+        with self.lock:
+            cached = self.events.setdefault(key, (data, event))
+            while len(self.events) > EVENT_CACHE_SIZE:
+                self.events.popitem(last=False)
+        return cached[1]
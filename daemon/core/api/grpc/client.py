@@ -338,6 +338,75 @@ class CoreGrpcClient:
         request = core_pb2.GetSessionMetadataRequest(session_id=session_id)
         return self.stub.GetSessionMetadata(request)
 
+    def get_session_profile(
+        self, session_id: int
+    ) -> core_pb2.GetSessionProfileResponse:
+        """
+        Retrieve the timings recorded for starting a session, for each startup
+        phase, node, and service.
+
+        :param session_id: id of session
+        :return: response with session profile
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        request = core_pb2.GetSessionProfileRequest(session_id=session_id)
+        return self.stub.GetSessionProfile(request)
+
+    def get_command_stats(
+        self, session_id: int, reset: bool = False
+    ) -> core_pb2.GetCommandStatsResponse:
+        """
+        Retrieve counts and latencies of commands ran for a session, recorded when
+        the session command_stats option is enabled.
+
+        :param session_id: id of session
+        :param reset: True to clear stats after retrieving them, False otherwise
+        :return: response with stats for each executable and recent slow commands
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        request = core_pb2.GetCommandStatsRequest(session_id=session_id, reset=reset)
+        return self.stub.GetCommandStats(request)
+
+    def get_event_loop_stats(
+        self, session_id: int
+    ) -> core_pb2.GetEventLoopStatsResponse:
+        """
+        Retrieve how far behind schedule the session event loop is running, used
+        to run mobility and scheduled events.
+
+        :param session_id: id of session
+        :return: response with event loop stats
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        request = core_pb2.GetEventLoopStatsRequest(session_id=session_id)
+        return self.stub.GetEventLoopStats(request)
+
+    def get_event_bus_stats(self, session_id: int) -> core_pb2.GetEventBusStatsResponse:
+        """
+        Retrieve dispatch statistics for the handlers of session broadcasts, such
+        as how many events are pending or were dropped for a slow handler.
+
+        :param session_id: id of session
+        :return: response with stats for each handler
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        request = core_pb2.GetEventBusStatsRequest(session_id=session_id)
+        return self.stub.GetEventBusStats(request)
+
+    def get_distributed_stats(
+        self, session_id: int
+    ) -> core_pb2.GetDistributedStatsResponse:
+        """
+        Retrieve counts and latencies for the agent on each distributed server,
+        used when the session remote_agent option is enabled.
+
+        :param session_id: id of session
+        :return: response with stats for each distributed server
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        request = core_pb2.GetDistributedStatsRequest(session_id=session_id)
+        return self.stub.GetDistributedStats(request)
+
     def set_session_metadata(
         self, session_id: int, config: Dict[str, str]
     ) -> core_pb2.SetSessionMetadataResponse:
@@ -467,6 +536,9 @@ class CoreGrpcClient:
         session_id: int,
         handler: Callable[[core_pb2.Event], None],
         events: List[core_pb2.Event] = None,
+        position_window: int = 0,
+        queue_size: int = 0,
+        overflow: core_pb2.EventOverflow = core_pb2.EventOverflow.DROP_OLDEST,
     ) -> grpc.Future:
         """
         Listen for session events.
@@ -474,26 +546,55 @@ class CoreGrpcClient:
         :param session_id: id of session
         :param handler: handler for received events
         :param events: events to listen to, defaults to all
+        :param position_window: milliseconds to coalesce node position updates for,
+            received as a single node events event, defaults to 0 to send every
+            node update
+        :param queue_size: max number of events buffered for this stream, defaults
+            to 0 for the server default
+        :param overflow: policy for events when the buffer is full, defaults to
+            dropping the oldest events
         :return: stream processing events, can be used to cancel stream
         :raises grpc.RpcError: when session doesn't exist
         """
-        request = core_pb2.EventsRequest(session_id=session_id, events=events)
+        request = core_pb2.EventsRequest(
+            session_id=session_id,
+            events=events,
+            position_window=position_window,
+            queue_size=queue_size,
+            overflow=overflow,
+        )
         stream = self.stub.Events(request)
         start_streamer(stream, handler)
         return stream
 
+    def get_event_streams(self, session_id: int) -> core_pb2.GetEventStreamsResponse:
+        """
+        Retrieve the state of event streams for a session, with buffered event lag
+        and dropped event counts.
+
+        :param session_id: id of session
+        :return: response with event streams
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        request = core_pb2.GetEventStreamsRequest(session_id=session_id)
+        return self.stub.GetEventStreams(request)
+
     def throughputs(
-        self, session_id: int, handler: Callable[[core_pb2.ThroughputsEvent], None]
+        self,
+        session_id: int,
+        handler: Callable[[core_pb2.ThroughputsEvent], None],
+        interval: int = None,
     ) -> grpc.Future:
         """
         Listen for throughput events with information for interfaces and bridges.
 
         :param session_id: session id
         :param handler: handler for every event
+        :param interval: milliseconds between events, defaults to 3 seconds
         :return: stream processing events, can be used to cancel stream
         :raises grpc.RpcError: when session doesn't exist
         """
-        request = core_pb2.ThroughputsRequest(session_id=session_id)
+        request = core_pb2.ThroughputsRequest(session_id=session_id, interval=interval)
         stream = self.stub.Throughputs(request)
         start_streamer(stream, handler)
         return stream
@@ -513,6 +614,30 @@ class CoreGrpcClient:
         start_streamer(stream, handler)
         return stream
 
+    def node_resources(
+        self,
+        session_id: int,
+        handler: Callable[[core_pb2.NodeResourcesEvent], None],
+        interval: int = None,
+        node_ids: List[int] = None,
+    ) -> grpc.Future:
+        """
+        Listen for cpu, memory, and process usage of session nodes.
+
+        :param session_id: session id
+        :param handler: handler for every event
+        :param interval: milliseconds between events, defaults to 1 second
+        :param node_ids: nodes to report usage for, defaults to all nodes
+        :return: stream processing events, can be used to cancel stream
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        request = core_pb2.NodeResourcesRequest(
+            session_id=session_id, interval=interval, node_ids=node_ids
+        )
+        stream = self.stub.NodeResources(request)
+        start_streamer(stream, handler)
+        return stream
+
     def add_node(
         self, session_id: int, node: core_pb2.Node, source: str = None
     ) -> core_pb2.AddNodeResponse:
@@ -530,6 +655,23 @@ class CoreGrpcClient:
         )
         return self.stub.AddNode(request)
 
+    def add_nodes(
+        self, session_id: int, nodes: List[core_pb2.Node], source: str = None
+    ) -> core_pb2.AddNodesResponse:
+        """
+        Add many nodes to session at once.
+
+        :param session_id: session id
+        :param nodes: nodes to add
+        :param source: source application
+        :return: response with result and node id for each node
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        request = core_pb2.AddNodesRequest(
+            session_id=session_id, nodes=nodes, source=source
+        )
+        return self.stub.AddNodes(request)
+
     def get_node(self, session_id: int, node_id: int) -> core_pb2.GetNodeResponse:
         """
         Get node details.
@@ -761,6 +903,73 @@ class CoreGrpcClient:
         )
         return self.stub.DeleteLink(request)
 
+    def add_links(
+        self, session_id: int, links: List[core_pb2.Link], source: str = None
+    ) -> core_pb2.AddLinksResponse:
+        """
+        Add many links between nodes at once.
+
+        :param session_id: session id
+        :param links: links to add
+        :param source: application source
+        :return: response with result and created interfaces for each link
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        request = core_pb2.AddLinksRequest(
+            session_id=session_id, links=links, source=source
+        )
+        return self.stub.AddLinks(request)
+
+    def edit_links(
+        self, session_id: int, links: List[core_pb2.Link], source: str = None
+    ) -> core_pb2.EditLinksResponse:
+        """
+        Edit many links between nodes at once, links are identified by node and
+        interface ids.
+
+        :param session_id: session id
+        :param links: links with options to set
+        :param source: application source
+        :return: response with result for each link
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        request = core_pb2.EditLinksRequest(
+            session_id=session_id, links=links, source=source
+        )
+        return self.stub.EditLinks(request)
+
+    def delete_links(
+        self, session_id: int, links: List[core_pb2.Link], source: str = None
+    ) -> core_pb2.DeleteLinksResponse:
+        """
+        Delete many links between nodes at once, links are identified by node and
+        interface ids.
+
+        :param session_id: session id
+        :param links: links to delete
+        :param source: application source
+        :return: response with result for each link
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        request = core_pb2.DeleteLinksRequest(
+            session_id=session_id, links=links, source=source
+        )
+        return self.stub.DeleteLinks(request)
+
+    def update_links(
+        self, update_iterator: Iterable[core_pb2.UpdateLinksRequest]
+    ) -> core_pb2.UpdateLinksResponse:
+        """
+        Stream link option updates using the provided iterator. Updates for the
+        same link are coalesced and applied together on an interval, which can be
+        set in milliseconds by the first request.
+
+        :param update_iterator: iterator for generating link updates
+        :return: update links response, with counts of updates handled
+        :raises grpc.RpcError: when session does not exist
+        """
+        return self.stub.UpdateLinks(update_iterator)
+
     def get_hooks(self, session_id: int) -> core_pb2.GetHooksResponse:
         """
         Get all hook scripts.
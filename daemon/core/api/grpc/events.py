@@ -1,8 +1,12 @@
+import itertools
 import logging
-from queue import Empty, Queue
-from typing import Iterable, Optional
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, List, Optional, Tuple
 
 from core.api.grpc import core_pb2
+from core.api.grpc.cache import ProtoCache
 from core.api.grpc.grpcutils import convert_link
 from core.emulator.data import (
     ConfigData,
@@ -12,8 +16,14 @@ from core.emulator.data import (
     LinkData,
     NodeData,
 )
+from core.emulator.enumerations import MessageFlags
 from core.emulator.session import Session
 
+# default max number of events buffered for a subscriber
+DEFAULT_QUEUE_SIZE: int = 10000
+# max number of events taken from a buffer at once
+DRAIN_SIZE: int = 100
+
 
 def handle_node_event(node_data: NodeData) -> core_pb2.Event:
     """
@@ -41,6 +51,42 @@ def handle_node_event(node_data: NodeData) -> core_pb2.Event:
     return core_pb2.Event(node_event=node_event, source=node_data.source)
 
 
+def handle_node_position(node_data: NodeData) -> core_pb2.NodeEvent:
+    """
+    Handle node position update, providing only the current node position.
+
+    :param node_data: node data
+    :return: node event that contains node id and position
+    """
+    node = node_data.node
+    x, y, _ = node.position.get()
+    position = core_pb2.Position(x=x, y=y)
+    lon, lat, alt = node.position.get_geo()
+    geo = core_pb2.Geo(lon=lon, lat=lat, alt=alt)
+    node_proto = core_pb2.Node(id=node.id, position=position, geo=geo)
+    message_type = node_data.message_type.value
+    return core_pb2.NodeEvent(message_type=message_type, node=node_proto)
+
+
+def handle_node_positions(node_datas: List[NodeData]) -> List[core_pb2.Event]:
+    """
+    Handle coalesced node position updates, creating a single event for each
+    source of updates.
+
+    :param node_datas: latest node data for nodes with updated positions
+    :return: node position events
+    """
+    sources = {}
+    for node_data in node_datas:
+        node_events = sources.setdefault(node_data.source, [])
+        node_events.append(handle_node_position(node_data))
+    events = []
+    for source, node_events in sources.items():
+        node_events = core_pb2.NodeEvents(events=node_events)
+        events.append(core_pb2.Event(node_events=node_events, source=source))
+    return events
+
+
 def handle_link_event(link_data: LinkData) -> core_pb2.Event:
     """
     Handle link event when there is a link event
@@ -138,23 +184,152 @@ def handle_file_event(file_data: FileData) -> core_pb2.Event:
     return core_pb2.Event(file_event=file_event)
 
 
+class EventBuffer:
+    """
+    Bounded buffer of session events for a subscriber, applying an overflow policy
+    when a subscriber can not keep up, while tracking lag and dropped events.
+    """
+
+    def __init__(
+        self,
+        size: int = DEFAULT_QUEUE_SIZE,
+        overflow: int = core_pb2.EventOverflow.DROP_OLDEST,
+    ) -> None:
+        """
+        Create an EventBuffer instance.
+
+        :param size: max number of events to buffer
+        :param overflow: policy to apply when buffer is full
+        """
+        self.size: int = size
+        self.overflow: int = overflow
+        self.condition: threading.Condition = threading.Condition()
+        self.events: Deque[Any] = deque()
+        self.overflowed: bool = False
+        self.max_lag: int = 0
+        self.dropped: int = 0
+        self.coalesced: int = 0
+
+    def lag(self) -> int:
+        """
+        Number of events waiting to be sent.
+
+        :return: buffered event count
+        """
+        return len(self.events)
+
+    def put(self, data: Any) -> None:
+        """
+        Add an event to the buffer, applying the overflow policy when full.
+
+        :param data: event to add
+        :return: nothing
+        """
+        with self.condition:
+            if self.overflowed:
+                self.dropped += 1
+                return
+            if len(self.events) >= self.size:
+                if self.overflow == core_pb2.EventOverflow.DISCONNECT:
+                    logging.warning("event subscriber overflowed, disconnecting")
+                    self.overflowed = True
+                    self.dropped += 1
+                    self.condition.notify()
+                    return
+                if self.overflow == core_pb2.EventOverflow.COALESCE:
+                    if self._coalesce(data):
+                        self.coalesced += 1
+                        return
+                self.events.popleft()
+                self.dropped += 1
+            self.events.append(data)
+            self.max_lag = max(self.max_lag, len(self.events))
+            self.condition.notify()
+
+    def get(self, timeout: float, size: int = DRAIN_SIZE) -> List[Any]:
+        """
+        Take buffered events, waiting for an event when the buffer is empty.
+
+        :param timeout: max time to wait for an event
+        :param size: max number of events to take
+        :return: buffered events, empty if none were available within timeout
+        """
+        with self.condition:
+            if not self.events and not self.overflowed:
+                self.condition.wait(timeout)
+            count = min(size, len(self.events))
+            return [self.events.popleft() for _ in range(count)]
+
+    def _coalesce(self, data: Any) -> bool:
+        """
+        Replace a buffered event with the same key as the provided event.
+
+        :param data: event to coalesce
+        :return: True if coalesced with a buffered event, False otherwise
+        """
+        key = event_key(data)
+        if key is None:
+            return False
+        for index in range(len(self.events) - 1, -1, -1):
+            if event_key(self.events[index]) == key:
+                del self.events[index]
+                self.events.append(data)
+                return True
+        return False
+
+
+def event_key(data: Any) -> Optional[Hashable]:
+    """
+    Key for events that only need their latest value sent, such as node updates.
+
+    :param data: event data
+    :return: key for event, None when event can not be coalesced
+    """
+    if isinstance(data, NodeData) and data.message_type == MessageFlags.NONE:
+        return NodeData, data.node.id, data.source
+    return None
+
+
+streamer_ids: itertools.count = itertools.count(1)
+
+
 class EventStreamer:
     """
     Processes session events to generate grpc events.
     """
 
     def __init__(
-        self, session: Session, event_types: Iterable[core_pb2.EventType]
+        self,
+        session: Session,
+        event_types: Iterable[core_pb2.EventType],
+        position_window: float = 0.0,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        overflow: int = core_pb2.EventOverflow.DROP_OLDEST,
+        cache: ProtoCache = None,
     ) -> None:
         """
         Create a EventStreamer instance.
 
         :param session: session to process events for
         :param event_types: types of events to process
+        :param position_window: time in seconds to coalesce node position updates
+            for, sending the latest positions within a single event, default is 0
+            to send every node update
+        :param queue_size: max number of events to buffer
+        :param overflow: policy to apply when too many events are buffered
+        :param cache: cache to share event conversions with other subscribers,
+            events are converted by this streamer alone when not provided
         """
+        self.id: int = next(streamer_ids)
         self.session: Session = session
         self.event_types: Iterable[core_pb2.EventType] = event_types
-        self.queue: Queue = Queue()
+        self.position_window: float = position_window
+        self.queue: EventBuffer = EventBuffer(queue_size, overflow)
+        self.cache: Optional[ProtoCache] = cache
+        # latest node position updates, keyed by node id and source
+        self.positions: Dict[Tuple[int, Optional[str]], NodeData] = {}
+        self.positions_deadline: Optional[float] = None
+        self.events: Deque[core_pb2.Event] = deque()
         self.add_handlers()
 
     def add_handlers(self) -> None:
@@ -182,29 +357,121 @@ class EventStreamer:
 
         :return: grpc event, or None when invalid event or queue timeout
         """
-        event = None
-        try:
-            data = self.queue.get(timeout=1)
+        if not self.events:
+            self._process_queue()
+        if not self.events:
+            return None
+        return self.events.popleft()
+
+    def _process_queue(self) -> None:
+        """
+        Process the next events in the queue, coalescing node position updates
+        when enabled.
+
+        :return: nothing
+        """
+        timeout = 1
+        if self.positions_deadline is not None:
+            timeout = max(self.positions_deadline - time.monotonic(), 0)
+        datas = self.queue.get(timeout)
+        for data in datas:
+            if self._is_position(data):
+                key = (data.node.id, data.source)
+                self.positions.pop(key, None)
+                self.positions[key] = data
+                if self.positions_deadline is None:
+                    deadline = time.monotonic() + self.position_window
+                    self.positions_deadline = deadline
+                continue
+            # send coalesced positions before other events to retain ordering
+            self._flush_positions()
+            convert = None
             if isinstance(data, NodeData):
-                event = handle_node_event(data)
+                convert = handle_node_event
             elif isinstance(data, LinkData):
-                event = handle_link_event(data)
+                convert = handle_link_event
             elif isinstance(data, EventData):
-                event = handle_session_event(data)
+                convert = handle_session_event
             elif isinstance(data, ConfigData):
-                event = handle_config_event(data)
+                convert = handle_config_event
             elif isinstance(data, ExceptionData):
-                event = handle_exception_event(data)
+                convert = handle_exception_event
             elif isinstance(data, FileData):
-                event = handle_file_event(data)
+                convert = handle_file_event
             else:
                 logging.error("unknown event: %s", data)
-        except Empty:
-            pass
-        if event:
+            if convert:
+                self.events.append(self._convert(data, convert))
+        if self.positions and time.monotonic() >= self.positions_deadline:
+            self._flush_positions()
+
+    def _flush_positions(self) -> None:
+        """
+        Create events for coalesced node position updates.
+
+        :return: nothing
+        """
+        if not self.positions:
+            return
+        for event in handle_node_positions(list(self.positions.values())):
             event.session_id = self.session.id
+            self.events.append(event)
+        self.positions.clear()
+        self.positions_deadline = None
+
+    def _convert(
+        self, data: Any, convert: Callable[[Any], core_pb2.Event]
+    ) -> core_pb2.Event:
+        """
+        Convert data to an event, sharing the conversion when using a cache.
+
+        :param data: data to convert
+        :param convert: function to convert data to an event
+        :return: converted event
+        """
+        if self.cache:
+            return self.cache.get_event(data, convert)
+        event = convert(data)
+        event.session_id = self.session.id
         return event
 
+    def overflowed(self) -> bool:
+        """
+        Check if this subscriber should be disconnected, due to not keeping up.
+
+        :return: True if overflowed, False otherwise
+        """
+        return self.queue.overflowed
+
+    def stream_proto(self) -> core_pb2.EventStream:
+        """
+        Create a proto with the state of this subscriber.
+
+        :return: event stream proto
+        """
+        return core_pb2.EventStream(
+            id=self.id,
+            lag=self.queue.lag(),
+            max_lag=self.queue.max_lag,
+            dropped=self.queue.dropped,
+            coalesced=self.queue.coalesced,
+            queue_size=self.queue.size,
+            overflow=self.queue.overflow,
+        )
+
+    def _is_position(self, data: object) -> bool:
+        """
+        Check if data is a node update to coalesce.
+
+        :param data: data to check
+        :return: True if a node update to coalesce, False otherwise
+        """
+        return (
+            self.position_window > 0
+            and isinstance(data, NodeData)
+            and data.message_type == MessageFlags.NONE
+        )
+
     def remove_handlers(self) -> None:
         """
         Remove session event handlers for events being watched.
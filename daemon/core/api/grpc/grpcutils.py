@@ -1,7 +1,8 @@
+import dataclasses
 import logging
 import time
 from pathlib import Path
-from typing import Any, Dict, List, Tuple, Type, Union
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type, Union
 
 import grpc
 from grpc import ServicerContext
@@ -11,14 +12,22 @@ from core.api.grpc import common_pb2, core_pb2
 from core.api.grpc.services_pb2 import NodeServiceData, ServiceConfig
 from core.config import ConfigurableOptions
 from core.emane.nodes import EmaneNet
+from core.emulator.commandstats import LATENCY_BUCKETS, CommandStat, SlowCommand
 from core.emulator.data import InterfaceData, LinkData, LinkOptions, NodeOptions
-from core.emulator.enumerations import LinkTypes, NodeTypes
+from core.emulator.distributed import DistributedServer
+from core.emulator.enumerations import LinkTypes, MessageFlags, NodeTypes
+from core.emulator.eventbus import DispatchStats
+from core.emulator.profiler import SessionProfile
 from core.emulator.session import Session
+from core.emulator.throughput import Throughput
+from core.errors import CoreCommandError
 from core.nodes.base import CoreNode, NodeBase
 from core.nodes.interface import CoreInterface
+from core.nodes.netbatch import NetBatch
 from core.services.coreservices import CoreService
 
 WORKERS = 10
+Result = Tuple[Any, Optional[Exception]]
 
 
 class CpuUsage:
@@ -40,6 +49,45 @@ class CpuUsage:
         return (total_diff - idle_diff) / total_diff
 
 
+class NodeResourceUsage:
+    def __init__(self, session: Session, node_ids: List[int]) -> None:
+        self.session: Session = session
+        self.node_ids: Set[int] = set(node_ids)
+        self.prev_usage: Dict[int, Tuple[float, int]] = {}
+
+    def run(self) -> List[core_pb2.NodeResources]:
+        now = time.monotonic()
+        results = []
+        for node in list(self.session.nodes.values()):
+            if self.node_ids and node.id not in self.node_ids:
+                continue
+            cgroup = getattr(node, "cgroup", None)
+            if cgroup is None:
+                continue
+            try:
+                stats = cgroup.stats()
+            except OSError:
+                continue
+            # cpu usage as a percentage of a single cpu
+            cpu = 0.0
+            prev = self.prev_usage.get(node.id)
+            if prev is not None:
+                prev_time, prev_cpu_usage = prev
+                usage_diff = stats.cpu_usage - prev_cpu_usage
+                cpu = usage_diff / ((now - prev_time) * 1000000) * 100
+            self.prev_usage[node.id] = (now, stats.cpu_usage)
+            resources = core_pb2.NodeResources(
+                node_id=node.id,
+                cpu=cpu,
+                memory=stats.memory,
+                pids=stats.pids,
+                cpu_limit=node.cpu_limit,
+                memory_limit=node.memory_limit,
+            )
+            results.append(resources)
+        return results
+
+
 def add_node_data(node_proto: core_pb2.Node) -> Tuple[NodeTypes, int, NodeOptions]:
     """
     Convert node protobuf message to data for creating a node.
@@ -61,6 +109,10 @@ def add_node_data(node_proto: core_pb2.Node) -> Tuple[NodeTypes, int, NodeOption
         options.emane = node_proto.emane
     if node_proto.server:
         options.server = node_proto.server
+    if node_proto.cpu_limit:
+        options.cpu_limit = node_proto.cpu_limit
+    if node_proto.memory_limit:
+        options.memory_limit = node_proto.memory_limit
     position = node_proto.position
     options.set_position(position.x, position.y)
     if node_proto.HasField("geo"):
@@ -122,6 +174,27 @@ def add_link_data(
     return iface1_data, iface2_data, options, link_type
 
 
+def link_options(options_proto: core_pb2.LinkOptions) -> LinkOptions:
+    """
+    Convert link options proto to link options data.
+
+    :param options_proto: link options proto
+    :return: link options
+    """
+    return LinkOptions(
+        delay=options_proto.delay,
+        bandwidth=options_proto.bandwidth,
+        loss=options_proto.loss,
+        dup=options_proto.dup,
+        jitter=options_proto.jitter,
+        mer=options_proto.mer,
+        burst=options_proto.burst,
+        mburst=options_proto.mburst,
+        unidirectional=options_proto.unidirectional,
+        key=options_proto.key,
+    )
+
+
 def create_nodes(
     session: Session, node_protos: List[core_pb2.Node]
 ) -> Tuple[List[NodeBase], List[Exception]]:
@@ -138,10 +211,8 @@ def create_nodes(
         _class = session.get_node_class(_type)
         args = (_class, _id, options)
         funcs.append((session.add_node, args, {}))
-    start = time.monotonic()
-    results, exceptions = utils.threadpool(funcs)
-    total = time.monotonic() - start
-    logging.debug("grpc created nodes time: %s", total)
+    with session.profiler.phase("create nodes"):
+        results, exceptions = utils.threadpool(funcs)
     return results, exceptions
 
 
@@ -162,10 +233,8 @@ def create_links(
         iface1, iface2, options, link_type = add_link_data(link_proto)
         args = (node1_id, node2_id, iface1, iface2, options, link_type)
         funcs.append((session.add_link, args, {}))
-    start = time.monotonic()
-    results, exceptions = utils.threadpool(funcs)
-    total = time.monotonic() - start
-    logging.debug("grpc created links time: %s", total)
+    with session.profiler.phase("create links"):
+        results, exceptions = utils.threadpool(funcs)
     return results, exceptions
 
 
@@ -186,11 +255,181 @@ def edit_links(
         iface1, iface2, options, link_type = add_link_data(link_proto)
         args = (node1_id, node2_id, iface1.id, iface2.id, options, link_type)
         funcs.append((session.update_link, args, {}))
+    with session.profiler.phase("edit links"):
+        results, exceptions = utils.threadpool(funcs)
+    return results, exceptions
+
+
+def run_batched(
+    session: Session, funcs: List[Tuple[Callable, Tuple[Any, ...], Dict[str, Any]]]
+) -> List[Result]:
+    """
+    Run session mutations using a thread pool, recording their network commands
+    to a batch for this call, to apply together when deferred apply is enabled and
+    the session is not already deferring commands while being built.
+
+    :param session: session being changed
+    :param funcs: functions to run, with args and kwargs
+    :return: result and exception for each function, in order
+    """
+    net_batch = None
+    if session.use_deferred_apply() and not session.net_batch.active:
+        net_batch = NetBatch()
+        net_batch.start()
+        funcs = [
+            (net_batch.call, (func, *args), kwargs) for func, args, kwargs in funcs
+        ]
     start = time.monotonic()
-    results, exceptions = utils.threadpool(funcs)
+    try:
+        results = utils.threadpool_results(funcs, WORKERS)
+    finally:
+        if net_batch:
+            try:
+                net_batch.apply()
+            except CoreCommandError as e:
+                logging.exception("error applying batched network commands")
+                results = [(None, e) if x[1] is None else x for x in results]
     total = time.monotonic() - start
-    logging.debug("grpc edit links time: %s", total)
-    return results, exceptions
+    logging.debug("grpc batched changes: count(%s) time(%s)", len(funcs), total)
+    return results
+
+
+def bulk_add_nodes(session: Session, node_protos: List[core_pb2.Node]) -> List[Result]:
+    """
+    Add nodes to a session in parallel, generating unique ids for nodes without
+    one before any are created.
+
+    :param session: session to add nodes to
+    :param node_protos: node proto messages
+    :return: created node or exception for each node, in order
+    """
+    used_ids = set(session.nodes)
+    used_ids.update(x.id for x in node_protos if x.id)
+    next_id = 1
+    funcs = []
+    for node_proto in node_protos:
+        _type, _id, options = add_node_data(node_proto)
+        if not _id:
+            while next_id in used_ids:
+                next_id += 1
+            _id = next_id
+            used_ids.add(_id)
+        _class = session.get_node_class(_type)
+        funcs.append((session.add_node, (_class, _id, options), {}))
+    start = time.monotonic()
+    results = utils.threadpool_results(funcs, WORKERS)
+    total = time.monotonic() - start
+    logging.debug("grpc bulk add nodes time: %s", total)
+    return results
+
+
+def bulk_add_links(
+    session: Session, link_protos: List[core_pb2.Link], source: Optional[str]
+) -> Tuple[List[Result], List[LinkData]]:
+    """
+    Add links to a session in parallel.
+
+    :param session: session to add links to
+    :param link_protos: link proto messages
+    :param source: source of changes, for broadcasts
+    :return: created interfaces or exception for each link, in order, and
+        link data to broadcast for added links
+    """
+    funcs = []
+    link_options = []
+    for link_proto in link_protos:
+        iface1, iface2, options, link_type = add_link_data(link_proto)
+        args = (link_proto.node1_id, link_proto.node2_id, iface1, iface2, options)
+        funcs.append((session.add_link, args + (link_type,), {}))
+        link_options.append(options)
+    results = run_batched(session, funcs)
+    link_datas = []
+    for link_proto, options, result in zip(link_protos, link_options, results):
+        ifaces, exception = result
+        if exception:
+            continue
+        node1_iface, node2_iface = ifaces
+        link_data = LinkData(
+            message_type=MessageFlags.ADD,
+            node1_id=link_proto.node1_id,
+            node2_id=link_proto.node2_id,
+            iface1=iface_to_data(node1_iface) if node1_iface else None,
+            iface2=iface_to_data(node2_iface) if node2_iface else None,
+            options=options,
+            source=source,
+        )
+        link_datas.append(link_data)
+    return results, link_datas
+
+
+def bulk_edit_links(
+    session: Session, link_protos: List[core_pb2.Link], source: Optional[str]
+) -> Tuple[List[Result], List[LinkData]]:
+    """
+    Edit links within a session in parallel.
+
+    :param session: session to edit links for
+    :param link_protos: link proto messages
+    :param source: source of changes, for broadcasts
+    :return: result or exception for each link, in order, and link data to
+        broadcast for edited links
+    """
+    funcs = []
+    link_datas = []
+    for link_proto in link_protos:
+        iface1, iface2, options, link_type = add_link_data(link_proto)
+        args = (link_proto.node1_id, link_proto.node2_id, iface1.id, iface2.id)
+        funcs.append((session.update_link, args + (options, link_type), {}))
+        link_data = LinkData(
+            message_type=MessageFlags.NONE,
+            node1_id=link_proto.node1_id,
+            node2_id=link_proto.node2_id,
+            iface1=InterfaceData(id=iface1.id),
+            iface2=InterfaceData(id=iface2.id),
+            options=options,
+            source=source,
+        )
+        link_datas.append(link_data)
+    results = run_batched(session, funcs)
+    link_datas = [x for x, (_, e) in zip(link_datas, results) if e is None]
+    return results, link_datas
+
+
+def bulk_delete_links(
+    session: Session, link_protos: List[core_pb2.Link], source: Optional[str]
+) -> Tuple[List[Result], List[LinkData]]:
+    """
+    Delete links within a session in parallel.
+
+    :param session: session to delete links from
+    :param link_protos: link proto messages
+    :param source: source of changes, for broadcasts
+    :return: result or exception for each link, in order, and link data to
+        broadcast for deleted links
+    """
+    funcs = []
+    link_datas = []
+    for link_proto in link_protos:
+        iface1_id = link_proto.iface1.id
+        iface2_id = link_proto.iface2.id
+        link_type = LinkTypes(link_proto.type)
+        args = (link_proto.node1_id, link_proto.node2_id, iface1_id, iface2_id)
+        funcs.append((session.delete_link, args + (link_type,), {}))
+        link_data = LinkData(
+            message_type=MessageFlags.DELETE,
+            node1_id=link_proto.node1_id,
+            node2_id=link_proto.node2_id,
+            iface1=InterfaceData(id=iface1_id),
+            iface2=InterfaceData(id=iface2_id),
+            source=source,
+        )
+        link_datas.append(link_data)
+    start = time.monotonic()
+    results = utils.threadpool_results(funcs, WORKERS)
+    total = time.monotonic() - start
+    logging.debug("grpc bulk delete links time: %s", total)
+    link_datas = [x for x, (_, e) in zip(link_datas, results) if e is None]
+    return results, link_datas
 
 
 def convert_value(value: Any) -> str:
@@ -264,6 +503,8 @@ def get_node_proto(session: Session, node: NodeBase) -> core_pb2.Node:
     node_dir = getattr(node, "nodedir", None)
     channel = getattr(node, "ctrlchnlname", None)
     image = getattr(node, "image", None)
+    cpu_limit = getattr(node, "cpu_limit", None)
+    memory_limit = getattr(node, "memory_limit", None)
     return core_pb2.Node(
         id=node.id,
         name=node.name,
@@ -278,6 +519,8 @@ def get_node_proto(session: Session, node: NodeBase) -> core_pb2.Node:
         config_services=config_services,
         dir=node_dir,
         channel=channel,
+        cpu_limit=cpu_limit,
+        memory_limit=memory_limit,
     )
 
 
@@ -378,25 +621,106 @@ def convert_link(link_data: LinkData) -> core_pb2.Link:
     )
 
 
-def get_net_stats() -> Dict[str, Dict]:
+def convert_throughputs(
+    session_id: int, throughputs: List[Throughput]
+) -> core_pb2.ThroughputsEvent:
     """
-    Retrieve status about the current interfaces in the system
+    Convert throughput rates for session devices to a throughputs event.
 
-    :return: send and receive status of the interfaces in the system
+    :param session_id: session id rates are for
+    :param throughputs: rates for session interfaces and bridges
+    :return: throughputs event
     """
-    with open("/proc/net/dev", "r") as f:
-        data = f.readlines()[2:]
+    event = core_pb2.ThroughputsEvent(session_id=session_id)
+    for throughput in throughputs:
+        if throughput.iface_id is None:
+            proto = event.bridge_throughputs.add()
+        else:
+            proto = event.iface_throughputs.add()
+            proto.iface_id = throughput.iface_id
+        proto.node_id = throughput.node_id
+        proto.throughput = throughput.throughput
+        proto.rx = throughput.rx
+        proto.tx = throughput.tx
+        proto.rx_packets = throughput.rx_packets
+        proto.tx_packets = throughput.tx_packets
+        proto.rx_dropped = throughput.rx_dropped
+        proto.tx_dropped = throughput.tx_dropped
+    return event
 
-    stats = {}
-    for line in data:
-        line = line.strip()
-        if not line:
-            continue
-        line = line.split()
-        line[0] = line[0].strip(":")
-        stats[line[0]] = {"rx": float(line[1]), "tx": float(line[9])}
 
-    return stats
+def convert_profile(profile: SessionProfile) -> core_pb2.SessionProfile:
+    """
+    Convert the timings recorded for starting a session to a proto.
+
+    :param profile: session profile to convert
+    :return: session profile proto
+    """
+    phases = [core_pb2.PhaseProfile(**dataclasses.asdict(x)) for x in profile.phases]
+    nodes = [core_pb2.NodeProfile(**dataclasses.asdict(x)) for x in profile.nodes]
+    services = []
+    for service in profile.services:
+        service_proto = core_pb2.ServiceProfile(
+            duration=service.duration, **dataclasses.asdict(service)
+        )
+        services.append(service_proto)
+    return core_pb2.SessionProfile(
+        start_time=profile.start_time,
+        duration=profile.duration,
+        commands=profile.commands,
+        phases=phases,
+        nodes=nodes,
+        services=services,
+    )
+
+
+def convert_command_stats(
+    stats: List[CommandStat], slow_commands: List[SlowCommand]
+) -> core_pb2.GetCommandStatsResponse:
+    """
+    Convert counts and latencies of commands ran for a session to a response.
+
+    :param stats: stats for each executable
+    :param slow_commands: recent slow commands
+    :return: get command stats response
+    """
+    stat_protos = [core_pb2.CommandStat(**dataclasses.asdict(x)) for x in stats]
+    slow_protos = [core_pb2.SlowCommand(**dataclasses.asdict(x)) for x in slow_commands]
+    return core_pb2.GetCommandStatsResponse(
+        buckets=LATENCY_BUCKETS, stats=stat_protos, slow_commands=slow_protos
+    )
+
+
+def convert_server_stats(server: DistributedServer) -> core_pb2.ServerStats:
+    """
+    Convert counts and latencies for the agent of a distributed server to a proto.
+
+    :param server: distributed server to convert
+    :return: server stats proto
+    """
+    stats = server.agent_stats()
+    data = dataclasses.asdict(stats) if stats else {}
+    return core_pb2.ServerStats(
+        name=server.name, host=server.host, agent=stats is not None, **data
+    )
+
+
+def convert_dispatch_stats(stats: DispatchStats) -> core_pb2.DispatchStats:
+    """
+    Convert dispatch statistics for a session broadcast handler to a proto.
+
+    :param stats: dispatch stats to convert
+    :return: dispatch stats proto
+    """
+    return core_pb2.DispatchStats(
+        name=stats.name,
+        dispatched=stats.dispatched,
+        pending=stats.pending,
+        errors=stats.errors,
+        dropped=stats.dropped,
+        mean_latency=stats.average_latency(),
+        max_latency=stats.max_latency,
+    )
 
 
 def session_location(session: Session, location: core_pb2.SessionLocation) -> None:
@@ -1,12 +1,12 @@
 import atexit
+import dataclasses
 import logging
 import os
-import re
 import tempfile
 import threading
 import time
 from concurrent import futures
-from typing import Iterable, Optional, Pattern, Type
+from typing import Dict, Iterable, List, Optional, Type
 
 import grpc
 from grpc import ServicerContext
@@ -19,6 +19,7 @@ from core.api.grpc import (
     core_pb2_grpc,
     grpcutils,
 )
+from core.api.grpc.cache import ProtoCache
 from core.api.grpc.common_pb2 import MappedConfig
 from core.api.grpc.configservices_pb2 import (
     ConfigService,
@@ -56,13 +57,8 @@ from core.api.grpc.emane_pb2 import (
     SetEmaneModelConfigRequest,
     SetEmaneModelConfigResponse,
 )
-from core.api.grpc.events import EventStreamer
-from core.api.grpc.grpcutils import (
-    get_config_options,
-    get_emane_model_id,
-    get_links,
-    get_net_stats,
-)
+from core.api.grpc.events import DEFAULT_QUEUE_SIZE, EventStreamer
+from core.api.grpc.grpcutils import get_config_options, get_emane_model_id, get_links
 from core.api.grpc.mobility_pb2 import (
     GetMobilityConfigRequest,
     GetMobilityConfigResponse,
@@ -115,15 +111,17 @@ from core.emulator.enumerations import (
     LinkTypes,
     MessageFlags,
 )
+from core.emulator.linkupdates import LINK_UPDATE_INTERVAL, LinkUpdates
+from core.emulator.nodemoves import NodeMove, NodeMoves
 from core.emulator.session import NT, Session
+from core.emulator.throughput import THROUGHPUT_INTERVAL
 from core.errors import CoreCommandError, CoreError
 from core.location.mobility import BasicRangeModel, Ns2ScriptedMobility
 from core.nodes.base import CoreNode, CoreNodeBase, NodeBase
-from core.nodes.network import PtpNet, WlanNode
+from core.nodes.network import WlanNode
 from core.services.coreservices import ServiceManager
 
 _ONE_DAY_IN_SECONDS: int = 60 * 60 * 24
-_INTERFACE_REGEX: Pattern = re.compile(r"veth(?P<node>[0-9a-fA-F]+)")
 
 
 class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
@@ -138,6 +136,10 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
         self.coreemu: CoreEmu = coreemu
         self.running: bool = True
         self.server: Optional[grpc.Server] = None
+        self.event_streams: Dict[int, List[EventStreamer]] = {}
+        self.event_streams_lock: threading.Lock = threading.Lock()
+        self.proto_caches: Dict[int, ProtoCache] = {}
+        self.proto_caches_lock: threading.Lock = threading.Lock()
         atexit.register(self._exit_handler)
 
     def _exit_handler(self) -> None:
@@ -178,6 +180,20 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
             context.abort(grpc.StatusCode.NOT_FOUND, f"session {session_id} not found")
         return session
 
+    def get_proto_cache(self, session: Session) -> ProtoCache:
+        """
+        Retrieve the proto cache for a session, creating it when needed.
+
+        :param session: session to get proto cache for
+        :return: session proto cache
+        """
+        with self.proto_caches_lock:
+            cache = self.proto_caches.get(session.id)
+            if cache is None or cache.session is not session:
+                cache = ProtoCache(session)
+                self.proto_caches[session.id] = cache
+            return cache
+
     def get_node(
         self, session: Session, node_id: int, context: ServicerContext, _class: Type[NT]
     ) -> NT:
@@ -358,6 +374,8 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
         """
         logging.debug("delete session: %s", request)
         result = self.coreemu.delete_session(request.session_id)
+        with self.proto_caches_lock:
+            self.proto_caches.pop(request.session_id, None)
         return core_pb2.DeleteSessionResponse(result=result)
 
     def GetSessions(
@@ -518,6 +536,88 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
         session = self.get_session(request.session_id, context)
         return core_pb2.GetSessionMetadataResponse(config=session.metadata)
 
+    def GetSessionProfile(
+        self, request: core_pb2.GetSessionProfileRequest, context: ServicerContext
+    ) -> core_pb2.GetSessionProfileResponse:
+        """
+        Retrieve the timings recorded for starting a session.
+
+        :param request: get session profile request
+        :param context: context object
+        :return: get session profile response
+        """
+        logging.debug("get session profile: %s", request)
+        session = self.get_session(request.session_id, context)
+        profile = grpcutils.convert_profile(session.profiler.profile())
+        return core_pb2.GetSessionProfileResponse(profile=profile)
+
+    def GetCommandStats(
+        self, request: core_pb2.GetCommandStatsRequest, context: ServicerContext
+    ) -> core_pb2.GetCommandStatsResponse:
+        """
+        Retrieve counts and latencies of commands ran for a session, recorded
+        when command stats are enabled.
+
+        :param request: get command stats request
+        :param context: context object
+        :return: get command stats response
+        """
+        logging.debug("get command stats: %s", request)
+        session = self.get_session(request.session_id, context)
+        stats, slow_commands = session.command_stats.get_stats()
+        if request.reset:
+            session.command_stats.reset()
+        return grpcutils.convert_command_stats(stats, slow_commands)
+
+    def GetEventLoopStats(
+        self, request: core_pb2.GetEventLoopStatsRequest, context: ServicerContext
+    ) -> core_pb2.GetEventLoopStatsResponse:
+        """
+        Retrieve how far behind schedule the session event loop is running.
+
+        :param request: get event loop stats request
+        :param context: context object
+        :return: get event loop stats response
+        """
+        logging.debug("get event loop stats: %s", request)
+        session = self.get_session(request.session_id, context)
+        stats = session.event_loop.stats()
+        return core_pb2.GetEventLoopStatsResponse(**dataclasses.asdict(stats))
+
+    def GetEventBusStats(
+        self, request: core_pb2.GetEventBusStatsRequest, context: ServicerContext
+    ) -> core_pb2.GetEventBusStatsResponse:
+        """
+        Retrieve dispatch statistics for the handlers of session broadcasts.
+
+        :param request: get event bus stats request
+        :param context: context object
+        :return: get event bus stats response
+        """
+        logging.debug("get event bus stats: %s", request)
+        session = self.get_session(request.session_id, context)
+        handlers = [
+            grpcutils.convert_dispatch_stats(x) for x in session.event_bus.stats()
+        ]
+        return core_pb2.GetEventBusStatsResponse(handlers=handlers)
+
+    def GetDistributedStats(
+        self, request: core_pb2.GetDistributedStatsRequest, context: ServicerContext
+    ) -> core_pb2.GetDistributedStatsResponse:
+        """
+        Retrieve counts and latencies for the agent on each distributed server.
+
+        :param request: get distributed stats request
+        :param context: context object
+        :return: get distributed stats response
+        """
+        logging.debug("get distributed stats: %s", request)
+        session = self.get_session(request.session_id, context)
+        servers = []
+        for server in session.distributed.servers.values():
+            servers.append(grpcutils.convert_server_stats(server))
+        return core_pb2.GetDistributedStatsResponse(servers=servers)
+
     def SetSessionMetadata(
         self, request: core_pb2.SetSessionMetadataRequest, context: ServicerContext
     ) -> core_pb2.SetSessionMetadataResponse:
@@ -558,20 +658,7 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
         """
         logging.debug("get session: %s", request)
         session = self.get_session(request.session_id, context)
-
-        links = []
-        nodes = []
-        for _id in session.nodes:
-            node = session.nodes[_id]
-            if not isinstance(node, PtpNet):
-                node_proto = grpcutils.get_node_proto(session, node)
-                nodes.append(node_proto)
-            node_links = get_links(node)
-            links.extend(node_links)
-
-        session_proto = core_pb2.Session(
-            state=session.state.value, nodes=nodes, links=links, dir=session.session_dir
-        )
+        session_proto = self.get_proto_cache(session).get_session()
         return core_pb2.GetSessionResponse(session=session_proto)
 
     def AddSessionServer(
@@ -604,15 +691,46 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
         if not event_types:
             event_types = set(core_pb2.EventType.Enum.values())
 
-        streamer = EventStreamer(session, event_types)
-        while self._is_running(context):
-            event = streamer.process()
-            if event:
-                yield event
-
-        streamer.remove_handlers()
+        position_window = request.position_window / 1000
+        queue_size = request.queue_size or DEFAULT_QUEUE_SIZE
+        cache = self.get_proto_cache(session)
+        streamer = EventStreamer(
+            session, event_types, position_window, queue_size, request.overflow, cache
+        )
+        with self.event_streams_lock:
+            self.event_streams.setdefault(session.id, []).append(streamer)
+        try:
+            while self._is_running(context):
+                if streamer.overflowed():
+                    context.abort(
+                        grpc.StatusCode.RESOURCE_EXHAUSTED, "event stream overflowed"
+                    )
+                event = streamer.process()
+                if event:
+                    yield event
+        finally:
+            streamer.remove_handlers()
+            with self.event_streams_lock:
+                self.event_streams[session.id].remove(streamer)
         self._cancel_stream(context)
 
+    def GetEventStreams(
+        self, request: core_pb2.GetEventStreamsRequest, context: ServicerContext
+    ) -> core_pb2.GetEventStreamsResponse:
+        """
+        Retrieve the state of event streams for a session, to monitor subscribers
+        that are falling behind.
+
+        :param request: get event streams request
+        :param context: context object
+        :return: get event streams response
+        """
+        session = self.get_session(request.session_id, context)
+        with self.event_streams_lock:
+            streamers = list(self.event_streams.get(session.id, []))
+        streams = [x.stream_proto() for x in streamers]
+        return core_pb2.GetEventStreamsResponse(streams=streams)
+
     def Throughputs(
         self, request: core_pb2.ThroughputsRequest, context: ServicerContext
     ) -> None:
@@ -624,62 +742,18 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
         :return: nothing
         """
         session = self.get_session(request.session_id, context)
-        delay = 3
-        last_check = None
-        last_stats = None
-
-        while self._is_running(context):
-            now = time.monotonic()
-            stats = get_net_stats()
-
-            # calculate average
-            if last_check is not None:
-                interval = now - last_check
-                throughputs_event = core_pb2.ThroughputsEvent(session_id=session.id)
-                for key in stats:
-                    current_rxtx = stats[key]
-                    previous_rxtx = last_stats.get(key)
-                    if not previous_rxtx:
-                        continue
-                    rx_kbps = (
-                        (current_rxtx["rx"] - previous_rxtx["rx"]) * 8.0 / interval
-                    )
-                    tx_kbps = (
-                        (current_rxtx["tx"] - previous_rxtx["tx"]) * 8.0 / interval
-                    )
-                    throughput = rx_kbps + tx_kbps
-                    if key.startswith("veth"):
-                        key = key.split(".")
-                        node_id = _INTERFACE_REGEX.search(key[0]).group("node")
-                        node_id = int(node_id, base=16)
-                        iface_id = int(key[1], base=16)
-                        session_id = int(key[2], base=16)
-                        if session.id != session_id:
-                            continue
-                        iface_throughput = throughputs_event.iface_throughputs.add()
-                        iface_throughput.node_id = node_id
-                        iface_throughput.iface_id = iface_id
-                        iface_throughput.throughput = throughput
-                    elif key.startswith("b."):
-                        try:
-                            key = key.split(".")
-                            node_id = int(key[1], base=16)
-                            session_id = int(key[2], base=16)
-                            if session.id != session_id:
-                                continue
-                            bridge_throughput = (
-                                throughputs_event.bridge_throughputs.add()
-                            )
-                            bridge_throughput.node_id = node_id
-                            bridge_throughput.throughput = throughput
-                        except ValueError:
-                            pass
-
-                yield throughputs_event
-
-            last_check = now
-            last_stats = stats
-            time.sleep(delay)
+        interval = THROUGHPUT_INTERVAL
+        if request.interval:
+            interval = request.interval / 1000
+        subscriber = session.throughput.subscribe(interval)
+        try:
+            while self._is_running(context):
+                throughputs = subscriber.get(timeout=1)
+                if throughputs is None:
+                    continue
+                yield grpcutils.convert_throughputs(session.id, throughputs)
+        finally:
+            session.throughput.unsubscribe(subscriber)
 
     def CpuUsage(
         self, request: core_pb2.CpuUsageRequest, context: ServicerContext
@@ -690,6 +764,24 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
             yield core_pb2.CpuUsageEvent(usage=usage)
             time.sleep(request.delay)
 
+    def NodeResources(
+        self, request: core_pb2.NodeResourcesRequest, context: ServicerContext
+    ) -> None:
+        """
+        Stream resource usage for session nodes, tracked using cgroups
+
+        :param request: node resources request
+        :param context: context object
+        :return: nothing
+        """
+        session = self.get_session(request.session_id, context)
+        interval = request.interval / 1000 if request.interval else 1
+        resource_usage = grpcutils.NodeResourceUsage(session, request.node_ids)
+        while self._is_running(context):
+            nodes = resource_usage.run()
+            yield core_pb2.NodeResourcesEvent(session_id=session.id, nodes=nodes)
+            time.sleep(interval)
+
     def AddNode(
         self, request: core_pb2.AddNodeRequest, context: ServicerContext
     ) -> core_pb2.AddNodeResponse:
@@ -709,6 +801,31 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
         session.broadcast_node(node, MessageFlags.ADD, source)
         return core_pb2.AddNodeResponse(node_id=node.id)
 
+    def AddNodes(
+        self, request: core_pb2.AddNodesRequest, context: ServicerContext
+    ) -> core_pb2.AddNodesResponse:
+        """
+        Add many nodes to a session at once
+
+        :param request: add-nodes request
+        :param context: context object
+        :return: add-nodes response, with a result for each node
+        """
+        logging.debug("add nodes: %s", len(request.nodes))
+        session = self.get_session(request.session_id, context)
+        nodes = []
+        results = []
+        for node, exception in grpcutils.bulk_add_nodes(session, request.nodes):
+            if exception:
+                result = core_pb2.NodeResult(result=False, error=str(exception))
+            else:
+                nodes.append(node)
+                result = core_pb2.NodeResult(result=True, node_id=node.id)
+            results.append(result)
+        source = request.source if request.source else None
+        session.broadcast_nodes(nodes, MessageFlags.ADD, source)
+        return core_pb2.AddNodesResponse(results=results)
+
     def GetNode(
         self, request: core_pb2.GetNodeRequest, context: ServicerContext
     ) -> core_pb2.GetNodeResponse:
@@ -736,34 +853,39 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
         context: ServicerContext,
     ) -> core_pb2.MoveNodesResponse:
         """
-        Stream node movements
+        Stream node movements, applying the moves received together on an
+        interval
 
         :param request_iterator: move nodes request iterator
         :param context: context object
         :return: move nodes response
         """
-        for request in request_iterator:
-            if not request.WhichOneof("move_type"):
-                raise CoreError("move nodes must provide a move type")
-            session = self.get_session(request.session_id, context)
-            node = self.get_node(session, request.node_id, context, NodeBase)
-            options = NodeOptions()
-            has_geo = request.HasField("geo")
-            if has_geo:
-                logging.info("has geo")
-                lat = request.geo.lat
-                lon = request.geo.lon
-                alt = request.geo.alt
-                options.set_location(lat, lon, alt)
-            else:
-                x = request.position.x
-                y = request.position.y
-                logging.info("has pos: %s,%s", x, y)
-                options.set_position(x, y)
-            session.edit_node(node.id, options)
-            source = request.source if request.source else None
-            if not has_geo:
-                session.broadcast_node(node, source=source)
+        session_moves = {}
+        try:
+            for request in request_iterator:
+                if not request.WhichOneof("move_type"):
+                    raise CoreError("move nodes must provide a move type")
+                session = self.get_session(request.session_id, context)
+                node = self.get_node(session, request.node_id, context, NodeBase)
+                moves = session_moves.get(session.id)
+                if moves is None:
+                    moves = NodeMoves(session)
+                    moves.start()
+                    session_moves[session.id] = moves
+                source = request.source if request.source else None
+                move = NodeMove(node, source=source)
+                if request.HasField("geo"):
+                    move.lat = request.geo.lat
+                    move.lon = request.geo.lon
+                    move.alt = request.geo.alt
+                else:
+                    move.x = request.position.x
+                    move.y = request.position.y
+                moves.add(move)
+        finally:
+            for session_id, moves in session_moves.items():
+                moves.stop()
+                logging.debug("session(%s) move nodes: %s", session_id, moves.stats())
         return core_pb2.MoveNodesResponse()
 
     def EditNode(
@@ -1000,6 +1122,129 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
         session.broadcast_link(link_data)
         return core_pb2.DeleteLinkResponse(result=True)
 
+    def AddLinks(
+        self, request: core_pb2.AddLinksRequest, context: ServicerContext
+    ) -> core_pb2.AddLinksResponse:
+        """
+        Add many links to a session at once
+
+        :param request: add-links request
+        :param context: context object
+        :return: add-links response, with a result for each link
+        """
+        logging.debug("add links: %s", len(request.links))
+        session = self.get_session(request.session_id, context)
+        source = request.source if request.source else None
+        link_results, link_datas = grpcutils.bulk_add_links(
+            session, request.links, source
+        )
+        results = []
+        for link_proto, (ifaces, exception) in zip(request.links, link_results):
+            if exception:
+                result = core_pb2.LinkResult(result=False, error=str(exception))
+            else:
+                node1_iface, node2_iface = ifaces
+                iface1_proto = None
+                iface2_proto = None
+                if node1_iface:
+                    node1_id = link_proto.node1_id
+                    iface1_proto = grpcutils.iface_to_proto(node1_id, node1_iface)
+                if node2_iface:
+                    node2_id = link_proto.node2_id
+                    iface2_proto = grpcutils.iface_to_proto(node2_id, node2_iface)
+                result = core_pb2.LinkResult(
+                    result=True, iface1=iface1_proto, iface2=iface2_proto
+                )
+            results.append(result)
+        session.broadcast_links(link_datas)
+        return core_pb2.AddLinksResponse(results=results)
+
+    def EditLinks(
+        self, request: core_pb2.EditLinksRequest, context: ServicerContext
+    ) -> core_pb2.EditLinksResponse:
+        """
+        Edit many links within a session at once
+
+        :param request: edit-links request
+        :param context: context object
+        :return: edit-links response, with a result for each link
+        """
+        logging.debug("edit links: %s", len(request.links))
+        session = self.get_session(request.session_id, context)
+        source = request.source if request.source else None
+        link_results, link_datas = grpcutils.bulk_edit_links(
+            session, request.links, source
+        )
+        results = [self._link_result(x) for _, x in link_results]
+        session.broadcast_links(link_datas)
+        return core_pb2.EditLinksResponse(results=results)
+
+    def DeleteLinks(
+        self, request: core_pb2.DeleteLinksRequest, context: ServicerContext
+    ) -> core_pb2.DeleteLinksResponse:
+        """
+        Delete many links from a session at once
+
+        :param request: delete-links request
+        :param context: context object
+        :return: delete-links response, with a result for each link
+        """
+        logging.debug("delete links: %s", len(request.links))
+        session = self.get_session(request.session_id, context)
+        source = request.source if request.source else None
+        link_results, link_datas = grpcutils.bulk_delete_links(
+            session, request.links, source
+        )
+        results = [self._link_result(x) for _, x in link_results]
+        session.broadcast_links(link_datas)
+        return core_pb2.DeleteLinksResponse(results=results)
+
+    def UpdateLinks(
+        self,
+        request_iterator: Iterable[core_pb2.UpdateLinksRequest],
+        context: ServicerContext,
+    ) -> core_pb2.UpdateLinksResponse:
+        """
+        Stream link option updates, applying the latest update for each link
+        together on an interval
+
+        :param request_iterator: update links request iterator
+        :param context: context object
+        :return: update links response, with counts of updates handled
+        """
+        updates = None
+        try:
+            for request in request_iterator:
+                if updates is None:
+                    session = self.get_session(request.session_id, context)
+                    interval = LINK_UPDATE_INTERVAL
+                    if request.interval:
+                        interval = request.interval / 1000
+                    updates = LinkUpdates(session, interval)
+                    updates.start()
+                options = grpcutils.link_options(request.options)
+                source = request.source if request.source else None
+                updates.add(
+                    request.node1_id,
+                    request.node2_id,
+                    request.iface1_id,
+                    request.iface2_id,
+                    options,
+                    source,
+                )
+        finally:
+            if updates:
+                updates.stop()
+        if updates is None:
+            return core_pb2.UpdateLinksResponse()
+        return core_pb2.UpdateLinksResponse(**updates.stats())
+
+    @staticmethod
+    def _link_result(exception: Optional[Exception]) -> core_pb2.LinkResult:
+        if exception:
+            return core_pb2.LinkResult(result=False, error=str(exception))
+        return core_pb2.LinkResult(result=True)
+
     def GetHooks(
         self, request: core_pb2.GetHooksRequest, context: ServicerContext
     ) -> core_pb2.GetHooksResponse:
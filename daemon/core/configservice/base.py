@@ -4,16 +4,21 @@ import inspect
 import logging
 import pathlib
 import time
-from typing import Any, Dict, List
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 from mako import exceptions
 from mako.lookup import TemplateLookup
 from mako.template import Template
 
 from core.config import Configuration
+from core.emulator.profiler import SERVICE_DIRS, SERVICE_FILES, SERVICE_STARTUP
 from core.errors import CoreCommandError, CoreError
 from core.nodes.base import CoreNode
 
+if TYPE_CHECKING:
+    from core.emulator.validation import ValidationScheduler
+
 TEMPLATES_DIR: str = "templates"
 
 
@@ -144,6 +149,34 @@ class ConfigService(abc.ABC):
             else:
                 self.run_validation()
 
+    def schedule_start(self, scheduler: "ValidationScheduler") -> Optional[Future]:
+        """
+        Creates services files/directories and runs startup, scheduling validation
+        based on validation mode rather than waiting for it.
+
+        :param scheduler: scheduler to validate service with
+        :return: future completed when service is validated, None when already
+            validated
+        :raises ConfigServiceBootError: when there is an error starting service
+        """
+        logging.info("node(%s) service(%s) starting...", self.node.name, self.name)
+        profiler = self.node.session.profiler
+        with profiler.service_stage(self.node, self.name, SERVICE_DIRS):
+            self.create_dirs()
+        with profiler.service_stage(self.node, self.name, SERVICE_FILES):
+            self.create_files()
+        wait = self.validation_mode == ConfigServiceMode.BLOCKING
+        with profiler.service_stage(self.node, self.name, SERVICE_STARTUP):
+            self.run_startup(wait)
+        if wait:
+            return None
+        if self.validation_mode == ConfigServiceMode.TIMER:
+            future = scheduler.delay(self.validation_timer)
+        else:
+            future = self.schedule_validation(scheduler)
+        profiler.service_validation(self.node, self.name, future)
+        return future
+
     def stop(self) -> None:
         """
         Stop service using shutdown commands.
@@ -311,6 +344,37 @@ class ConfigService(abc.ABC):
                     f"node({self.node.name}) service({self.name}) failed to validate"
                 )
 
+    def schedule_validation(self, scheduler: "ValidationScheduler") -> Future:
+        """
+        Schedules validation commands for service on node, each attempt runs the
+        commands that have not yet passed.
+
+        :param scheduler: scheduler to run validation with
+        :return: future completed when validation passes, failing with
+            ConfigServiceBootError if there is a validation failure
+        """
+        cmds = self.validate[:]
+
+        def check() -> bool:
+            while cmds:
+                try:
+                    self.node.cmd(cmds[0])
+                    del cmds[0]
+                except CoreCommandError:
+                    logging.debug(
+                        f"node({self.node.name}) service({self.name}) "
+                        f"validate command failed: {cmds[0]}"
+                    )
+                    return False
+            return True
+
+        error = ConfigServiceBootError(
+            f"node({self.node.name}) service({self.name}) failed to validate"
+        )
+        return scheduler.schedule(
+            check, self.validation_period, self.validation_timer, error
+        )
+
     def _render(self, template: Template, data: Dict[str, Any] = None) -> str:
         """
         Renders template providing all associated data to template.
@@ -704,6 +704,7 @@ class EmaneManager(ModelManager):
         """
         events = LocationEvent()
         events.restore(data)
+        locations = []
         for event in events:
             txnemid, attrs = event
             if (
@@ -719,7 +720,8 @@ class EmaneManager(ModelManager):
             lon = attrs["longitude"]
             alt = attrs["altitude"]
             logging.debug("emane location event: %s,%s,%s", lat, lon, alt)
-            self.handlelocationeventtoxyz(txnemid, lat, lon, alt)
+            locations.append((txnemid, lat, lon, alt))
+        self.handlelocationeventstoxyz(locations)
 
     def handlelocationeventtoxyz(
         self, nemid: int, lat: float, lon: float, alt: float
@@ -729,56 +731,78 @@ class EmaneManager(ModelManager):
         into a node and x,y,z coordinate values, sending a Node Message.
         Returns True if successfully parsed and a Node Message was sent.
         """
+        return bool(self.handlelocationeventstoxyz([(nemid, lat, lon, alt)]))
+
+    def handlelocationeventstoxyz(
+        self, locations: List[Tuple[int, float, float, float]]
+    ) -> List[NodeBase]:
+        """
+        Convert the (NEM ID, lat, long, alt) locations from received location
+        events into nodes and x,y,z coordinate values, converting all locations
+        together and sending the Node Messages within a single broadcast.
+
+        :param locations: nem id, lat, lon, alt for each location
+        :return: nodes that were updated
+        """
         # convert nemid to node number
-        iface = self.get_iface(nemid)
-        if iface is None:
-            logging.info("location event for unknown NEM %s", nemid)
-            return False
+        known = []
+        for location in locations:
+            nemid = location[0]
+            iface = self.get_iface(nemid)
+            if iface is None:
+                logging.info("location event for unknown NEM %s", nemid)
+                continue
+            known.append((iface.node.id, location))
+        if not known:
+            return []
 
-        n = iface.node.id
         # convert from lat/long/alt to x,y,z coordinates
-        x, y, z = self.session.location.getxyz(lat, lon, alt)
-        x = int(x)
-        y = int(y)
-        z = int(z)
-        logging.debug(
-            "location event NEM %s (%s, %s, %s) -> (%s, %s, %s)",
-            nemid,
-            lat,
-            lon,
-            alt,
-            x,
-            y,
-            z,
-        )
-        xbit_check = x.bit_length() > 16 or x < 0
-        ybit_check = y.bit_length() > 16 or y < 0
-        zbit_check = z.bit_length() > 16 or z < 0
-        if any([xbit_check, ybit_check, zbit_check]):
-            logging.error(
-                "Unable to build node location message, received lat/long/alt "
-                "exceeds coordinate space: NEM %s (%d, %d, %d)",
+        _, lats, lons, alts = zip(*(location for _, location in known))
+        positions = self.session.location.getxyz_many(lats, lons, alts)
+        nodes = {}
+        for (n, (nemid, lat, lon, alt)), position in zip(known, positions):
+            x, y, z = (int(i) for i in position)
+            logging.debug(
+                "location event NEM %s (%s, %s, %s) -> (%s, %s, %s)",
                 nemid,
+                lat,
+                lon,
+                alt,
                 x,
                 y,
                 z,
             )
-            return False
+            xbit_check = x.bit_length() > 16 or x < 0
+            ybit_check = y.bit_length() > 16 or y < 0
+            zbit_check = z.bit_length() > 16 or z < 0
+            if any([xbit_check, ybit_check, zbit_check]):
+                logging.error(
+                    "Unable to build node location message, received lat/long/alt "
+                    "exceeds coordinate space: NEM %s (%d, %d, %d)",
+                    nemid,
+                    x,
+                    y,
+                    z,
+                )
+                continue
 
-        # generate a node message for this location update
-        try:
-            node = self.session.get_node(n, NodeBase)
-        except CoreError:
-            logging.exception(
-                "location event NEM %s has no corresponding node %s", nemid, n
-            )
-            return False
+            # generate a node message for this location update
+            try:
+                node = self.session.get_node(n, NodeBase)
+            except CoreError:
+                logging.exception(
+                    "location event NEM %s has no corresponding node %s", nemid, n
+                )
+                continue
 
-        # don"t use node.setposition(x,y,z) which generates an event
-        node.position.set(x, y, z)
-        node.position.set_geo(lon, lat, alt)
-        self.session.broadcast_node(node)
-        return True
+            # don"t use node.setposition(x,y,z) which generates an event
+            node.position.set(x, y, z)
+            node.position.set_geo(lon, lat, alt)
+            nodes[node.id] = node
+        nodes = list(nodes.values())
+        if nodes:
+            self.session.broadcast_nodes(nodes)
+        return nodes
 
     def emanerunning(self, node: CoreNode) -> bool:
         """
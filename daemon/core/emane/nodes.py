@@ -110,29 +110,36 @@ class EmaneNet(CoreNetworkBase):
             self.mobility = model(session=self.session, _id=self.id)
             self.mobility.update_config(config)
 
-    def _nem_position(
-        self, iface: CoreInterface
-    ) -> Optional[Tuple[int, float, float, float]]:
+    def _nem_positions(
+        self, ifaces: List[CoreInterface]
+    ) -> List[Tuple[int, float, float, float]]:
         """
-        Creates nem position for emane event for a given interface.
+        Creates nem positions for an emane event for the given interfaces,
+        converting all positions to geo together.
 
-        :param iface: interface to get nem emane position for
-        :return: nem position tuple, None otherwise
+        :param ifaces: interfaces to get nem emane positions for
+        :return: nem position tuples, for interfaces with a known nem
         """
-        nem_id = self.session.emane.get_nem_id(iface)
-        ifname = iface.localname
-        if nem_id is None:
-            logging.info("nemid for %s is unknown", ifname)
-            return
-        node = iface.node
-        x, y, z = node.getposition()
-        lat, lon, alt = self.session.location.getgeo(x, y, z)
-        if node.position.alt is not None:
-            alt = node.position.alt
-        node.position.set_geo(lon, lat, alt)
-        # altitude must be an integer or warning is printed
-        alt = int(round(alt))
-        return nem_id, lon, lat, alt
+        known = []
+        for iface in ifaces:
+            nem_id = self.session.emane.get_nem_id(iface)
+            if nem_id is None:
+                logging.info("nemid for %s is unknown", iface.localname)
+                continue
+            known.append((nem_id, iface.node))
+        if not known:
+            return []
+        xs, ys, zs = zip(*(node.getposition() for _, node in known))
+        geos = self.session.location.getgeo_many(xs, ys, zs)
+        positions = []
+        for (nem_id, node), (lat, lon, alt) in zip(known, geos):
+            if node.position.alt is not None:
+                alt = node.position.alt
+            node.position.set_geo(lon, lat, alt)
+            # altitude must be an integer or warning is printed
+            alt = int(round(alt))
+            positions.append((nem_id, lon, lat, alt))
+        return positions
 
     def setnemposition(self, iface: CoreInterface) -> None:
         """
@@ -143,9 +150,7 @@ class EmaneNet(CoreNetworkBase):
         if self.session.emane.service is None:
             logging.info("position service not available")
             return
-        position = self._nem_position(iface)
-        if position:
-            nemid, lon, lat, alt = position
+        for nemid, lon, lat, alt in self._nem_positions([iface]):
             event = LocationEvent()
             event.append(nemid, latitude=lat, longitude=lon, altitude=alt)
             self.session.emane.service.publish(0, event)
@@ -164,11 +169,8 @@ class EmaneNet(CoreNetworkBase):
             return
 
         event = LocationEvent()
-        for iface in moved_ifaces:
-            position = self._nem_position(iface)
-            if position:
-                nemid, lon, lat, alt = position
-                event.append(nemid, latitude=lat, longitude=lon, altitude=alt)
+        for nemid, lon, lat, alt in self._nem_positions(moved_ifaces):
+            event.append(nemid, latitude=lat, longitude=lon, altitude=alt)
         self.session.emane.service.publish(0, event)
 
     def links(self, flags: MessageFlags = MessageFlags.NONE) -> List[LinkData]:
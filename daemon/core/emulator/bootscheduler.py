@@ -0,0 +1,205 @@
+"""
+bootscheduler.py: runs node boot steps for a session from a single work queue,
+where each step starts as soon as the steps it depends on have completed. This
+allows services across all nodes to boot in parallel with a bounded number of
+threads, while still respecting service dependencies within each node.
+"""
+
+import concurrent.futures
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# boot steps mostly wait on commands, so use more workers than cores
+WORKERS_PER_CORE: int = 4
+MIN_WORKERS: int = 10
+
+
+def default_workers() -> int:
+    """
+    Determine the number of boot workers to use based on host cores.
+
+    :return: number of boot workers
+    """
+    cores = os.cpu_count() or 1
+    return max(MIN_WORKERS, cores * WORKERS_PER_CORE)
+
+
+class BootStep:
+    """
+    A single unit of work ran when booting a session.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        args: Tuple[Any, ...],
+        dependencies: List["BootStep"],
+        key: Any = None,
+    ) -> None:
+        """
+        Create a BootStep instance.
+
+        :param name: name of step, used for logging
+        :param func: function to run
+        :param args: arguments to run function with
+        :param dependencies: steps that must complete before this step runs
+        :param key: key used to group steps, such as the node being booted
+        """
+        self.name: str = name
+        self.func: Callable[..., Any] = func
+        self.args: Tuple[Any, ...] = args
+        self.dependencies: List["BootStep"] = dependencies
+        self.dependents: List["BootStep"] = []
+        self.key: Any = key
+        self.start: Optional[float] = None
+        self.duration: Optional[float] = None
+        self.error: Optional[Exception] = None
+        self.skipped: bool = False
+
+    def run(self) -> Any:
+        """
+        Run this step, recording how long it took.
+
+        :return: result of step function, a future when the step completes later
+        """
+        self.start = time.monotonic()
+        try:
+            return self.func(*self.args)
+        finally:
+            self.duration = time.monotonic() - self.start
+
+    def finish(self) -> None:
+        """
+        Record the duration of a step that completed after it ran.
+
+        :return: nothing
+        """
+        self.duration = time.monotonic() - self.start
+
+
+class BootScheduler:
+    """
+    Runs boot steps within a single thread pool, in dependency order.
+    """
+
+    def __init__(self, workers: int = None) -> None:
+        """
+        Create a BootScheduler instance.
+
+        :param workers: max number of steps to run at once, defaults to a number
+            based on host cores
+        """
+        if not workers:
+            workers = default_workers()
+        self.workers: int = workers
+        self.steps: List[BootStep] = []
+
+    def add_step(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        args: Tuple[Any, ...] = (),
+        dependencies: List[BootStep] = None,
+        key: Any = None,
+    ) -> BootStep:
+        """
+        Add a step to run.
+
+        :param name: name of step, used for logging
+        :param func: function to run
+        :param args: arguments to run function with
+        :param dependencies: steps that must complete before this step runs
+        :param key: key used to group steps, such as the node being booted
+        :return: created step
+        """
+        dependencies = dependencies or []
+        step = BootStep(name, func, args, dependencies, key)
+        for dependency in dependencies:
+            dependency.dependents.append(step)
+        self.steps.append(step)
+        return step
+
+    def run(self) -> List[BootStep]:
+        """
+        Run all steps, starting each step once its dependencies complete. Steps
+        returning a future complete when the future does, without holding a worker.
+        Steps depending on a failed step are skipped, while all other steps still
+        run.
+
+        :return: steps that failed
+        """
+        start = time.monotonic()
+        remaining = {x: len(x.dependencies) for x in self.steps}
+        completing = set()
+        failed = []
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+            futures = {}
+            for step, count in remaining.items():
+                if not count:
+                    futures[executor.submit(step.run)] = step
+            while futures:
+                done, _ = concurrent.futures.wait(
+                    futures, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    step = futures.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logging.exception("boot step error: %s", step.name)
+                        completing.discard(step)
+                        step.error = e
+                        failed.append(step)
+                        self._skip(step)
+                        continue
+                    if step in completing:
+                        completing.remove(step)
+                        step.finish()
+                    elif isinstance(result, concurrent.futures.Future):
+                        # step completes later, such as after validation
+                        completing.add(step)
+                        futures[result] = step
+                        continue
+                    logging.debug("boot step(%s) time: %s", step.name, step.duration)
+                    for dependent in step.dependents:
+                        if dependent.skipped:
+                            continue
+                        remaining[dependent] -= 1
+                        if not remaining[dependent]:
+                            futures[executor.submit(dependent.run)] = dependent
+        logging.debug(
+            "boot steps(%s) workers(%s) time: %s",
+            len(self.steps),
+            self.workers,
+            time.monotonic() - start,
+        )
+        return failed
+
+    def errors(self) -> Dict[Any, List[Exception]]:
+        """
+        Retrieve errors from failed steps, grouped by step key.
+
+        :return: step key mapped to errors
+        """
+        errors = {}
+        for step in self.steps:
+            if step.error is not None:
+                errors.setdefault(step.key, []).append(step.error)
+        return errors
+
+    def _skip(self, step: BootStep) -> None:
+        """
+        Mark all steps depending on the given step as skipped.
+
+        :param step: step that failed or was skipped
+        :return: nothing
+        """
+        for dependent in step.dependents:
+            if dependent.skipped:
+                continue
+            logging.debug("skipping boot step: %s", dependent.name)
+            dependent.skipped = True
+            self._skip(dependent)
@@ -0,0 +1,250 @@
+"""
+commandstats.py: records the commands ran for a session, counting calls, failures,
+and latencies for each executable, and logging commands that are slow to complete.
+"""
+
+import bisect
+import collections
+import contextlib
+import dataclasses
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from core.errors import CoreCommandError
+
+# upper bounds of latency histogram buckets in seconds, with a final bucket for
+# latencies above the last bound
+LATENCY_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+NUM_BUCKETS: int = len(LATENCY_BUCKETS) + 1
+# commands taking at least this long in seconds are logged as slow
+SLOW_COMMAND_TIME: float = 1.0
+# number of most recent slow commands to keep
+SLOW_COMMANDS: int = 100
+# default time between writing stats to the session directory
+COMMAND_STATS_INTERVAL: float = 10.0
+# file written to the session directory with current stats
+COMMAND_STATS_FILE: str = "commands.json"
+
+
+def command_name(args: str) -> str:
+    """
+    Determine the executable name for a command.
+
+    :param args: command to get executable for
+    :return: executable name, without any path
+    """
+    args = args.lstrip()
+    if not args:
+        return ""
+    return os.path.basename(args.split(maxsplit=1)[0])
+
+
+@contextlib.contextmanager
+def untracked() -> Iterator[None]:
+    """
+    Context for running a command that is not being recorded.
+
+    :return: nothing
+    """
+    yield
+
+
+@dataclass
+class CommandStat:
+    """
+    Counts and latencies for calls to an executable, times are in seconds.
+    """
+
+    name: str
+    count: int = 0
+    failures: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    buckets: List[int] = field(default_factory=lambda: [0] * NUM_BUCKETS)
+
+    def add(self, duration: float, failed: bool) -> None:
+        """
+        Add a call to this executable.
+
+        :param duration: time call took
+        :param failed: True if call failed, False otherwise
+        :return: nothing
+        """
+        self.count += 1
+        if failed:
+            self.failures += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+
+
+@dataclass
+class SlowCommand:
+    """
+    A command that was slow to complete.
+    """
+
+    command: str
+    time: float
+    duration: float
+    failed: bool
+
+
+class CommandStats:
+    """
+    Records the commands ran for a session, periodically writing the stats to a
+    file while started.
+    """
+
+    def __init__(self, slow_time: float = SLOW_COMMAND_TIME) -> None:
+        """
+        Create a CommandStats instance.
+
+        :param slow_time: time for a command to be considered slow
+        """
+        self.slow_time: float = slow_time
+        self.lock: threading.Lock = threading.Lock()
+        self.stats: Dict[str, CommandStat] = {}
+        self.slow: Deque[SlowCommand] = collections.deque(maxlen=SLOW_COMMANDS)
+        self.path: Optional[str] = None
+        self.interval: float = COMMAND_STATS_INTERVAL
+        self.stopped: threading.Event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    @contextlib.contextmanager
+    def measure(self, args: str, name: str = None) -> Iterator[None]:
+        """
+        Record a command ran within this context, as failed when it raises a
+        command error.
+
+        :param args: command being ran
+        :param name: name to record command as, defaults to the executable name
+        :return: nothing
+        """
+        start = time.monotonic()
+        failed = False
+        try:
+            yield
+        except CoreCommandError:
+            failed = True
+            raise
+        finally:
+            self.record(args, time.monotonic() - start, failed, name)
+
+    def record(
+        self, args: str, duration: float, failed: bool, name: str = None
+    ) -> None:
+        """
+        Record a command that was ran.
+
+        :param args: command ran
+        :param duration: time command took
+        :param failed: True if command failed, False otherwise
+        :param name: name to record command as, defaults to the executable name
+        :return: nothing
+        """
+        if name is None:
+            name = command_name(args)
+        slow = duration >= self.slow_time
+        with self.lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = CommandStat(name=name)
+                self.stats[name] = stat
+            stat.add(duration, failed)
+            if slow:
+                self.slow.append(SlowCommand(args, time.time(), duration, failed))
+        if slow:
+            logging.warning("slow command(%.3fs): %s", duration, args)
+
+    def reset(self) -> None:
+        """
+        Clear recorded stats.
+
+        :return: nothing
+        """
+        with self.lock:
+            self.stats = {}
+            self.slow.clear()
+
+    def get_stats(self) -> Tuple[List[CommandStat], List[SlowCommand]]:
+        """
+        Retrieve a copy of the recorded stats.
+
+        :return: stats for each executable and the most recent slow commands
+        """
+        with self.lock:
+            stats = []
+            for stat in self.stats.values():
+                stats.append(dataclasses.replace(stat, buckets=list(stat.buckets)))
+            return stats, list(self.slow)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert recorded stats to a dict for serializing.
+
+        :return: stats as a dict
+        """
+        stats, slow = self.get_stats()
+        return dict(
+            buckets=list(LATENCY_BUCKETS),
+            commands=[dataclasses.asdict(x) for x in stats],
+            slow=[dataclasses.asdict(x) for x in slow],
+        )
+
+    def write(self) -> None:
+        """
+        Write recorded stats to the configured file.
+
+        :return: nothing
+        """
+        if self.path is None:
+            return
+        data = self.to_dict()
+        try:
+            with open(self.path, "w") as f:
+                json.dump(data, f, indent=2)
+        except IOError:
+            logging.exception("error writing command stats")
+
+    def start(self, path: str, interval: float = COMMAND_STATS_INTERVAL) -> None:
+        """
+        Start writing stats to a file on an interval.
+
+        :param path: path of file to write
+        :param interval: time between writes
+        :return: nothing
+        """
+        self.stop()
+        self.path = path
+        self.interval = interval
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop writing stats on an interval, writing them a final time.
+
+        :return: nothing
+        """
+        if self.thread is None:
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+        self.write()
+
+    def run(self) -> None:
+        """
+        Thread target writing stats until stopped.
+
+        :return: nothing
+        """
+        while not self.stopped.wait(self.interval):
+            self.write()
@@ -91,6 +91,8 @@ class NodeOptions:
     server: str = None
     image: str = None
     emane: str = None
+    cpu_limit: float = None
+    memory_limit: int = None
 
     def set_position(self, x: float, y: float) -> None:
         """
@@ -7,13 +7,20 @@ import os
 import threading
 from collections import OrderedDict
 from tempfile import NamedTemporaryFile
-from typing import TYPE_CHECKING, Callable, Dict, Tuple
+from typing import TYPE_CHECKING, Callable, ContextManager, Dict, List, Optional, Tuple
 
 import netaddr
 from fabric import Connection
 from invoke import UnexpectedExit
 
 from core import utils
+from core.emulator.commandstats import command_name, untracked
+from core.emulator.remoteagent import (
+    AgentError,
+    AgentStats,
+    RemoteAgent,
+    command_request,
+)
 from core.errors import CoreCommandError, CoreError
 from core.executables import get_requirements
 from core.nodes.interface import GreTap
@@ -21,6 +28,7 @@ from core.nodes.network import CoreNetwork, CtrlNet
 
 if TYPE_CHECKING:
     from core.emulator.session import Session
+    from core.nodes.base import NodeBase
 
 LOCK = threading.Lock()
 CMD_HIDE = True
@@ -31,20 +39,117 @@ class DistributedServer:
     Provides distributed server interactions.
     """
 
-    def __init__(self, name: str, host: str) -> None:
+    def __init__(
+        self, name: str, host: str, use_agent: bool = False, session: "Session" = None
+    ) -> None:
         """
         Create a DistributedServer instance.
 
         :param name: convenience name to associate with host
         :param host: host to connect to
+        :param use_agent: True to run commands and write files using a long running
+            agent on the server, False to use a new ssh channel for each
+        :param session: session to track remote commands for, None to not track
         """
         self.name: str = name
         self.host: str = host
+        self.session: Optional["Session"] = session
         self.conn: Connection = Connection(host, user="root")
         self.lock: threading.Lock = threading.Lock()
+        self.use_agent: bool = use_agent
+        self.agent: Optional[RemoteAgent] = None
+        self.agent_lock: threading.Lock = threading.Lock()
+
+    def get_agent(self) -> Optional[RemoteAgent]:
+        """
+        Retrieve the agent for this server, launching it when not running.
+
+        :return: agent, None when not using an agent or it failed to launch
+        """
+        if not self.use_agent:
+            return None
+        with self.agent_lock:
+            if self.agent is None:
+                agent = RemoteAgent(self.conn)
+                try:
+                    agent.start()
+                except AgentError:
+                    logging.exception(
+                        "server(%s) falling back to ssh commands", self.name
+                    )
+                    self.use_agent = False
+                    return None
+                self.agent = agent
+            return self.agent
+
+    def _agent_failed(self) -> None:
+        """
+        Stop using a failed agent, falling back to a new ssh channel for each
+        command and file.
+
+        :return: nothing
+        """
+        logging.exception(
+            "server(%s) agent failed, falling back to ssh commands", self.name
+        )
+        with self.agent_lock:
+            agent = self.agent
+            self.agent = None
+            self.use_agent = False
+        if agent:
+            agent.close()
+
+    def agent_stats(self) -> Optional[AgentStats]:
+        """
+        Retrieve counts and latencies for the agent on this server.
+
+        :return: agent stats, None when an agent is not running
+        """
+        agent = self.agent
+        if agent is None:
+            return None
+        return agent.stats()
+
+    def close(self) -> None:
+        """
+        Stop the agent on this server, it will be launched again when next used.
+
+        :return: nothing
+        """
+        with self.agent_lock:
+            agent = self.agent
+            self.agent = None
+        if agent:
+            logging.info("server(%s) agent stats: %s", self.name, agent.stats())
+            agent.close()
+
+    def track_cmd(
+        self, cmd: str, node: Optional["NodeBase"], name: Optional[str], count: int = 1
+    ) -> ContextManager[None]:
+        """
+        Track a command ran on this server for its session, recorded separately
+        from commands ran locally.
+
+        :param cmd: command being ran
+        :param node: node command is ran for, None when not for a node
+        :param name: name to record command as, defaults to the executable name
+        :param count: number of commands ran, greater than one for a batch
+        :return: context to run command within
+        """
+        if self.session is None:
+            return untracked()
+        if name is None:
+            name = command_name(cmd)
+        return self.session.track_cmd(cmd, node, f"remote:{name}", count)
 
     def remote_cmd(
-        self, cmd: str, env: Dict[str, str] = None, cwd: str = None, wait: bool = True
+        self,
+        cmd: str,
+        env: Dict[str, str] = None,
+        cwd: str = None,
+        wait: bool = True,
+        node: "NodeBase" = None,
+        name: str = None,
     ) -> str:
         """
         Run command remotely using server connection.
@@ -54,16 +159,29 @@ class DistributedServer:
         :param cwd: directory to run command in, defaults to None, which is the
             user's home directory
         :param wait: True to wait for status, False to background process
+        :param node: node command is ran for, None when not for a node
+        :param name: name to record command as, defaults to the executable name
         :return: stdout when success
         :raises CoreCommandError: when a non-zero exit status occurs
         """
+        with self.track_cmd(cmd, node, name):
+            return self._remote_cmd(cmd, env, cwd, wait)
 
-        replace_env = env is not None
-        if not wait:
-            cmd += " &"
+    def _remote_cmd(
+        self, cmd: str, env: Optional[Dict[str, str]], cwd: Optional[str], wait: bool
+    ) -> str:
         logging.debug(
             "remote cmd server(%s) cwd(%s) wait(%s): %s", self.host, cwd, wait, cmd
         )
+        agent = self.get_agent()
+        if agent:
+            try:
+                return agent.run(cmd, env, cwd, wait)
+            except AgentError:
+                self._agent_failed()
+        replace_env = env is not None
+        if not wait:
+            cmd += " &"
         try:
             if cwd is None:
                 result = self.conn.run(
@@ -79,6 +197,37 @@ class DistributedServer:
             stdout, stderr = e.streams_for_display()
             raise CoreCommandError(e.result.exited, cmd, stdout, stderr)
 
+    def remote_cmds(
+        self, cmds: List[str], env: Dict[str, str] = None, cwd: str = None
+    ) -> List[str]:
+        """
+        Run commands remotely in order, as a single batch when using an agent,
+        stopping at the first command with a non-zero exit status.
+
+        :param cmds: commands to run
+        :param env: environment for remote commands, default is None
+        :param cwd: directory to run commands in, defaults to None, which is the
+            user's home directory
+        :return: stdout of each command when success
+        :raises CoreCommandError: when a non-zero exit status occurs
+        """
+        agent = self.get_agent()
+        if agent:
+            requests = [command_request(x, env, cwd) for x in cmds]
+            try:
+                with self.track_cmd("; ".join(cmds), None, "batch", len(cmds)):
+                    results = agent.run_batch(requests)
+            except AgentError:
+                self._agent_failed()
+            else:
+                outputs = []
+                for cmd, (status, stdout, stderr) in zip(cmds, results):
+                    if status != 0:
+                        raise CoreCommandError(status, cmd, stdout, stderr)
+                    outputs.append(stdout)
+                return outputs
+        return [self.remote_cmd(x, env, cwd) for x in cmds]
+
     def remote_put(self, source: str, destination: str) -> None:
         """
         Push file to remote server.
@@ -87,6 +236,16 @@ class DistributedServer:
         :param destination: destination file location
         :return: nothing
         """
+        agent = self.get_agent()
+        if agent:
+            with open(source, "rb") as f:
+                data = f.read()
+            mode = os.stat(source).st_mode & 0o7777
+            try:
+                agent.put(destination, data, mode)
+                return
+            except AgentError:
+                self._agent_failed()
         with self.lock:
             self.conn.put(source, destination)
 
@@ -99,6 +258,13 @@ class DistributedServer:
         :param data: data to store in remote file
         :return: nothing
         """
+        agent = self.get_agent()
+        if agent:
+            try:
+                agent.put(destination, data.encode("utf-8"))
+                return
+            except AgentError:
+                self._agent_failed()
         with self.lock:
             temp = NamedTemporaryFile(delete=False)
             temp.write(data.encode("utf-8"))
@@ -134,15 +300,18 @@ class DistributedController:
         :return: nothing
         :raises CoreError: when there is an error validating server
         """
-        server = DistributedServer(name, host)
-        for requirement in get_requirements(self.session.use_ovs()):
-            try:
-                server.remote_cmd(f"which {requirement}")
-            except CoreCommandError:
-                raise CoreError(
-                    f"server({server.name}) failed validation for "
-                    f"command({requirement})"
-                )
+        server = DistributedServer(
+            name, host, self.session.use_remote_agent(), self.session
+        )
+        checks = {f"which {x}": x for x in get_requirements(self.session.use_ovs())}
+        try:
+            server.remote_cmds(list(checks))
+        except CoreCommandError as e:
+            server.close()
+            raise CoreError(
+                f"server({server.name}) failed validation for "
+                f"command({checks[e.cmd]})"
+            )
         self.servers[name] = server
         cmd = f"mkdir -p {self.session.session_dir}"
         server.remote_cmd(cmd)
@@ -176,6 +345,7 @@ class DistributedController:
             server = self.servers[name]
             cmd = f"rm -rf {self.session.session_dir}"
             server.remote_cmd(cmd)
+            server.close()
 
         # clear tunnels
         self.tunnels.clear()
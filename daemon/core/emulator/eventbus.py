@@ -0,0 +1,187 @@
+"""
+eventbus.py: asynchronous delivery of session broadcasts. Each handler has its own
+bounded queue and worker thread, so a slow handler only delays its own events rather
+than the emulation thread broadcasting them or any other handler, and drops its
+oldest events once it falls too far behind.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from queue import Empty, Full, Queue
+from typing import Any, Callable, Dict, Iterable, List
+
+# time a worker waits without events before exiting
+IDLE_TIMEOUT: float = 5.0
+# default max number of events queued for a handler
+DEFAULT_QUEUE_SIZE: int = 10000
+# number of idle handlers to keep statistics for
+MAX_STOPPED: int = 100
+
+
+@dataclass
+class DispatchStats:
+    """
+    Dispatch statistics for a session broadcast handler.
+    """
+
+    name: str
+    dispatched: int = 0
+    pending: int = 0
+    errors: int = 0
+    dropped: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    def average_latency(self) -> float:
+        """
+        Average time events waited before being handled.
+
+        :return: average latency in seconds
+        """
+        if not self.dispatched:
+            return 0.0
+        return self.total_latency / self.dispatched
+
+
+class HandlerWorker:
+    """
+    Delivers queued events to a single handler from a dedicated thread.
+    """
+
+    def __init__(self, bus: "EventBus", handler: Callable[[Any], None]) -> None:
+        """
+        Create a HandlerWorker instance.
+
+        :param bus: bus this worker belongs to
+        :param handler: handler to deliver events to
+        """
+        self.bus: "EventBus" = bus
+        self.handler: Callable[[Any], None] = handler
+        self.queue: Queue = Queue(bus.queue_size)
+        self.stats: DispatchStats = DispatchStats(name=repr(handler))
+        self.thread: threading.Thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def put(self, data: Any) -> None:
+        """
+        Queue an event for delivery, dropping the oldest queued event when the
+        queue is full.
+
+        :param data: event to deliver
+        :return: nothing
+        """
+        item = (time.monotonic(), data)
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except Full:
+                pass
+            try:
+                self.queue.get_nowait()
+            except Empty:
+                continue
+            self.queue.task_done()
+            self.stats.dropped += 1
+
+    def run(self) -> None:
+        """
+        Thread target delivering queued events, exiting once idle.
+
+        :return: nothing
+        """
+        while True:
+            try:
+                published, data = self.queue.get(timeout=IDLE_TIMEOUT)
+            except Empty:
+                if self.bus.remove_idle(self):
+                    break
+                continue
+            latency = time.monotonic() - published
+            stats = self.stats
+            stats.dispatched += 1
+            stats.total_latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
+            try:
+                self.handler(data)
+            except Exception:
+                stats.errors += 1
+                logging.exception("error handling session broadcast: %s", data)
+            finally:
+                self.queue.task_done()
+
+
+class EventBus:
+    """
+    Dispatches session broadcasts to handlers asynchronously, from a worker per
+    handler.
+    """
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE) -> None:
+        """
+        Create an EventBus instance.
+
+        :param queue_size: max number of events queued for each handler
+        """
+        self.queue_size: int = queue_size
+        self.lock: threading.Lock = threading.Lock()
+        self.workers: Dict[Callable[[Any], None], HandlerWorker] = {}
+        self.stopped: Dict[str, DispatchStats] = {}
+
+    def publish(self, handlers: Iterable[Callable[[Any], None]], data: Any) -> None:
+        """
+        Queue an event for delivery to the provided handlers.
+
+        :param handlers: handlers to deliver event to
+        :param data: event to deliver
+        :return: nothing
+        """
+        with self.lock:
+            for handler in handlers:
+                worker = self.workers.get(handler)
+                if worker is None:
+                    worker = HandlerWorker(self, handler)
+                    self.workers[handler] = worker
+                worker.put(data)
+
+    def remove_idle(self, worker: HandlerWorker) -> bool:
+        """
+        Remove a worker that has not received events, when it is still idle.
+
+        :param worker: worker to remove
+        :return: True if removed, False if events are now queued for it
+        """
+        with self.lock:
+            if not worker.queue.empty():
+                return False
+            self.workers.pop(worker.handler, None)
+            self.stopped[worker.stats.name] = worker.stats
+            if len(self.stopped) > MAX_STOPPED:
+                del self.stopped[next(iter(self.stopped))]
+            return True
+
+    def join(self) -> None:
+        """
+        Wait for all queued events to be delivered.
+
+        :return: nothing
+        """
+        with self.lock:
+            workers = list(self.workers.values())
+        for worker in workers:
+            worker.queue.join()
+
+    def stats(self) -> List[DispatchStats]:
+        """
+        Retrieve dispatch statistics for current and recently idle handlers.
+
+        :return: dispatch statistics
+        """
+        with self.lock:
+            stats = dict(self.stopped)
+            for worker in self.workers.values():
+                worker.stats.pending = worker.queue.qsize()
+                stats[worker.stats.name] = worker.stats
+        return list(stats.values())
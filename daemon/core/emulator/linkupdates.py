@@ -0,0 +1,178 @@
+"""
+linkupdates.py: applies a high rate of link option changes for a session. Updates
+are coalesced per link and applied once per tick, recording the resulting tc
+commands to apply together when deferred apply is enabled.
+"""
+
+import functools
+import logging
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from core.emulator.data import InterfaceData, LinkData, LinkOptions
+from core.emulator.enumerations import MessageFlags
+from core.errors import CoreCommandError, CoreError
+from core.nodes.netbatch import NetBatch
+
+if TYPE_CHECKING:
+    from core.emulator.session import Session
+
+# default time between applying link updates
+LINK_UPDATE_INTERVAL: float = 0.1
+# node1 id, node2 id, iface1 id, iface2 id
+LinkKey = Tuple[int, int, Optional[int], Optional[int]]
+
+
+class LinkUpdates:
+    """
+    Coalesces link option updates per link, applying the latest options for each
+    link on a fixed interval.
+    """
+
+    def __init__(
+        self, session: "Session", interval: float = LINK_UPDATE_INTERVAL
+    ) -> None:
+        """
+        Create a LinkUpdates instance.
+
+        :param session: session to update links for
+        :param interval: time between applying updates
+        """
+        self.session: "Session" = session
+        self.interval: float = interval
+        self.lock: threading.Lock = threading.Lock()
+        self.pending: Dict[LinkKey, Tuple[LinkOptions, Optional[str]]] = {}
+        self.received: int = 0
+        self.applied: int = 0
+        self.dropped: int = 0
+        self.failed: int = 0
+        self.stopped: threading.Event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Start applying updates on the configured interval.
+
+        :return: nothing
+        """
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop applying updates on an interval and apply any still pending.
+
+        :return: nothing
+        """
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.apply()
+
+    def run(self) -> None:
+        """
+        Thread target applying updates until stopped.
+
+        :return: nothing
+        """
+        while not self.stopped.wait(self.interval):
+            self.apply()
+
+    def add(
+        self,
+        node1_id: int,
+        node2_id: int,
+        iface1_id: Optional[int],
+        iface2_id: Optional[int],
+        options: LinkOptions,
+        source: str = None,
+    ) -> None:
+        """
+        Add a link update, replacing any update pending for the same link.
+
+        :param node1_id: node one id
+        :param node2_id: node two id
+        :param iface1_id: interface id for node one
+        :param iface2_id: interface id for node two
+        :param options: options to set for link
+        :param source: source of update, for broadcasts
+        :return: nothing
+        """
+        key = (node1_id, node2_id, iface1_id, iface2_id)
+        with self.lock:
+            self.received += 1
+            if key in self.pending:
+                self.dropped += 1
+            self.pending[key] = (options, source)
+
+    def apply(self) -> None:
+        """
+        Apply the latest pending update for each link, broadcasting the links that
+        were updated.
+
+        :return: nothing
+        """
+        with self.lock:
+            pending = self.pending
+            self.pending = {}
+        if not pending:
+            return
+        # record network commands to a batch for this tick, when not already
+        # deferring commands while the session is being built
+        update_link = self.session.update_link
+        net_batch = None
+        if self.session.use_deferred_apply() and not self.session.net_batch.active:
+            net_batch = NetBatch()
+            net_batch.start()
+            update_link = functools.partial(net_batch.call, update_link)
+        link_datas = []
+        failed = 0
+        try:
+            for key, (options, source) in pending.items():
+                node1_id, node2_id, iface1_id, iface2_id = key
+                try:
+                    update_link(node1_id, node2_id, iface1_id, iface2_id, options)
+                except (CoreError, CoreCommandError):
+                    logging.exception("error updating link: %s", key)
+                    failed += 1
+                    continue
+                link_data = LinkData(
+                    message_type=MessageFlags.NONE,
+                    node1_id=node1_id,
+                    node2_id=node2_id,
+                    iface1=InterfaceData(id=iface1_id),
+                    iface2=InterfaceData(id=iface2_id),
+                    options=options,
+                    source=source,
+                )
+                link_datas.append(link_data)
+        finally:
+            if net_batch:
+                try:
+                    net_batch.apply()
+                except CoreCommandError:
+                    logging.exception("error applying link updates")
+                    failed += len(link_datas)
+                    link_datas = []
+        with self.lock:
+            self.applied += len(link_datas)
+            self.failed += failed
+        if link_datas:
+            self.session.broadcast_links(link_datas)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Retrieve counts of updates received, applied, dropped due to being
+        replaced by a newer update, and failed.
+
+        :return: update counts
+        """
+        with self.lock:
+            return dict(
+                received=self.received,
+                applied=self.applied,
+                dropped=self.dropped,
+                failed=self.failed,
+            )
@@ -0,0 +1,163 @@
+"""
+nodemoves.py: applies a high rate of node movements for a session. Moves are
+queued and applied in order once per tick, converting all geo moves received
+within the tick to x,y positions together.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from core.errors import CoreCommandError, CoreError
+from core.nodes.base import NodeBase
+
+if TYPE_CHECKING:
+    from core.emulator.session import Session
+
+# default time between applying node moves
+NODE_MOVE_INTERVAL: float = 0.05
+
+
+@dataclass
+class NodeMove:
+    """
+    A pending move of a node, to either a x,y position or a lat,lon,alt location.
+    """
+
+    node: NodeBase
+    x: float = None
+    y: float = None
+    lat: float = None
+    lon: float = None
+    alt: float = None
+    source: str = None
+
+    @property
+    def has_geo(self) -> bool:
+        """
+        Check if this move is to a lat,lon,alt location.
+
+        :return: True if a geo move, False otherwise
+        """
+        return self.lat is not None
+
+
+class NodeMoves:
+    """
+    Queues node moves, applying every move received on a fixed interval so geo
+    moves can be converted together.
+    """
+
+    def __init__(
+        self, session: "Session", interval: float = NODE_MOVE_INTERVAL
+    ) -> None:
+        """
+        Create a NodeMoves instance.
+
+        :param session: session to move nodes for
+        :param interval: time between applying moves
+        """
+        self.session: "Session" = session
+        self.interval: float = interval
+        self.lock: threading.Lock = threading.Lock()
+        self.pending: List[NodeMove] = []
+        self.received: int = 0
+        self.applied: int = 0
+        self.failed: int = 0
+        self.stopped: threading.Event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Start applying moves on the configured interval.
+
+        :return: nothing
+        """
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop applying moves on an interval and apply any still pending.
+
+        :return: nothing
+        """
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.apply()
+
+    def run(self) -> None:
+        """
+        Thread target applying moves until stopped.
+
+        :return: nothing
+        """
+        while not self.stopped.wait(self.interval):
+            self.apply()
+
+    def add(self, move: NodeMove) -> None:
+        """
+        Add a node move, to be applied after any moves already pending.
+
+        :param move: node move to add
+        :return: nothing
+        """
+        with self.lock:
+            self.received += 1
+            self.pending.append(move)
+
+    def apply(self) -> None:
+        """
+        Apply pending moves in the order received, broadcasting each moved node.
+
+        :return: nothing
+        """
+        with self.lock:
+            pending = self.pending
+            self.pending = []
+        if not pending:
+            return
+        geo_moves = [x for x in pending if x.has_geo]
+        positions = self.session.location.getxyz_many(
+            [x.lat for x in geo_moves],
+            [x.lon for x in geo_moves],
+            [x.alt for x in geo_moves],
+        )
+        for move, (x, y, _) in zip(geo_moves, positions):
+            move.x = x
+            move.y = y
+        applied = 0
+        failed = 0
+        for move in pending:
+            node = move.node
+            try:
+                node.setposition(move.x, move.y, None)
+                if move.has_geo:
+                    node.position.set_geo(move.lon, move.lat, move.alt)
+                self.session.sdt.edit_node(node, move.lon, move.lat, move.alt)
+            except (CoreError, CoreCommandError):
+                logging.exception("error moving node: %s", node.name)
+                failed += 1
+                continue
+            applied += 1
+            # geo moves are broadcast without a source, as when editing a node
+            source = None if move.has_geo else move.source
+            self.session.broadcast_node(node, source=source)
+        with self.lock:
+            self.applied += applied
+            self.failed += failed
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Retrieve counts of moves received, applied, and failed.
+
+        :return: move counts
+        """
+        with self.lock:
+            return dict(
+                received=self.received, applied=self.applied, failed=self.failed
+            )
@@ -0,0 +1,348 @@
+"""
+profiler.py: records where time goes when starting a session, timing each startup
+phase, the boot of each node, and each stage of starting a service, along with
+the number of commands ran on the host for each.
+"""
+
+import concurrent.futures
+import contextlib
+import dataclasses
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from core.emulator.bootscheduler import BootStep
+    from core.nodes.base import NodeBase
+
+# file written to the session directory with the latest profile
+PROFILE_FILE: str = "profile.json"
+# stages timed when starting a service
+SERVICE_DIRS: str = "dirs"
+SERVICE_FILES: str = "files"
+SERVICE_STARTUP: str = "startup"
+SERVICE_VALIDATION: str = "validation"
+
+
+@dataclass
+class PhaseProfile:
+    """
+    Timing for a phase of starting a session, times are in seconds relative to
+    the start of the profile.
+    """
+
+    name: str
+    start: float
+    duration: float = 0.0
+    commands: int = 0
+
+
+@dataclass
+class NodeProfile:
+    """
+    Timing for booting a node, times are in seconds relative to the start of the
+    profile.
+    """
+
+    node_id: int
+    name: str
+    start: float = 0.0
+    duration: float = 0.0
+    commands: int = 0
+
+
+@dataclass
+class ServiceProfile:
+    """
+    Time in seconds spent in each stage of starting a service on a node.
+    """
+
+    node_id: int
+    name: str
+    dirs: float = 0.0
+    files: float = 0.0
+    startup: float = 0.0
+    validation: float = 0.0
+
+    @property
+    def duration(self) -> float:
+        """
+        Total time spent starting service.
+
+        :return: total time
+        """
+        return self.dirs + self.files + self.startup + self.validation
+
+
+@dataclass
+class SessionProfile:
+    """
+    Snapshot of the timings recorded for starting a session.
+    """
+
+    start_time: float
+    duration: float
+    commands: int
+    phases: List[PhaseProfile] = field(default_factory=list)
+    nodes: List[NodeProfile] = field(default_factory=list)
+    services: List[ServiceProfile] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert profile to a dict for serializing.
+
+        :return: profile as a dict
+        """
+        data = dataclasses.asdict(self)
+        for service, service_data in zip(self.services, data["services"]):
+            service_data["duration"] = service.duration
+        return data
+
+
+class SessionProfiler:
+    """
+    Records the timings for starting a session, shared by the threads booting
+    nodes and services.
+    """
+
+    def __init__(self) -> None:
+        """
+        Create a SessionProfiler instance.
+        """
+        self.lock: threading.Lock = threading.Lock()
+        self.start: float = time.monotonic()
+        self.start_time: float = time.time()
+        self.end: Optional[float] = None
+        self.commands: int = 0
+        self.phases: List[PhaseProfile] = []
+        self.current: Optional[PhaseProfile] = None
+        self.nodes: Dict[int, NodeProfile] = {}
+        self.services: Dict[Tuple[int, str], ServiceProfile] = {}
+
+    def reset(self) -> None:
+        """
+        Clear recorded timings and restart the profile from now.
+
+        :return: nothing
+        """
+        with self.lock:
+            self._reset()
+
+    def _reset(self) -> None:
+        self.start = time.monotonic()
+        self.start_time = time.time()
+        self.end = None
+        self.commands = 0
+        self.phases = []
+        self.current = None
+        self.nodes = {}
+        self.services = {}
+
+    def begin(self) -> None:
+        """
+        Restart the profile from now when instantiating a session, unless phases
+        of starting the session, such as creating its nodes, were already recorded
+        or instantiation is being resumed, such as after emane was configured.
+
+        :return: nothing
+        """
+        with self.lock:
+            if not self.phases or self.end is not None:
+                self._reset()
+
+    def finish(self) -> None:
+        """
+        Mark the end of starting a session, ending the duration of the profile.
+
+        :return: nothing
+        """
+        with self.lock:
+            self.end = time.monotonic()
+
+    def _recording(self) -> bool:
+        return self.end is None
+
+    def _node(self, node: "NodeBase") -> NodeProfile:
+        profile = self.nodes.get(node.id)
+        if profile is None:
+            profile = NodeProfile(node_id=node.id, name=node.name)
+            self.nodes[node.id] = profile
+        return profile
+
+    def _service(self, node: "NodeBase", name: str) -> ServiceProfile:
+        key = (node.id, name)
+        profile = self.services.get(key)
+        if profile is None:
+            profile = ServiceProfile(node_id=node.id, name=name)
+            self.services[key] = profile
+        return profile
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[PhaseProfile]:
+        """
+        Time a phase of starting a session, host commands ran while within the
+        phase are counted towards it. Phases ran after the session has started,
+        such as changes made at runtime, are timed but not recorded.
+
+        :param name: name of phase
+        :return: profile for phase
+        """
+        start = time.monotonic()
+        with self.lock:
+            profile = PhaseProfile(name=name, start=start - self.start)
+            recording = self._recording()
+            if recording:
+                self.phases.append(profile)
+                previous = self.current
+                self.current = profile
+        try:
+            yield profile
+        finally:
+            profile.duration = time.monotonic() - start
+            if recording:
+                with self.lock:
+                    self.current = previous
+            logging.debug("session phase(%s) time: %s", name, profile.duration)
+
+    @contextlib.contextmanager
+    def service_stage(self, node: "NodeBase", name: str, stage: str) -> Iterator[None]:
+        """
+        Time a stage of starting a service on a node.
+
+        :param node: node service is starting on
+        :param name: name of service
+        :param stage: stage of starting service
+        :return: nothing
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add_service_time(node, name, stage, time.monotonic() - start)
+
+    def add_service_time(
+        self, node: "NodeBase", name: str, stage: str, duration: float
+    ) -> None:
+        """
+        Add time spent within a stage of starting a service on a node.
+
+        :param node: node service is starting on
+        :param name: name of service
+        :param stage: stage of starting service
+        :param duration: time spent
+        :return: nothing
+        """
+        with self.lock:
+            if self._recording():
+                self._add_service_time(node, name, stage, duration)
+
+    def _add_service_time(
+        self, node: "NodeBase", name: str, stage: str, duration: float
+    ) -> None:
+        profile = self._service(node, name)
+        setattr(profile, stage, getattr(profile, stage) + duration)
+
+    def service_validation(
+        self, node: "NodeBase", name: str, future: Optional[concurrent.futures.Future]
+    ) -> None:
+        """
+        Time the validation of a service on a node, which completes with the
+        provided future.
+
+        :param node: node service is starting on
+        :param name: name of service
+        :param future: future completed when service is validated, None when
+            already validated
+        :return: nothing
+        """
+        if future is None:
+            return
+        with self.lock:
+            if not self._recording():
+                return
+            profile_start = self.start
+        start = time.monotonic()
+
+        def validated(_: concurrent.futures.Future) -> None:
+            duration = time.monotonic() - start
+            with self.lock:
+                # validation may complete after the session has started, it is
+                # still recorded unless the profile has since been restarted
+                if self.start == profile_start:
+                    self._add_service_time(node, name, SERVICE_VALIDATION, duration)
+
+        future.add_done_callback(validated)
+
+    def command(self, node: Optional["NodeBase"], count: int = 1) -> None:
+        """
+        Count a command ran on the host, ignored once the session has started.
+
+        :param node: node command was ran for, None when not for a node
+        :param count: number of commands ran, greater than one for batches
+        :return: nothing
+        """
+        with self.lock:
+            if not self._recording():
+                return
+            self.commands += count
+            if self.current is not None:
+                self.current.commands += count
+            if node is not None:
+                self._node(node).commands += count
+
+    def add_boot_steps(self, steps: List["BootStep"]) -> None:
+        """
+        Record the time each node took to boot, from the first of its boot steps
+        starting to the last completing.
+
+        :param steps: boot steps ran, grouped by node
+        :return: nothing
+        """
+        times = {}
+        for step in steps:
+            if step.key is None or step.start is None or step.duration is None:
+                continue
+            end = step.start + step.duration
+            start, last = times.get(step.key, (step.start, end))
+            times[step.key] = (min(start, step.start), max(last, end))
+        with self.lock:
+            if not self._recording():
+                return
+            for node, (start, end) in times.items():
+                profile = self._node(node)
+                profile.start = start - self.start
+                profile.duration = end - start
+
+    def profile(self) -> SessionProfile:
+        """
+        Create a snapshot of the recorded timings.
+
+        :return: session profile
+        """
+        with self.lock:
+            end = time.monotonic() if self.end is None else self.end
+            return SessionProfile(
+                start_time=self.start_time,
+                duration=end - self.start,
+                commands=self.commands,
+                phases=[dataclasses.replace(x) for x in self.phases],
+                nodes=[dataclasses.replace(x) for x in self.nodes.values()],
+                services=[dataclasses.replace(x) for x in self.services.values()],
+            )
+
+    def write(self, path: str) -> None:
+        """
+        Write a snapshot of the recorded timings to a json file.
+
+        :param path: path of file to write
+        :return: nothing
+        """
+        profile = self.profile()
+        try:
+            with open(path, "w") as f:
+                json.dump(profile.to_dict(), f, indent=2)
+        except IOError:
+            logging.exception("error writing session profile")
@@ -0,0 +1,442 @@
+"""
+remoteagent.py: long running agent for distributed servers. A single agent process
+is launched on a server over its existing ssh connection and runs commands and
+writes files sent to it over one channel, avoiding the new ssh channel and shell
+for every remote command, and the temp file and sftp transfer for every file.
+
+Frames use the same length prefixed json framing as the node executor. Every frame
+sent to the agent is a batch, with an id and a list of requests, and batches are
+ran concurrently by the agent, so many can be in flight over the channel at once.
+Every frame returned has the id of its batch and the results of its requests, in
+the same order. A batch stops running at the first request with a non-zero exit
+status, so fewer results may be returned.
+"""
+
+import base64
+import concurrent.futures
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from subprocess import DEVNULL, PIPE, Popen
+from typing import IO, TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from core.errors import CoreCommandError
+from core.executables import BASH
+from core.nodes.executor import read_frame, write_frame
+
+if TYPE_CHECKING:
+    from fabric import Connection
+    from paramiko import Channel
+
+# command ran on a distributed server to launch the agent
+AGENT_LAUNCH: str = f"{sys.executable} -m core.emulator.remoteagent"
+# number of batches the agent runs at once
+AGENT_WORKERS: int = 16
+AgentRequest = Dict[str, Any]
+AgentResult = Tuple[int, str, str]
+
+
+class AgentError(Exception):
+    """
+    Used when the remote agent can no longer be communicated with.
+    """
+
+    pass
+
+
+def command_request(
+    args: str, env: Dict[str, str] = None, cwd: str = None, wait: bool = True
+) -> AgentRequest:
+    """
+    Create a request to run a command using the agent.
+
+    :param args: command to run, using a shell
+    :param env: environment to run command with, replacing the agent environment,
+        default is None
+    :param cwd: directory to run command in, default is None
+    :param wait: True to wait for status, False to background process
+    :return: agent request
+    """
+    return dict(type="cmd", args=args, env=env, cwd=cwd, wait=wait)
+
+
+def file_request(path: str, data: bytes, mode: int = None) -> AgentRequest:
+    """
+    Create a request to write a file using the agent.
+
+    :param path: path of file to write
+    :param data: file contents
+    :param mode: permissions to set for file, default is None
+    :return: agent request
+    """
+    data = base64.b64encode(data).decode("ascii")
+    return dict(type="file", path=path, data=data, mode=mode)
+
+
+@dataclass
+class AgentStats:
+    """
+    Batches ran using a remote agent, times are in seconds.
+    """
+
+    batches: int
+    requests: int
+    failures: int
+    in_flight: int
+    max_in_flight: int
+    mean_latency: float
+    max_latency: float
+
+
+class RemoteAgent:
+    """
+    Client side of a long running agent on a distributed server.
+    """
+
+    def __init__(self, conn: "Connection", launch: str = AGENT_LAUNCH) -> None:
+        """
+        Create a RemoteAgent instance.
+
+        :param conn: connection to the distributed server
+        :param launch: command used to launch the agent
+        """
+        self.conn: "Connection" = conn
+        self.launch: str = launch
+        self.channel: Optional["Channel"] = None
+        self.reader: Optional[IO[bytes]] = None
+        self.writer: Optional[IO[bytes]] = None
+        self.thread: Optional[threading.Thread] = None
+        self.lock: threading.Lock = threading.Lock()
+        self.write_lock: threading.Lock = threading.Lock()
+        self.batch_id: int = 0
+        self.pending: Dict[int, Tuple[concurrent.futures.Future, float]] = {}
+        self.closed: bool = False
+        self.batches: int = 0
+        self.requests: int = 0
+        self.failures: int = 0
+        self.max_in_flight: int = 0
+        self.total_latency: float = 0.0
+        self.max_latency: float = 0.0
+
+    def start(self) -> None:
+        """
+        Launch the agent over a new channel of the existing connection.
+
+        :return: nothing
+        :raises AgentError: when the agent could not be launched
+        """
+        logging.debug("starting remote agent(%s): %s", self.conn.host, self.launch)
+        try:
+            self.conn.open()
+            channel = self.conn.client.get_transport().open_session()
+            channel.exec_command(self.launch)
+        except Exception as e:
+            raise AgentError(f"failed to launch agent: {e}")
+        self.channel = channel
+        self.reader = channel.makefile("rb")
+        self.writer = channel.makefile("wb")
+        self.thread = threading.Thread(target=self.read_results, daemon=True)
+        self.thread.start()
+
+    def running(self) -> bool:
+        """
+        Check if the agent is running.
+
+        :return: True if running, False otherwise
+        """
+        return (
+            not self.closed
+            and self.channel is not None
+            and not self.channel.exit_status_ready()
+        )
+
+    def submit(self, requests: List[AgentRequest]) -> concurrent.futures.Future:
+        """
+        Send a batch of requests to the agent, without waiting for its results.
+
+        :param requests: requests to run, in order
+        :return: future completed with the results of the batch, or an agent error
+        :raises AgentError: when the agent can not be communicated with
+        """
+        future = concurrent.futures.Future()
+        if not requests:
+            future.set_result([])
+            return future
+        with self.write_lock:
+            with self.lock:
+                if not self.running():
+                    raise AgentError("agent is not running")
+                batch_id = self.batch_id
+                self.batch_id += 1
+                self.pending[batch_id] = (future, time.monotonic())
+                self.max_in_flight = max(self.max_in_flight, len(self.pending))
+            try:
+                write_frame(self.writer, dict(id=batch_id, requests=requests))
+            except (OSError, ValueError) as e:
+                with self.lock:
+                    self.pending.pop(batch_id, None)
+                raise AgentError(f"agent communication error: {e}")
+        return future
+
+    def run_batch(self, requests: List[AgentRequest]) -> List[AgentResult]:
+        """
+        Run a batch of requests using the agent, with a single round trip.
+        Requests run in order and stop at the first non-zero exit status.
+
+        :param requests: requests to run
+        :return: exit status, stdout, and stderr for each request that was run
+        :raises AgentError: when the agent can not be communicated with
+        """
+        results = self.submit(requests).result()
+        if len(results) > len(requests):
+            raise AgentError("agent returned unexpected results")
+        return results
+
+    def run(
+        self, args: str, env: Dict[str, str] = None, cwd: str = None, wait: bool = True
+    ) -> str:
+        """
+        Run a command using the agent.
+
+        :param args: command to run
+        :param env: environment for command, default is None
+        :param cwd: directory to run command in, default is None
+        :param wait: True to wait for status, False to background process
+        :return: stdout
+        :raises CoreCommandError: when there is a non-zero exit status
+        :raises AgentError: when the agent can not be communicated with
+        """
+        request = command_request(args, env, cwd, wait)
+        status, stdout, stderr = self.run_batch([request])[0]
+        if status != 0:
+            raise CoreCommandError(status, args, stdout, stderr)
+        return stdout
+
+    def put(self, path: str, data: bytes, mode: int = None) -> None:
+        """
+        Write a file using the agent.
+
+        :param path: path of file to write
+        :param data: file contents
+        :param mode: permissions to set for file, default is None
+        :return: nothing
+        :raises IOError: when the file could not be written
+        :raises AgentError: when the agent can not be communicated with
+        """
+        status, _, stderr = self.run_batch([file_request(path, data, mode)])[0]
+        if status != 0:
+            raise IOError(f"error writing remote file({path}): {stderr}")
+
+    def read_results(self) -> None:
+        """
+        Thread target completing pending batches as their results are returned,
+        until the agent is closed.
+
+        :return: nothing
+        """
+        while True:
+            try:
+                frame = read_frame(self.reader)
+            except (OSError, ValueError):
+                logging.exception("error reading remote agent results")
+                frame = None
+            if frame is None:
+                break
+            with self.lock:
+                future, start = self.pending.pop(frame["id"], (None, None))
+                if future is None:
+                    continue
+                latency = time.monotonic() - start
+                results = [tuple(x) for x in frame["results"]]
+                self.batches += 1
+                self.requests += len(results)
+                if any(x[0] != 0 for x in results):
+                    self.failures += 1
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+            future.set_result(results)
+        with self.lock:
+            self.closed = True
+            pending = self.pending
+            self.pending = {}
+        for future, _ in pending.values():
+            future.set_exception(AgentError("agent closed unexpectedly"))
+
+    def stats(self) -> AgentStats:
+        """
+        Retrieve counts and latencies of batches ran using the agent.
+
+        :return: agent stats
+        """
+        with self.lock:
+            mean_latency = 0.0
+            if self.batches:
+                mean_latency = self.total_latency / self.batches
+            return AgentStats(
+                batches=self.batches,
+                requests=self.requests,
+                failures=self.failures,
+                in_flight=len(self.pending),
+                max_in_flight=self.max_in_flight,
+                mean_latency=mean_latency,
+                max_latency=self.max_latency,
+            )
+
+    def close(self) -> None:
+        """
+        Stop the agent, failing any batches still pending.
+
+        :return: nothing
+        """
+        with self.write_lock:
+            if self.channel is None:
+                return
+            try:
+                self.channel.shutdown_write()
+            except (OSError, EOFError):
+                pass
+            self.channel.close()
+            self.channel = None
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+
+class AgentWorker:
+    """
+    Agent side, runs on the distributed server.
+    """
+
+    def __init__(
+        self, reader: IO[bytes], writer: IO[bytes], workers: int = AGENT_WORKERS
+    ) -> None:
+        """
+        Create an AgentWorker instance.
+
+        :param reader: stream to read batches from
+        :param writer: stream to write results to
+        :param workers: number of batches to run at once
+        """
+        self.reader: IO[bytes] = reader
+        self.writer: IO[bytes] = writer
+        self.workers: int = workers
+        self.lock: threading.Lock = threading.Lock()
+        self.detached: List[Popen] = []
+
+    def run_command(self, request: AgentRequest) -> AgentResult:
+        """
+        Run a command request.
+
+        :param request: request to run
+        :return: exit status, stdout, and stderr
+        """
+        args = [BASH, "-c", request["args"]]
+        env = request.get("env")
+        cwd = request.get("cwd")
+        try:
+            if not request.get("wait", True):
+                p = Popen(
+                    args,
+                    stdin=DEVNULL,
+                    stdout=DEVNULL,
+                    stderr=DEVNULL,
+                    env=env,
+                    cwd=cwd,
+                    start_new_session=True,
+                )
+                with self.lock:
+                    self.detached.append(p)
+                return 0, "", ""
+            p = Popen(args, stdin=DEVNULL, stdout=PIPE, stderr=PIPE, env=env, cwd=cwd)
+            stdout, stderr = p.communicate()
+            stdout = stdout.decode("utf-8", "replace").strip()
+            stderr = stderr.decode("utf-8", "replace").strip()
+            return p.returncode, stdout, stderr
+        except OSError as e:
+            return 1, "", str(e)
+
+    def write_file(self, request: AgentRequest) -> AgentResult:
+        """
+        Run a file write request.
+
+        :param request: request to run
+        :return: exit status, stdout, and stderr
+        """
+        path = request["path"]
+        mode = request.get("mode")
+        try:
+            with open(path, "wb") as f:
+                f.write(base64.b64decode(request["data"]))
+            if mode is not None:
+                os.chmod(path, mode)
+            return 0, "", ""
+        except OSError as e:
+            return 1, "", str(e)
+
+    def run_request(self, request: AgentRequest) -> AgentResult:
+        """
+        Run a single request.
+
+        :param request: request to run
+        :return: exit status, stdout, and stderr
+        """
+        request_type = request.get("type")
+        if request_type == "cmd":
+            return self.run_command(request)
+        elif request_type == "file":
+            return self.write_file(request)
+        else:
+            return 1, "", f"unknown request type: {request_type}"
+
+    def run_batch(self, batch: Dict[str, Any]) -> None:
+        """
+        Run a batch of requests in order and write its results.
+
+        :param batch: batch to run
+        :return: nothing
+        """
+        results = []
+        for request in batch["requests"]:
+            try:
+                result = self.run_request(request)
+            except Exception as e:
+                result = (1, "", f"invalid request: {e}")
+            results.append(result)
+            if result[0] != 0:
+                break
+        with self.lock:
+            write_frame(self.writer, dict(id=batch["id"], results=results))
+            self.detached = [x for x in self.detached if x.poll() is None]
+
+    def serve(self) -> None:
+        """
+        Serve batches until the reader is closed, waiting for running batches
+        to complete.
+
+        :return: nothing
+        """
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+            while True:
+                batch = read_frame(self.reader)
+                if batch is None:
+                    break
+                executor.submit(self.run_batch, batch)
+
+
+def main() -> None:
+    # take ownership of stdio, so commands never write into the framed stream
+    reader = os.fdopen(os.dup(sys.stdin.fileno()), "rb", buffering=0)
+    writer = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    null_fd = os.open(os.devnull, os.O_RDWR)
+    for fd in (sys.stdin.fileno(), sys.stdout.fileno(), sys.stderr.fileno()):
+        os.dup2(null_fd, fd)
+    os.close(null_fd)
+    worker = AgentWorker(reader, writer)
+    worker.serve()
+
+
+if __name__ == "__main__":
+    main()
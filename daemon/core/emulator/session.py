@@ -3,6 +3,7 @@ session.py: defines the Session class used by the core-daemon daemon program
 that manages a CORE session.
 """
 
+import itertools
 import logging
 import os
 import pwd
@@ -11,12 +12,26 @@ import subprocess
 import tempfile
 import threading
 import time
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type, TypeVar
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
 from core import constants, utils
+from core.configservice.dependencies import ConfigServiceDependencies
 from core.configservice.manager import ConfigServiceManager
 from core.emane.emanemanager import EmaneManager, EmaneState
 from core.emane.nodes import EmaneNet
+from core.emulator.bootscheduler import BootScheduler, BootStep
+from core.emulator.commandstats import COMMAND_STATS_FILE, CommandStats, untracked
 from core.emulator.data import (
     ConfigData,
     EventData,
@@ -36,7 +51,11 @@ from core.emulator.enumerations import (
     MessageFlags,
     NodeTypes,
 )
+from core.emulator.eventbus import EventBus
+from core.emulator.profiler import PROFILE_FILE, SessionProfiler
 from core.emulator.sessionconfig import SessionConfig
+from core.emulator.throughput import ThroughputMonitor
+from core.emulator.validation import ValidationScheduler
 from core.errors import CoreError
 from core.location.event import EventLoop
 from core.location.geo import GeoLocation
@@ -45,10 +64,13 @@ from core.nodes.base import CoreNetworkBase, CoreNode, CoreNodeBase, NodeBase
 from core.nodes.docker import DockerNode
 from core.nodes.interface import CoreInterface
 from core.nodes.lxd import LxcNode
+from core.nodes.netbatch import HOST_KEY, NetBatch
 from core.nodes.network import (
     CtrlNet,
+    EbtablesQueue,
     GreTapBridge,
     HubNode,
+    NftablesQueue,
     PtpNet,
     SwitchNode,
     TunnelNode,
@@ -56,7 +78,7 @@ from core.nodes.network import (
 )
 from core.nodes.physical import PhysicalNode, Rj45Node
 from core.plugins.sdt import Sdt
-from core.services.coreservices import CoreServices
+from core.services.coreservices import CoreServices, ServiceBootError
 from core.xml import corexml, corexmldeployment
 from core.xml.corexml import CoreXmlReader, CoreXmlWriter
 
@@ -115,6 +137,10 @@ class Session:
         # dict of nodes: all nodes and nets
         self.nodes: Dict[int, NodeBase] = {}
         self.nodes_lock = threading.Lock()
+        # versions of nodes and links, changed on mutation to invalidate caches
+        self.versions: itertools.count = itertools.count(1)
+        self.nodes_version: int = next(self.versions)
+        self.links_version: int = next(self.versions)
 
         # states and hooks handlers
         self.state: EventTypes = EventTypes.DEFINITION_STATE
@@ -133,6 +159,7 @@ class Session:
         self.file_handlers: List[Callable[[FileData], None]] = []
         self.config_handlers: List[Callable[[ConfigData], None]] = []
         self.shutdown_handlers: List[Callable[[Session], None]] = []
+        self.event_bus: EventBus = EventBus()
 
         # session options/metadata
         self.options: SessionConfig = SessionConfig()
@@ -145,6 +172,18 @@ class Session:
 
         # distributed support and logic
         self.distributed: DistributedController = DistributedController(self)
+        self.net_batch: NetBatch = NetBatch()
+        self.boot_steps: List[BootStep] = []
+        self.validation: ValidationScheduler = ValidationScheduler()
+        # wlan link filtering, updated independently for each session
+        self.ebtables_queue: EbtablesQueue = EbtablesQueue()
+        self.nftables_queue: NftablesQueue = NftablesQueue()
+        # host devices indexed for sampling throughput
+        self.throughput: ThroughputMonitor = ThroughputMonitor()
+        # timings for starting the session
+        self.profiler: SessionProfiler = SessionProfiler()
+        # counts and latencies of commands, when enabled
+        self.command_stats: CommandStats = CommandStats()
 
         # initialize session feature helpers
         self.location: GeoLocation = GeoLocation()
@@ -220,6 +259,73 @@ class Session:
     def use_ovs(self) -> bool:
         return self.options.get_config("ovs") == "1"
 
+    def use_netlink(self) -> bool:
+        return self.options.get_config("netlink") == "1"
+
+    def use_nftables(self) -> bool:
+        return self.options.get_config("nftables") == "1"
+
+    def use_async_broadcast(self) -> bool:
+        return self.options.get_config("async_broadcast") == "1"
+
+    def use_deferred_apply(self) -> bool:
+        return self.options.get_config("deferred_apply") == "1"
+
+    def use_command_stats(self) -> bool:
+        return self.options.get_config("command_stats") == "1"
+
+    def use_remote_agent(self) -> bool:
+        return self.options.get_config("remote_agent") == "1"
+
+    def track_cmd(
+        self, args: str, node: Optional[NodeBase], name: str = None, count: int = 1
+    ) -> ContextManager[None]:
+        """
+        Track a command ran for this session, counting it towards the startup
+        profile and recording its latency when command stats are enabled.
+
+        :param args: command being ran
+        :param node: node command is ran for, None when not for a node
+        :param name: name to record command as, defaults to the executable name
+        :param count: number of commands ran, greater than one for a batch which
+            has its latency recorded as a whole
+        :return: context to run command within
+        """
+        self.profiler.command(node, count)
+        if self.use_command_stats():
+            return self.command_stats.measure(args, name)
+        return untracked()
+
+    def host_cmd(self, args: str, wait: bool = True, shell: bool = False) -> str:
+        """
+        Run a command on the local host for this session, not for any one node,
+        tracking it along with node commands.
+
+        :param args: command to run
+        :param wait: True to wait for status, False otherwise
+        :param shell: True to use shell, False otherwise
+        :return: combined stdout and stderr
+        :raises CoreCommandError: when a non-zero exit status occurs
+        """
+        with self.track_cmd(args, None):
+            return utils.cmd(args, wait=wait, shell=shell)
+
+    def deferred_run(
+        self, run: Callable[..., str], key: str = HOST_KEY
+    ) -> Callable[..., str]:
+        """
+        Retrieve the run function for a local net client, which records network
+        commands to apply during instantiation when deferred apply is enabled.
+
+        :param run: function used to run commands
+        :param key: key for the namespace commands are ran within, default is host
+        :return: run function for net client
+        """
+        if self.use_deferred_apply() and not self.use_netlink():
+            return self.net_batch.runner(key, run)
+        else:
+            return run
+
     def add_link(
         self,
         node1_id: int,
@@ -307,6 +413,8 @@ class Session:
             if isinstance(node2, TunnelNode):
                 logging.info("setting tunnel key for: %s", node2.name)
                 node2.setkey(key, iface2_data)
+        self.nodes_changed()
+        self.links_changed()
         self.sdt.add_link(node1_id, node2_id)
         return iface1, iface2
 
@@ -367,6 +475,8 @@ class Session:
                 node1.delete_iface(iface1_id)
             elif isinstance(node2, CoreNodeBase) and isinstance(node1, CoreNetworkBase):
                 node2.delete_iface(iface2_id)
+        self.nodes_changed()
+        self.links_changed()
         self.sdt.delete_link(node1_id, node2_id)
 
     def update_link(
@@ -461,6 +571,7 @@ class Session:
                 raise CoreError(
                     f"cannot update link node1({type(node1)}) node2({type(node2)})"
                 )
+        self.links_changed()
 
     def next_node_id(self) -> int:
         """
@@ -534,6 +645,9 @@ class Session:
         if isinstance(node, (CoreNode, PhysicalNode)):
             node.type = options.model
             logging.debug("set node type: %s", node.type)
+            has_limits = options.cpu_limit or options.memory_limit
+            if isinstance(node, CoreNode) and has_limits:
+                node.set_limits(options.cpu_limit, options.memory_limit)
             self.services.add_services(node, node.type, options.services)
 
             # add config services
@@ -558,6 +672,7 @@ class Session:
             self.add_remove_control_iface(node=node, remove=False)
             self.services.boot_services(node)
 
+        self.nodes_changed()
         self.sdt.add_node(node)
         return node
 
@@ -579,6 +694,7 @@ class Session:
         # update attributes
         node.canvas = options.canvas
         node.icon = options.icon
+        self.nodes_changed()
 
         # provide edits to sdt
         self.sdt.edit_node(node, options.lon, options.lat, options.alt)
@@ -711,6 +827,8 @@ class Session:
 
         :return: nothing
         """
+        self.net_batch.reset()
+        self.profiler.reset()
         self.emane.shutdown()
         self.delete_nodes()
         self.distributed.shutdown()
@@ -721,6 +839,7 @@ class Session:
         self.services.reset()
         self.mobility.config_reset()
         self.link_colors.clear()
+        self.command_stats.stop()
 
     def start_events(self) -> None:
         """
@@ -766,6 +885,9 @@ class Session:
         # shutdown sdt
         self.sdt.shutdown()
 
+        # stop any pending service validations
+        self.validation.shutdown()
+
         # remove this sessions working directory
         preserve = self.options.get_config("preservedir") == "1"
         if not preserve:
@@ -775,6 +897,21 @@ class Session:
         for handler in self.shutdown_handlers:
             handler(self)
 
+    def broadcast(self, handlers: List[Callable[[Any], None]], data: Any) -> None:
+        """
+        Provide data to handlers, using the session event bus when enabled so that
+        handlers run outside of the broadcasting thread.
+
+        :param handlers: handlers to provide data to
+        :param data: data to broadcast
+        :return: nothing
+        """
+        if self.use_async_broadcast():
+            self.event_bus.publish(handlers, data)
+        else:
+            for handler in handlers:
+                handler(data)
+
     def broadcast_event(self, event_data: EventData) -> None:
         """
         Handle event data that should be provided to event handler.
@@ -782,8 +919,7 @@ class Session:
         :param event_data: event data to send out
         :return: nothing
         """
-        for handler in self.event_handlers:
-            handler(event_data)
+        self.broadcast(self.event_handlers, event_data)
 
     def broadcast_exception(self, exception_data: ExceptionData) -> None:
         """
@@ -792,8 +928,7 @@ class Session:
         :param exception_data: exception data to send out
         :return: nothing
         """
-        for handler in self.exception_handlers:
-            handler(exception_data)
+        self.broadcast(self.exception_handlers, exception_data)
 
     def broadcast_node(
         self,
@@ -809,11 +944,33 @@ class Session:
         :param source: source of broadcast, None by default
         :return: nothing
         """
+        self.nodes_changed()
         if not node.apitype:
             return
         node_data = NodeData(node=node, message_type=message_type, source=source)
-        for handler in self.node_handlers:
-            handler(node_data)
+        self.broadcast(self.node_handlers, node_data)
+
+    def broadcast_nodes(
+        self,
+        nodes: List[NodeBase],
+        message_type: MessageFlags = MessageFlags.NONE,
+        source: str = None,
+    ) -> None:
+        """
+        Handle a group of changed nodes, providing node data for each to node
+        handlers within a single broadcast.
+
+        :param nodes: nodes to broadcast
+        :param message_type: type of message to broadcast, None by default
+        :param source: source of broadcast, None by default
+        :return: nothing
+        """
+        self.nodes_changed()
+        for node in nodes:
+            if not node.apitype:
+                continue
+            node_data = NodeData(node=node, message_type=message_type, source=source)
+            self.broadcast(self.node_handlers, node_data)
 
     def broadcast_file(self, file_data: FileData) -> None:
         """
@@ -822,8 +979,7 @@ class Session:
         :param file_data: file data to send out
         :return: nothing
         """
-        for handler in self.file_handlers:
-            handler(file_data)
+        self.broadcast(self.file_handlers, file_data)
 
     def broadcast_config(self, config_data: ConfigData) -> None:
         """
@@ -832,8 +988,7 @@ class Session:
         :param config_data: config data to send out
         :return: nothing
         """
-        for handler in self.config_handlers:
-            handler(config_data)
+        self.broadcast(self.config_handlers, config_data)
 
     def broadcast_link(self, link_data: LinkData) -> None:
         """
@@ -842,8 +997,36 @@ class Session:
         :param link_data: link data to send out
         :return: nothing
         """
-        for handler in self.link_handlers:
-            handler(link_data)
+        self.links_changed()
+        self.broadcast(self.link_handlers, link_data)
+
+    def broadcast_links(self, link_datas: List[LinkData]) -> None:
+        """
+        Handle a group of link data that should be provided to link handlers
+        within a single broadcast.
+
+        :param link_datas: link data to send out
+        :return: nothing
+        """
+        self.links_changed()
+        for link_data in link_datas:
+            self.broadcast(self.link_handlers, link_data)
+
+    def nodes_changed(self) -> None:
+        """
+        Mark session nodes as changed, invalidating cached views of nodes.
+
+        :return: nothing
+        """
+        self.nodes_version = next(self.versions)
+
+    def links_changed(self) -> None:
+        """
+        Mark session links as changed, invalidating cached views of links.
+
+        :return: nothing
+        """
+        self.links_version = next(self.versions)
 
     def set_state(self, state: EventTypes, send_event: bool = False) -> None:
         """
@@ -858,6 +1041,8 @@ class Session:
         self.state = state
         self.state_time = time.monotonic()
         logging.info("changing session(%s) to state %s", self.id, state.name)
+        if state == EventTypes.CONFIGURATION_STATE and self.use_deferred_apply():
+            self.net_batch.start()
         self.write_state(state)
         self.run_hooks(state)
         self.run_state_hooks(state)
@@ -1074,6 +1259,7 @@ class Session:
                 node.shutdown()
                 raise CoreError(f"duplicate node id {node.id} for {node.name}")
             self.nodes[node.id] = node
+        self.nodes_changed()
         if start:
             node.startup()
         return node
@@ -1111,6 +1297,8 @@ class Session:
                 logging.info("deleted node(%s)", node.name)
         if node:
             node.shutdown()
+            self.nodes_changed()
+            self.links_changed()
             self.sdt.delete_node(_id)
             self.check_shutdown()
         return node is not None
@@ -1126,6 +1314,8 @@ class Session:
                 self.sdt.delete_node(node.id)
                 funcs.append((node.shutdown, [], {}))
             utils.threadpool(funcs)
+        self.nodes_changed()
+        self.links_changed()
 
     def write_nodes(self) -> None:
         """
@@ -1141,6 +1331,16 @@ class Session:
         except IOError:
             logging.exception("error writing nodes file")
 
+    def write_profile(self) -> None:
+        """
+        Write the timings recorded for starting this session to a 'profile.json'
+        file in the session dir.
+
+        :return: nothing
+        """
+        file_path = os.path.join(self.session_dir, PROFILE_FILE)
+        self.profiler.write(file_path)
+
     def exception(
         self, level: ExceptionLevels, source: str, text: str, node_id: int = None
     ) -> None:
@@ -1171,25 +1371,43 @@ class Session:
 
         :return: list of service boot errors during startup
         """
+        self.profiler.begin()
+
+        # periodically write command stats to the session directory
+        if self.use_command_stats():
+            file_path = os.path.join(self.session_dir, COMMAND_STATS_FILE)
+            self.command_stats.start(file_path)
+
+        # apply network commands deferred while building the session
+        with self.profiler.phase("apply network"):
+            self.net_batch.apply()
+
         # write current nodes out to session directory file
         self.write_nodes()
 
         # create control net interfaces and network tunnels
         # which need to exist for emane to sync on location events
         # in distributed scenarios
-        self.add_remove_control_net(0, remove=False)
+        with self.profiler.phase("control network"):
+            self.add_remove_control_net(0, remove=False)
 
         # initialize distributed tunnels
-        self.distributed.start()
-
-        # instantiate will be invoked again upon emane configure
-        if self.emane.startup() == EmaneState.NOT_READY:
+        with self.profiler.phase("distributed"):
+            self.distributed.start()
+
+        # instantiate will be invoked again upon emane configure, continuing
+        # the profile, which is finished and written once nodes are booted
+        with self.profiler.phase("emane"):
+            emane_state = self.emane.startup()
+        if emane_state == EmaneState.NOT_READY:
             return []
 
         # boot node services and then start mobility
-        exceptions = self.boot_nodes()
+        with self.profiler.phase("boot nodes"):
+            exceptions = self.boot_nodes()
         if not exceptions:
-            self.mobility.startup()
+            with self.profiler.phase("mobility"):
+                self.mobility.startup()
 
             # notify listeners that instantiation is complete
             event = EventData(event_type=EventTypes.INSTANTIATION_COMPLETE)
@@ -1199,6 +1417,8 @@ class Session:
             # nodes on slave servers that will be booted and those servers will
             # send a node status response message
             self.check_runtime()
+        self.profiler.finish()
+        self.write_profile()
         return exceptions
 
     def get_node_count(self) -> int:
@@ -1323,23 +1543,71 @@ class Session:
         messages to the GUI for node messages that had the status
         request flag.
 
+        Boot steps for all nodes run from a single scheduler, so services across
+        nodes start in parallel as soon as their dependencies have started.
+
         :return: service boot exceptions
         """
         with self.nodes_lock:
-            funcs = []
-            start = time.monotonic()
+            workers = self.options.get_config_int("boot_workers")
+            scheduler = BootScheduler(workers)
+            exceptions = []
             for _id in self.nodes:
                 node = self.nodes[_id]
                 if isinstance(node, CoreNodeBase) and not isinstance(node, Rj45Node):
-                    args = (node,)
-                    funcs.append((self.boot_node, args, {}))
-            results, exceptions = utils.threadpool(funcs)
-            total = time.monotonic() - start
-            logging.debug("boot run time: %s", total)
+                    try:
+                        self.add_boot_steps(scheduler, node)
+                    except ValueError as e:
+                        logging.exception("error booting node(%s)", node.name)
+                        exceptions.append(ServiceBootError(e))
+            scheduler.run()
+            self.boot_steps = scheduler.steps
+            self.profiler.add_boot_steps(scheduler.steps)
+            for errors in scheduler.errors().values():
+                exceptions.append(ServiceBootError(*errors))
         if not exceptions:
             self.update_control_iface_hosts()
         return exceptions
 
+    def add_boot_steps(self, scheduler: BootScheduler, node: CoreNodeBase) -> None:
+        """
+        Add the steps for booting a node to a boot scheduler, which adds a control
+        interface when necessary, starts node services, and then starts config
+        services. Service validation is scheduled rather than waited on, so workers
+        are free to boot other services in the meantime.
+
+        :param scheduler: scheduler to add steps to
+        :param node: node to boot
+        :return: nothing
+        :raises ValueError: when node service dependencies are invalid
+        """
+        logging.info("booting node(%s): %s", node.name, [x.name for x in node.services])
+        control_step = scheduler.add_step(
+            f"node({node.name}) control",
+            self.add_remove_control_iface,
+            (node,),
+            key=node,
+        )
+        service_steps = self.services.add_boot_steps(scheduler, node, [control_step])
+        dependencies = service_steps or [control_step]
+        config_steps = {}
+        startup_paths = ConfigServiceDependencies(node.config_services).startup_paths()
+        for startup_path in startup_paths:
+            for service in startup_path:
+                if service.name in config_steps:
+                    continue
+                service_dependencies = list(dependencies)
+                service_dependencies.extend(
+                    config_steps[x] for x in service.dependencies
+                )
+                config_steps[service.name] = scheduler.add_step(
+                    f"node({node.name}) config service({service.name})",
+                    service.schedule_start,
+                    (self.validation,),
+                    service_dependencies,
+                    node,
+                )
+
     def get_control_net_prefixes(self) -> List[str]:
         """
         Retrieve control net prefixes.
@@ -59,6 +59,66 @@ class SessionConfig(ConfigurableManager, ConfigurableOptions):
         Configuration(
             _id="ovs", _type=ConfigDataTypes.BOOL, default="0", label="Enable OVS"
         ),
+        Configuration(
+            _id="node_executor",
+            _type=ConfigDataTypes.BOOL,
+            default="0",
+            label="Run node commands using a long running executor",
+        ),
+        Configuration(
+            _id="netlink",
+            _type=ConfigDataTypes.BOOL,
+            default="0",
+            label="Configure links and addresses using netlink",
+        ),
+        Configuration(
+            _id="deferred_apply",
+            _type=ConfigDataTypes.BOOL,
+            default="0",
+            label="Batch network commands until instantiation",
+        ),
+        Configuration(
+            _id="numpy_range",
+            _type=ConfigDataTypes.BOOL,
+            default="0",
+            label="Calculate wireless range using numpy",
+        ),
+        Configuration(
+            _id="numpy_mobility",
+            _type=ConfigDataTypes.BOOL,
+            default="0",
+            label="Move mobility script nodes using numpy",
+        ),
+        Configuration(
+            _id="nftables",
+            _type=ConfigDataTypes.BOOL,
+            default="0",
+            label="Filter wireless links using nftables",
+        ),
+        Configuration(
+            _id="async_broadcast",
+            _type=ConfigDataTypes.BOOL,
+            default="0",
+            label="Broadcast events from worker threads",
+        ),
+        Configuration(
+            _id="command_stats",
+            _type=ConfigDataTypes.BOOL,
+            default="0",
+            label="Record command counts and latencies",
+        ),
+        Configuration(
+            _id="remote_agent",
+            _type=ConfigDataTypes.BOOL,
+            default="0",
+            label="Run distributed server commands using a long running agent",
+        ),
+        Configuration(
+            _id="boot_workers",
+            _type=ConfigDataTypes.UINT32,
+            default="0",
+            label="Boot Workers (0 based on cores)",
+        ),
     ]
     config_type: RegisterTlvs = RegisterTlvs.UTILITY
 
@@ -0,0 +1,259 @@
+"""
+throughput.py: samples interface counters for a session. Host devices are indexed
+as nodes and networks create them, and counters for every device are read with a
+single netlink dump per interval, shared by all subscribers of the session.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from core.errors import CoreCommandError
+from core.nodes import netlink
+
+# default time between throughput samples
+THROUGHPUT_INTERVAL: float = 3.0
+# smallest supported time between throughput samples
+MIN_THROUGHPUT_INTERVAL: float = 0.1
+# node id and interface id for node interfaces, interface id is None for bridges
+DeviceKey = Tuple[int, Optional[int]]
+# rx/tx packets, rx/tx bytes, rx/tx errors, rx/tx dropped
+Counters = Tuple[int, ...]
+
+
+@dataclass
+class Throughput:
+    """
+    Rates calculated for a device between two samples.
+    """
+
+    node_id: int
+    iface_id: Optional[int]
+    rx: float
+    tx: float
+    rx_packets: float
+    tx_packets: float
+    rx_dropped: float
+    tx_dropped: float
+
+    @property
+    def throughput(self) -> float:
+        """
+        Combined rx and tx rate in bits per second.
+
+        :return: throughput
+        """
+        return self.rx + self.tx
+
+
+class ThroughputSubscriber:
+    """
+    Receives throughput rates calculated from session samples on its own interval.
+    """
+
+    def __init__(self, interval: float) -> None:
+        """
+        Create a ThroughputSubscriber instance.
+
+        :param interval: time between rates
+        """
+        self.interval: float = interval
+        self.condition: threading.Condition = threading.Condition()
+        self.last_time: Optional[float] = None
+        self.last_counters: Dict[DeviceKey, Counters] = {}
+        self.throughputs: Optional[List[Throughput]] = None
+
+    def offer(self, now: float, counters: Dict[DeviceKey, Counters]) -> None:
+        """
+        Provide a sample, calculating rates when this subscriber is due.
+
+        :param now: time sample was taken
+        :param counters: counters for session devices
+        :return: nothing
+        """
+        if self.last_time is not None and now - self.last_time < self.interval:
+            return
+        if self.last_time is not None:
+            throughputs = calculate(self.last_counters, counters, now - self.last_time)
+            with self.condition:
+                self.throughputs = throughputs
+                self.condition.notify()
+        self.last_time = now
+        self.last_counters = counters
+
+    def get(self, timeout: float) -> Optional[List[Throughput]]:
+        """
+        Wait for the next rates to be calculated.
+
+        :param timeout: max time to wait
+        :return: rates for session devices, None if not available within timeout
+        """
+        with self.condition:
+            if self.throughputs is None:
+                self.condition.wait(timeout)
+            throughputs = self.throughputs
+            self.throughputs = None
+            return throughputs
+
+
+def calculate(
+    previous: Dict[DeviceKey, Counters],
+    current: Dict[DeviceKey, Counters],
+    interval: float,
+) -> List[Throughput]:
+    """
+    Calculate rates for devices present in both samples.
+
+    :param previous: previous device counters
+    :param current: current device counters
+    :param interval: time between samples
+    :return: rates for devices
+    """
+    throughputs = []
+    for key, counters in current.items():
+        last = previous.get(key)
+        if last is None:
+            continue
+        deltas = [(x - y) / interval for x, y in zip(counters, last)]
+        node_id, iface_id = key
+        throughput = Throughput(
+            node_id=node_id,
+            iface_id=iface_id,
+            rx=deltas[2] * 8.0,
+            tx=deltas[3] * 8.0,
+            rx_packets=deltas[0],
+            tx_packets=deltas[1],
+            rx_dropped=deltas[6],
+            tx_dropped=deltas[7],
+        )
+        throughputs.append(throughput)
+    return throughputs
+
+
+class ThroughputMonitor:
+    """
+    Indexes the host devices for a session and samples their counters while there
+    are subscribers.
+    """
+
+    def __init__(self) -> None:
+        """
+        Create a ThroughputMonitor instance.
+        """
+        self.lock: threading.Lock = threading.Lock()
+        self.devices: Dict[str, DeviceKey] = {}
+        self.indexes: Dict[int, DeviceKey] = {}
+        self.subscribers: List[ThroughputSubscriber] = []
+        self.thread: Optional[threading.Thread] = None
+
+    def add_iface(self, name: str, node_id: int, iface_id: int) -> None:
+        """
+        Index the host device for a node interface.
+
+        :param name: host device name
+        :param node_id: node id
+        :param iface_id: node interface id
+        :return: nothing
+        """
+        with self.lock:
+            self.devices[name] = (node_id, iface_id)
+            self.indexes = {}
+
+    def add_bridge(self, name: str, node_id: int) -> None:
+        """
+        Index the host bridge for a network.
+
+        :param name: host bridge name
+        :param node_id: network node id
+        :return: nothing
+        """
+        with self.lock:
+            self.devices[name] = (node_id, None)
+            self.indexes = {}
+
+    def remove(self, name: str) -> None:
+        """
+        Remove a host device from the index.
+
+        :param name: host device name
+        :return: nothing
+        """
+        with self.lock:
+            if self.devices.pop(name, None) is not None:
+                self.indexes = {}
+
+    def subscribe(self, interval: float = THROUGHPUT_INTERVAL) -> ThroughputSubscriber:
+        """
+        Subscribe to throughput rates, starting sampling when needed.
+
+        :param interval: time between rates for subscriber
+        :return: subscriber to receive rates from
+        """
+        interval = max(interval, MIN_THROUGHPUT_INTERVAL)
+        subscriber = ThroughputSubscriber(interval)
+        with self.lock:
+            self.subscribers.append(subscriber)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: ThroughputSubscriber) -> None:
+        """
+        Remove a subscriber, sampling will stop when none are left.
+
+        :param subscriber: subscriber to remove
+        :return: nothing
+        """
+        with self.lock:
+            self.subscribers.remove(subscriber)
+
+    def sample(self) -> Dict[DeviceKey, Counters]:
+        """
+        Read counters for all indexed devices.
+
+        :return: counters for each indexed device
+        """
+        stats = netlink.host_socket().link_stats()
+        with self.lock:
+            # devices may be indexed before they exist, such as on other servers
+            if len(self.indexes) != len(self.devices):
+                indexes = {}
+                for index, (name, _) in stats.items():
+                    key = self.devices.get(name)
+                    if key is not None:
+                        indexes[index] = key
+                self.indexes = indexes
+            indexes = self.indexes
+        counters = {}
+        for index, key in indexes.items():
+            stat = stats.get(index)
+            if stat is not None:
+                counters[key] = stat[1]
+        return counters
+
+    def run(self) -> None:
+        """
+        Thread target sampling counters at the interval of the most frequent
+        subscriber, until there are no subscribers.
+
+        :return: nothing
+        """
+        while True:
+            with self.lock:
+                subscribers = list(self.subscribers)
+                if not subscribers:
+                    self.thread = None
+                    break
+            now = time.monotonic()
+            try:
+                counters = self.sample()
+            except (CoreCommandError, OSError):
+                logging.exception("error sampling throughput")
+                counters = {}
+            for subscriber in subscribers:
+                subscriber.offer(now, counters)
+            interval = min(x.interval for x in subscribers)
+            time.sleep(max(interval - (time.monotonic() - now), 0))
@@ -0,0 +1,219 @@
+"""
+validation.py: schedules service validation checks for a session. Pending checks
+are kept in a single timer queue and attempted by a small pool of workers when
+due, rather than each service holding a thread while it sleeps between attempts.
+"""
+
+import concurrent.futures
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+# workers used to run validation checks that are due
+VALIDATION_WORKERS: int = 10
+
+
+class Validation:
+    """
+    A validation check waiting to be attempted.
+    """
+
+    def __init__(
+        self,
+        check: Optional[Callable[[], bool]],
+        period: float,
+        deadline: float,
+        error: Optional[Exception],
+    ) -> None:
+        """
+        Create a Validation instance.
+
+        :param check: function returning True when validation has passed, None to
+            pass once the deadline is reached
+        :param period: time between attempts
+        :param deadline: time validation must pass by
+        :param error: error to fail with when the deadline is reached, None to
+            complete with a False result instead
+        """
+        self.check: Optional[Callable[[], bool]] = check
+        self.period: float = period
+        self.deadline: float = deadline
+        self.error: Optional[Exception] = error
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+
+
+class ValidationScheduler:
+    """
+    Attempts validation checks when they are due, retrying them until they pass
+    or time out, with futures to be notified of completion.
+    """
+
+    def __init__(self, workers: int = VALIDATION_WORKERS) -> None:
+        """
+        Create a ValidationScheduler instance.
+
+        :param workers: number of workers used to attempt checks
+        """
+        self.workers: int = workers
+        self.condition: threading.Condition = threading.Condition()
+        self.queue: List[Tuple[float, int, Validation]] = []
+        self.counter: itertools.count = itertools.count()
+        self.running: bool = False
+        self.thread: Optional[threading.Thread] = None
+        self.executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+    def schedule(
+        self,
+        check: Callable[[], bool],
+        period: float,
+        timeout: float,
+        error: Exception = None,
+    ) -> concurrent.futures.Future:
+        """
+        Schedule a check to be attempted now, and then every period until it passes
+        or the timeout elapses.
+
+        :param check: function returning True when validation has passed
+        :param period: time between attempts
+        :param timeout: time for validation to pass
+        :param error: error to fail with on timeout, default is None to complete
+            with a False result instead
+        :return: future completed with True when validation passes
+        """
+        now = time.monotonic()
+        validation = Validation(check, period, now + timeout, error)
+        self._push(now, validation)
+        return validation.future
+
+    def delay(self, timeout: float) -> concurrent.futures.Future:
+        """
+        Schedule a validation that passes once a period of time has elapsed.
+
+        :param timeout: time to wait
+        :return: future completed with True when the time has elapsed
+        """
+        deadline = time.monotonic() + timeout
+        validation = Validation(None, timeout, deadline, None)
+        self._push(deadline, validation)
+        return validation.future
+
+    def shutdown(self) -> None:
+        """
+        Stop attempting checks, cancelling any that are still pending.
+
+        :return: nothing
+        """
+        with self.condition:
+            self.running = False
+            pending = self.queue
+            self.queue = []
+            thread = self.thread
+            executor = self.executor
+            self.thread = None
+            self.executor = None
+            self.condition.notify()
+            for _, _, validation in pending:
+                validation.future.cancel()
+        if thread:
+            thread.join()
+        if executor:
+            executor.shutdown(wait=True)
+
+    def _push(self, due: float, validation: Validation) -> None:
+        """
+        Add a validation to the timer queue, starting the scheduler thread when
+        needed.
+
+        :param due: time validation should be attempted
+        :param validation: validation to add
+        :return: nothing
+        """
+        with self.condition:
+            if not self.running:
+                self.running = True
+                self.executor = concurrent.futures.ThreadPoolExecutor(self.workers)
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+            heapq.heappush(self.queue, (due, next(self.counter), validation))
+            self.condition.notify()
+
+    def _run(self) -> None:
+        """
+        Thread target that hands off validations to workers when they are due.
+
+        :return: nothing
+        """
+        while True:
+            with self.condition:
+                if not self.running:
+                    break
+                if not self.queue:
+                    self.condition.wait()
+                    continue
+                due = self.queue[0][0]
+                remaining = due - time.monotonic()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    continue
+                _, _, validation = heapq.heappop(self.queue)
+                executor = self.executor
+            if validation.check is None:
+                self._complete(validation, True)
+            else:
+                executor.submit(self._attempt, validation)
+
+    def _attempt(self, validation: Validation) -> None:
+        """
+        Attempt a validation check, rescheduling it when it did not pass and there
+        is still time remaining.
+
+        :param validation: validation to attempt
+        :return: nothing
+        """
+        if validation.future.cancelled():
+            return
+        try:
+            passed = validation.check()
+        except Exception as e:
+            logging.exception("error running validation")
+            self._complete(validation, error=e)
+            return
+        now = time.monotonic()
+        if passed:
+            self._complete(validation, True)
+        elif now >= validation.deadline:
+            if validation.error is None:
+                self._complete(validation, False)
+            else:
+                self._complete(validation, error=validation.error)
+        else:
+            with self.condition:
+                if self.running:
+                    due = now + validation.period
+                    heapq.heappush(self.queue, (due, next(self.counter), validation))
+                    self.condition.notify()
+                else:
+                    validation.future.cancel()
+
+    def _complete(
+        self, validation: Validation, result: bool = None, error: Exception = None
+    ) -> None:
+        """
+        Complete a validation with a result or error, unless it has already been
+        cancelled, such as when shutting down while it was being attempted.
+
+        :param validation: validation to complete
+        :param result: result to complete with
+        :param error: error to complete with, instead of a result
+        :return: nothing
+        """
+        with self.condition:
+            if validation.future.done():
+                return
+            if error is None:
+                validation.future.set_result(result)
+            else:
+                validation.future.set_exception(error)
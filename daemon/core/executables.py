@@ -8,6 +8,9 @@ IP: str = "ip"
 ETHTOOL: str = "ethtool"
 TC: str = "tc"
 EBTABLES: str = "ebtables"
+EBTABLES_SAVE: str = "ebtables-save"
+EBTABLES_RESTORE: str = "ebtables-restore"
+NFT: str = "nft"
 MOUNT: str = "mount"
 UMOUNT: str = "umount"
 OVS_VSCTL: str = "ovs-vsctl"
@@ -1,73 +1,18 @@
 """
-event.py: event loop implementation using a heap queue and threads.
+event.py: event loop implementation using a heap queue, with events ran from a
+single scheduler thread.
 """
 
 import heapq
+import logging
 import threading
 import time
+from dataclasses import dataclass
 from functools import total_ordering
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
-
-class Timer(threading.Thread):
-    """
-    Based on threading.Timer but cancel() returns if the timer was
-    already running.
-    """
-
-    def __init__(
-        self,
-        interval: float,
-        func: Callable[..., None],
-        args: Tuple[Any] = None,
-        kwargs: Dict[Any, Any] = None,
-    ) -> None:
-        """
-        Create a Timer instance.
-
-        :param interval: time interval
-        :param func: function to call when timer finishes
-        :param args: function arguments
-        :param kwargs: function keyword arguments
-        """
-        super().__init__()
-        self.interval: float = interval
-        self.func: Callable[..., None] = func
-        self.finished: threading.Event = threading.Event()
-        self._running: threading.Lock = threading.Lock()
-        # validate arguments were provided
-        if args is None:
-            args = ()
-        self.args: Tuple[Any] = args
-        # validate keyword arguments were provided
-        if kwargs is None:
-            kwargs = {}
-        self.kwargs: Dict[Any, Any] = kwargs
-
-    def cancel(self) -> bool:
-        """
-        Stop the timer if it hasn't finished yet.  Return False if
-        the timer was already running.
-
-        :return: True if canceled, False otherwise
-        """
-        locked = self._running.acquire(False)
-        if locked:
-            self.finished.set()
-            self._running.release()
-        return locked
-
-    def run(self) -> None:
-        """
-        Run the timer.
-
-        :return: nothing
-        """
-        self.finished.wait(self.interval)
-        with self._running:
-            if not self.finished.is_set():
-                self.func(*self.args, **self.kwargs)
-            self.finished.set()
+# lateness in seconds for an event to be logged as running behind
+LATE_EVENT_TIME: float = 1.0
 
 
 @total_ordering
@@ -99,12 +44,10 @@ class Event:
         self.args: Tuple[Any] = args
         self.kwds: Dict[Any, Any] = kwds
         self.canceled: bool = False
+        self.queued: bool = False
 
     def __lt__(self, other: "Event") -> bool:
-        result = self.time < other.time
-        if result:
-            result = self.eventnum < other.eventnum
-        return result
+        return (self.time, self.eventnum) < (other.time, other.eventnum)
 
     def run(self) -> None:
         """
@@ -125,9 +68,24 @@ class Event:
         self.canceled = True
 
 
+@dataclass
+class EventLoopStats:
+    """
+    How far behind schedule an event loop is running, times are in seconds.
+    """
+
+    events: int
+    pending: int
+    lag: float
+    last_lateness: float
+    max_lateness: float
+    mean_lateness: float
+
+
 class EventLoop:
     """
-    Provides an event loop for running events.
+    Provides an event loop for running events, from a single thread that waits
+    for the next event to be due.
     """
 
     def __init__(self) -> None:
@@ -135,54 +93,74 @@ class EventLoop:
         Creates a EventLoop instance.
         """
         self.lock: threading.RLock = threading.RLock()
+        self.condition: threading.Condition = threading.Condition(self.lock)
         self.queue: List[Event] = []
         self.eventnum: int = 0
-        self.timer: Optional[Timer] = None
+        self.canceled: int = 0
+        self.thread: Optional[threading.Thread] = None
         self.running: bool = False
         self.start: Optional[float] = None
+        self.events: int = 0
+        self.last_lateness: float = 0.0
+        self.max_lateness: float = 0.0
+        self.total_lateness: float = 0.0
 
-    def _run_events(self) -> None:
+    def _next_event(self) -> Optional[Event]:
         """
-        Run events.
+        Wait for the next event to be due and remove it from the queue.
 
-        :return: nothing
+        :return: next event, None when the loop has stopped
         """
-        schedule = False
-        while True:
-            with self.lock:
-                if not self.running or not self.queue:
-                    break
+        with self.condition:
+            while True:
+                if not self.running or self.thread is not threading.current_thread():
+                    return None
+                if not self.queue:
+                    self.condition.wait()
+                    continue
+                event = self.queue[0]
+                if event.canceled:
+                    heapq.heappop(self.queue)
+                    event.queued = False
+                    self.canceled -= 1
+                    continue
                 now = time.monotonic()
-                if self.queue[0].time > now:
-                    schedule = True
-                    break
-                event = heapq.heappop(self.queue)
-            if event.time > now:
-                raise ValueError("invalid event time: %s > %s", event.time, now)
-            event.run()
+                if event.time > now:
+                    self.condition.wait(event.time - now)
+                    continue
+                heapq.heappop(self.queue)
+                event.queued = False
+                self._record_lateness(now - event.time)
+                return event
+
+    def _record_lateness(self, lateness: float) -> None:
+        """
+        Record how late an event was ran compared to its scheduled time.
 
-        with self.lock:
-            self.timer = None
-            if schedule:
-                self._schedule_event()
+        :param lateness: time event was ran after it was due
+        :return: nothing
+        """
+        self.events += 1
+        self.last_lateness = lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        self.total_lateness += lateness
+        if lateness >= LATE_EVENT_TIME:
+            logging.warning("event loop running behind by %.3fs", lateness)
 
-    def _schedule_event(self) -> None:
+    def _run_events(self) -> None:
         """
-        Schedule event.
+        Thread target running events as they are due, until stopped.
 
         :return: nothing
         """
-        with self.lock:
-            if not self.running:
-                raise ValueError("scheduling event while not running")
-            if not self.queue:
-                return
-            delay = self.queue[0].time - time.monotonic()
-            if self.timer:
-                raise ValueError("timer was already set")
-            self.timer = Timer(delay, self._run_events)
-            self.timer.daemon = True
-            self.timer.start()
+        while True:
+            event = self._next_event()
+            if event is None:
+                break
+            try:
+                event.run()
+            except Exception:
+                logging.exception("error running event: %s", event.func)
 
     def run(self) -> None:
         """
@@ -190,14 +168,19 @@ class EventLoop:
 
         :return: nothing
         """
-        with self.lock:
+        with self.condition:
             if self.running:
                 return
             self.running = True
             self.start = time.monotonic()
             for event in self.queue:
                 event.time += self.start
-            self._schedule_event()
+            self.events = 0
+            self.last_lateness = 0.0
+            self.max_lateness = 0.0
+            self.total_lateness = 0.0
+            self.thread = threading.Thread(target=self._run_events, daemon=True)
+            self.thread.start()
 
     def stop(self) -> None:
         """
@@ -205,18 +188,26 @@ class EventLoop:
 
         :return: nothing
         """
-        with self.lock:
+        with self.condition:
             if not self.running:
                 return
+            for event in self.queue:
+                event.queued = False
             self.queue = []
             self.eventnum = 0
-            if self.timer is not None:
-                self.timer.cancel()
-                self.timer = None
+            self.canceled = 0
             self.running = False
             self.start = None
-
-    def add_event(self, delaysec: float, func: Callable, *args: Any, **kwds: Any):
+            thread = self.thread
+            self.thread = None
+            self.condition.notify_all()
+        # events may stop the loop they are ran from
+        if thread is not threading.current_thread():
+            thread.join()
+
+    def add_event(
+        self, delaysec: float, func: Callable, *args: Any, **kwds: Any
+    ) -> Event:
         """
         Add an event to the event loop.
 
@@ -226,24 +217,76 @@ class EventLoop:
         :param kwds: event keyword arguments
         :return: created event
         """
-        with self.lock:
+        with self.condition:
             eventnum = self.eventnum
             self.eventnum += 1
             evtime = float(delaysec)
             if self.running:
                 evtime += time.monotonic()
             event = Event(eventnum, evtime, func, *args, **kwds)
-
-            if self.queue:
-                prevhead = self.queue[0]
-            else:
-                prevhead = None
-
             heapq.heappush(self.queue, event)
-            head = self.queue[0]
-            if prevhead is not None and prevhead != head:
-                if self.timer is not None and self.timer.cancel():
-                    self.timer = None
-            if self.running and self.timer is None:
-                self._schedule_event()
+            event.queued = True
+            # wake the loop when the next event to run has changed
+            if self.running and self.queue[0] is event:
+                self.condition.notify()
         return event
+
+    def cancel(self, event: Event) -> None:
+        """
+        Cancel an event, it is removed from the queue once it reaches the front,
+        or when canceled events make up most of the queue.
+
+        :param event: event to cancel
+        :return: nothing
+        """
+        with self.condition:
+            if event.canceled:
+                return
+            event.cancel()
+            # events already removed from the queue, such as those ran, are not
+            # left behind within it
+            if not event.queued:
+                return
+            self.canceled += 1
+            if self.canceled > len(self.queue) // 2:
+                for x in self.queue:
+                    if x.canceled:
+                        x.queued = False
+                self.queue = [x for x in self.queue if not x.canceled]
+                heapq.heapify(self.queue)
+                self.canceled = 0
+            self.condition.notify()
+
+    def reschedule(self, event: Event, delaysec: float) -> Event:
+        """
+        Cancel an event and add it again to run after a new delay.
+
+        :param event: event to reschedule
+        :param delaysec: delay in seconds for event
+        :return: rescheduled event
+        """
+        with self.condition:
+            self.cancel(event)
+            return self.add_event(delaysec, event.func, *event.args, **event.kwds)
+
+    def stats(self) -> EventLoopStats:
+        """
+        Retrieve how far behind schedule the event loop is running.
+
+        :return: event loop stats, lag is how long the next event is overdue
+        """
+        with self.condition:
+            lag = 0.0
+            if self.running and self.queue:
+                lag = max(time.monotonic() - self.queue[0].time, 0.0)
+            mean_lateness = 0.0
+            if self.events:
+                mean_lateness = self.total_lateness / self.events
+            return EventLoopStats(
+                events=self.events,
+                pending=max(len(self.queue) - self.canceled, 0),
+                lag=lag,
+                last_lateness=self.last_lateness,
+                max_lateness=self.max_lateness,
+                mean_lateness=mean_lateness,
+            )
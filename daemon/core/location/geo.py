@@ -1,9 +1,10 @@
 """
-Provides conversions from x,y,z to lon,lat,alt.
+Provides conversions from x,y,z to lon,lat,alt, for a single point or for many
+points transformed together.
 """
 
 import logging
-from typing import Tuple
+from typing import List, Optional, Sequence, Tuple
 
 import pyproj
 from pyproj import Transformer
@@ -125,3 +126,55 @@ class GeoLocation:
         alt = self.refgeo[2] + self.pixels2meters(z)
         logging.debug("result lon,lat,alt(%s, %s, %s)", lon, lat, alt)
         return lat, lon, alt
+
+    def getxyz_many(
+        self, lats: Sequence[float], lons: Sequence[float], alts: Sequence[float]
+    ) -> List[Tuple[float, float, float]]:
+        """
+        Convert many lon,lat,alt positions to x,y,z, transforming all positions
+        in a single call.
+
+        :param lats: latitude values
+        :param lons: longitude values
+        :param alts: altitude values
+        :return: x,y,z representation of each provided position
+        """
+        if not lats:
+            return []
+        pxs, pys = self.to_pixels.transform(list(lons), list(lats))
+        refx, refy, refz = self.refproj
+        offx, offy, offz = self.refxyz
+        meters2pixels = self.meters2pixels
+        return [
+            (
+                meters2pixels(px - refx) + offx,
+                -(meters2pixels(py - refy) + offy),
+                meters2pixels(alt - refz) + offz,
+            )
+            for px, py, alt in zip(pxs, pys, alts)
+        ]
+
+    def getgeo_many(
+        self, xs: Sequence[float], ys: Sequence[float], zs: Sequence[Optional[float]]
+    ) -> List[Tuple[float, float, float]]:
+        """
+        Convert many x,y,z positions to lon,lat,alt, transforming all positions
+        in a single call.
+
+        :param xs: x values
+        :param ys: y values
+        :param zs: z values, None values default to the reference z
+        :return: lat,lon,alt representation of each provided position
+        """
+        if not xs:
+            return []
+        offx, offy, offz = self.refxyz
+        pixels2meters = self.pixels2meters
+        pxs = [self.refproj[0] + pixels2meters(x - offx) for x in xs]
+        pys = [self.refproj[1] + pixels2meters(-(y - offy)) for y in ys]
+        lons, lats = self.to_geo.transform(pxs, pys)
+        alts = []
+        for z in zs:
+            z = offz if z is None else z - offz
+            alts.append(self.refgeo[2] + pixels2meters(z))
+        return list(zip(lats, lons, alts))
@@ -9,7 +9,7 @@ import threading
 import time
 from functools import total_ordering
 from pathlib import Path
-from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Set, Tuple
 
 from core import utils
 from core.config import ConfigGroup, ConfigurableOptions, Configuration, ModelManager
@@ -23,9 +23,12 @@ from core.emulator.enumerations import (
 )
 from core.errors import CoreError
 from core.executables import BASH
+from core.location import rangeengine, trace, waypointengine
+from core.location.rangeengine import NumpyRangeEngine
+from core.location.waypointengine import NumpyWaypointEngine
 from core.nodes.base import CoreNode
 from core.nodes.interface import CoreInterface
-from core.nodes.network import WlanNode
+from core.nodes.network import EbtablesQueue, WlanNode
 
 if TYPE_CHECKING:
     from core.emulator.session import Session
@@ -249,6 +252,80 @@ class WirelessModel(ConfigurableOptions):
         pass
 
 
+class SpatialGrid:
+    """
+    Uniform grid of interface positions, with cells the size of the wireless range,
+    used to find interfaces that may be within range without checking every pair.
+    """
+
+    def __init__(self, size: float) -> None:
+        """
+        Create a SpatialGrid instance.
+
+        :param size: size of a grid cell
+        """
+        self.size: float = max(size, 1)
+        self.cells: Dict[Tuple[int, int], Set[CoreInterface]] = {}
+        self.iface_to_cell: Dict[CoreInterface, Tuple[int, int]] = {}
+
+    def get_cell(self, x: float, y: float) -> Tuple[int, int]:
+        """
+        Retrieve the cell a position falls within.
+
+        :param x: x position
+        :param y: y position
+        :return: cell coordinates
+        """
+        return int(x // self.size), int(y // self.size)
+
+    def update(self, iface: CoreInterface, x: float, y: float) -> None:
+        """
+        Update the cell for an interface.
+
+        :param iface: interface to update
+        :param x: x position
+        :param y: y position
+        :return: nothing
+        """
+        cell = self.get_cell(x, y)
+        current = self.iface_to_cell.get(iface)
+        if current == cell:
+            return
+        if current is not None:
+            self.remove(iface)
+        self.iface_to_cell[iface] = cell
+        self.cells.setdefault(cell, set()).add(iface)
+
+    def remove(self, iface: CoreInterface) -> None:
+        """
+        Remove an interface from the grid.
+
+        :param iface: interface to remove
+        :return: nothing
+        """
+        cell = self.iface_to_cell.pop(iface, None)
+        if cell is None:
+            return
+        ifaces = self.cells[cell]
+        ifaces.discard(iface)
+        if not ifaces:
+            del self.cells[cell]
+
+    def nearby(self, x: float, y: float) -> Iterator[CoreInterface]:
+        """
+        Iterate over interfaces within the cell of a position and its adjacent
+        cells, which covers everything within one cell size of the position.
+
+        :param x: x position
+        :param y: y position
+        :return: iterator of nearby interfaces
+        """
+        cell_x, cell_y = self.get_cell(x, y)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                yield from self.cells.get((cell_x + dx, cell_y + dy), ())
+
+
 class BasicRangeModel(WirelessModel):
     """
     Basic Range wireless model, calculates range between nodes and links
@@ -285,6 +362,12 @@ class BasicRangeModel(WirelessModel):
         Configuration(
             _id="error", _type=ConfigDataTypes.STRING, default="0", label="loss (%)"
         ),
+        Configuration(
+            _id="update_rate",
+            _type=ConfigDataTypes.FLOAT,
+            default=str(EbtablesQueue.rate),
+            label="link update rate (sec)",
+        ),
     ]
 
     @classmethod
@@ -304,6 +387,14 @@ class BasicRangeModel(WirelessModel):
         self.iface_to_pos: Dict[CoreInterface, Tuple[float, float, float]] = {}
         self.iface_lock: threading.Lock = threading.Lock()
         self.range: int = 0
+        self.grid: SpatialGrid = SpatialGrid(self.range)
+        self.iface_links: Dict[CoreInterface, Set[CoreInterface]] = {}
+        self.engine: Optional[NumpyRangeEngine] = None
+        if session.options.get_config("numpy_range") == "1":
+            if rangeengine.is_available():
+                self.engine = NumpyRangeEngine(self.is_linked)
+            else:
+                logging.warning("numpy is not installed, using default range model")
         self.bw: Optional[int] = None
         self.delay: Optional[int] = None
         self.loss: Optional[float] = None
@@ -363,14 +454,14 @@ class BasicRangeModel(WirelessModel):
         :return: nothing
         """
         x, y, z = iface.node.position.get()
-        self.iface_lock.acquire()
-        self.iface_to_pos[iface] = (x, y, z)
-        if x is None or y is None:
-            self.iface_lock.release()
-            return
-        for iface2 in self.iface_to_pos:
-            self.calclink(iface, iface2)
-        self.iface_lock.release()
+        with self.iface_lock:
+            self.iface_to_pos[iface] = (x, y, z)
+            if x is None or y is None:
+                self.grid.remove(iface)
+                return
+            self.grid.update(iface, x, y)
+            for iface2 in self.candidates(iface):
+                self.calclink(iface, iface2)
 
     position_callback = set_position
 
@@ -385,17 +476,64 @@ class BasicRangeModel(WirelessModel):
         :param moved_ifaces: moved network interfaces
         :return: nothing
         """
+        if self.engine:
+            self.update_all(moved_ifaces)
+            return
         with self.iface_lock:
+            pending = set(moved_ifaces)
             while len(moved_ifaces):
                 iface = moved_ifaces.pop()
+                pending.discard(iface)
                 nx, ny, nz = iface.node.getposition()
                 if iface in self.iface_to_pos:
                     self.iface_to_pos[iface] = (nx, ny, nz)
-                for iface2 in self.iface_to_pos:
-                    if iface2 in moved_ifaces:
+                    if nx is None or ny is None:
+                        self.grid.remove(iface)
+                    else:
+                        self.grid.update(iface, nx, ny)
+                for iface2 in self.candidates(iface):
+                    if iface2 in pending:
                         continue
                     self.calclink(iface, iface2)
 
+    def update_all(self, moved_ifaces: List[CoreInterface]) -> None:
+        """
+        Update positions for moved interfaces, then calculate all links at once
+        using the vectorized range engine, only updating links that changed.
+
+        :param moved_ifaces: moved network interfaces
+        :return: nothing
+        """
+        with self.iface_lock:
+            while len(moved_ifaces):
+                iface = moved_ifaces.pop()
+                if iface not in self.iface_to_pos:
+                    continue
+                x, y, z = iface.node.getposition()
+                self.iface_to_pos[iface] = (x, y, z)
+                if x is None or y is None:
+                    self.grid.remove(iface)
+                else:
+                    self.grid.update(iface, x, y)
+            for a, b, in_range in self.engine.calculate(self.iface_to_pos, self.range):
+                self.update_link(a, b, in_range)
+
+    def candidates(self, iface: CoreInterface) -> Set[CoreInterface]:
+        """
+        Retrieve interfaces that need their link to the given interface calculated,
+        those near enough to be in range and those currently linked that may now
+        be out of range.
+
+        :param iface: interface to get candidates for
+        :return: candidate interfaces
+        """
+        ifaces = set(self.iface_links.get(iface, ()))
+        position = self.iface_to_pos.get(iface)
+        if position is not None and position[0] is not None and position[1] is not None:
+            ifaces.update(self.grid.nearby(position[0], position[1]))
+        ifaces.discard(iface)
+        return ifaces
+
     def calclink(self, iface: CoreInterface, iface2: CoreInterface) -> None:
         """
         Helper used by set_position() and update() to
@@ -422,23 +560,51 @@ class BasicRangeModel(WirelessModel):
             # ordering is important, to keep the wlan._linked dict organized
             a = min(iface, iface2)
             b = max(iface, iface2)
-
-            with self.wlan._linked_lock:
-                linked = self.wlan.linked(a, b)
-
-            if d > self.range:
-                if linked:
-                    logging.debug("was linked, unlinking")
-                    self.wlan.unlink(a, b)
-                    self.sendlinkmsg(a, b, unlink=True)
-            else:
-                if not linked:
-                    logging.debug("was not linked, linking")
-                    self.wlan.link(a, b)
-                    self.sendlinkmsg(a, b)
+            self.update_link(a, b, d <= self.range)
         except KeyError:
             logging.exception("error getting interfaces during calclinkS")
 
+    def is_linked(self, iface1: CoreInterface, iface2: CoreInterface) -> bool:
+        """
+        Check if an ordered pair of interfaces are linked within the wlan.
+
+        :param iface1: interface one
+        :param iface2: interface two
+        :return: True if linked, False otherwise
+        """
+        with self.wlan._linked_lock:
+            return self.wlan.linked(iface1, iface2)
+
+    def update_link(
+        self, iface1: CoreInterface, iface2: CoreInterface, in_range: bool
+    ) -> None:
+        """
+        Link or unlink an ordered pair of interfaces, when their current state
+        does not match being in range, and send the related link message.
+
+        :param iface1: interface one
+        :param iface2: interface two
+        :param in_range: True if interfaces are in range, False otherwise
+        :return: nothing
+        """
+        linked = self.is_linked(iface1, iface2)
+        if not in_range:
+            if linked:
+                logging.debug("was linked, unlinking")
+                self.wlan.unlink(iface1, iface2)
+                self.sendlinkmsg(iface1, iface2, unlink=True)
+            self.iface_links.get(iface1, set()).discard(iface2)
+            self.iface_links.get(iface2, set()).discard(iface1)
+        else:
+            if not linked:
+                logging.debug("was not linked, linking")
+                self.wlan.link(iface1, iface2)
+                self.sendlinkmsg(iface1, iface2)
+            self.iface_links.setdefault(iface1, set()).add(iface2)
+            self.iface_links.setdefault(iface2, set()).add(iface1)
+        if self.engine:
+            self.engine.set_linked(iface1, iface2, in_range)
+
     @staticmethod
     def calcdistance(
         p1: Tuple[float, float, float], p2: Tuple[float, float, float]
@@ -467,11 +633,19 @@ class BasicRangeModel(WirelessModel):
         self.range = self._get_config(self.range, config, "range")
         if self.range is None:
             self.range = 0
+        with self.iface_lock:
+            self.grid = SpatialGrid(self.range)
+            for iface, (x, y, _) in self.iface_to_pos.items():
+                if x is not None and y is not None:
+                    self.grid.update(iface, x, y)
         logging.debug("wlan %s set range to %s", self.wlan.name, self.range)
         self.bw = self._get_config(self.bw, config, "bandwidth")
         self.delay = self._get_config(self.delay, config, "delay")
         self.loss = self._get_config(self.loss, config, "error")
         self.jitter = self._get_config(self.jitter, config, "jitter")
+        update_rate = config.get("update_rate")
+        if update_rate is not None:
+            self.wlan.update_rate = float(update_rate) if update_rate else None
         self.setlinkparams()
 
     def create_link_data(
@@ -600,6 +774,12 @@ class WayPointMobility(WirelessModel):
         # flag whether to stop scheduling when queue is empty
         #  (ns-3 sets this to False as new waypoints may be added from trace)
         self.empty_queue_stop: bool = True
+        self.engine: Optional[NumpyWaypointEngine] = None
+        if session.options.get_config("numpy_mobility") == "1":
+            if waypointengine.is_available():
+                self.engine = NumpyWaypointEngine()
+            else:
+                logging.warning("numpy is not installed, using default node movement")
 
     def runround(self) -> None:
         """
@@ -641,13 +821,16 @@ class WayPointMobility(WirelessModel):
                 return self.run()
 
         # only move interfaces attached to self.wlan, or all nodenum in script?
-        moved = []
-        moved_ifaces = []
-        for iface in self.wlan.get_ifaces():
-            node = iface.node
-            if self.movenode(node, dt):
-                moved.append(node)
-                moved_ifaces.append(iface)
+        if self.engine is None:
+            moved = []
+            moved_ifaces = []
+            for iface in self.wlan.get_ifaces():
+                node = iface.node
+                if self.movenode(node, dt):
+                    moved.append(node)
+                    moved_ifaces.append(iface)
+        else:
+            moved, moved_ifaces = self.movenodes(dt)
 
         # calculate all ranges after moving nodes; this saves calculations
         self.session.mobility.updatewlans(moved, moved_ifaces)
@@ -715,6 +898,55 @@ class WayPointMobility(WirelessModel):
         self.setnodeposition(node, x1 + dx, y1 + dy, z1)
         return True
 
+    def movenodes(self, dt: float) -> Tuple[List[CoreNode], List[CoreInterface]]:
+        """
+        Calculate next locations for all nodes with a current waypoint at once,
+        updating their coordinates and broadcasting the moved nodes together.
+
+        :param dt: move factor
+        :return: moved nodes and their interfaces
+        """
+        node_ifaces = {}
+        for iface in self.wlan.get_ifaces():
+            if iface.node.id in self.points:
+                node_ifaces.setdefault(iface.node, []).append(iface)
+        if not node_ifaces:
+            return [], []
+        nodes = list(node_ifaces)
+        positions = []
+        targets = []
+        speeds = []
+        for node in nodes:
+            x, y, _ = node.getposition()
+            point = self.points[node.id]
+            x2, y2, _ = point.coords
+            positions.append((x, y))
+            targets.append((x2, y2))
+            speeds.append(point.speed)
+        results, moved_flags, arrived_flags = self.engine.move(
+            positions, targets, speeds, dt
+        )
+        moved = []
+        moved_ifaces = []
+        for node, (x, y), is_moved, arrived in zip(
+            nodes, results, moved_flags, arrived_flags
+        ):
+            point = self.points[node.id]
+            if arrived:
+                del self.points[node.id]
+            if not is_moved:
+                if self.endtime < (self.lasttime - self.timezero):
+                    # the last node to reach the last waypoint determines this
+                    # script's endtime
+                    self.endtime = self.lasttime - self.timezero
+                continue
+            z = point.coords[2] if point.speed == 0 else node.position.z
+            node.position.set(x, y, z)
+            moved.append(node)
+            moved_ifaces.extend(node_ifaces[node])
+        self.session.broadcast_nodes(moved)
+        return moved, moved_ifaces
+
     def movenodesinitial(self) -> None:
         """
         Move nodes to their initial positions. Then calculate the ranges.
@@ -943,6 +1175,8 @@ class Ns2ScriptedMobility(WayPointMobility):
         self.script_start: Optional[str] = None
         self.script_pause: Optional[str] = None
         self.script_stop: Optional[str] = None
+        self.trace: Optional[trace.MobilityTrace] = None
+        self.trace_index: int = 0
 
     def update_config(self, config: Dict[str, str]) -> None:
         self.file = config["file"]
@@ -966,11 +1200,17 @@ class Ns2ScriptedMobility(WayPointMobility):
         """
         Read in mobility script from a file. This adds waypoints to a
         priority queue, sorted by waypoint time. Initial waypoints are
-        stored in a separate dict.
+        stored in a separate dict. Compiled traces are memory mapped instead,
+        with waypoints queued a window at a time as the script runs.
 
         :return: nothing
         """
+        self.trace = None
+        self.trace_index = 0
         filename = self.findfile(self.file)
+        if trace.is_trace_file(filename):
+            self.readtracefile(filename)
+            return
         try:
             f = open(filename, "r")
         except IOError:
@@ -979,54 +1219,99 @@ class Ns2ScriptedMobility(WayPointMobility):
             )
             return
         logging.info("reading ns-2 script file: %s", filename)
-        ln = 0
-        ix = iy = iz = None
-        inodenum = None
-        for line in f:
-            ln += 1
-            if line[:2] != "$n":
-                continue
-            try:
-                if line[:8] == "$ns_ at ":
-                    if ix is not None and iy is not None:
-                        self.addinitial(self.map(inodenum), ix, iy, iz)
-                        ix = iy = iz = None
-                    # waypoints:
-                    #    $ns_ at 1.00 "$node_(6) setdest 500.0 178.0 25.0"
-                    parts = line.split()
-                    time = float(parts[2])
-                    nodenum = parts[3][1 + parts[3].index("(") : parts[3].index(")")]
-                    x = float(parts[5])
-                    y = float(parts[6])
-                    z = None
-                    speed = float(parts[7].strip('"'))
-                    self.addwaypoint(time, self.map(nodenum), x, y, z, speed)
-                elif line[:7] == "$node_(":
-                    # initial position (time=0, speed=0):
-                    #    $node_(6) set X_ 780.0
-                    parts = line.split()
-                    nodenum = parts[0][1 + parts[0].index("(") : parts[0].index(")")]
-                    if parts[2] == "X_":
-                        if ix is not None and iy is not None:
-                            self.addinitial(self.map(inodenum), ix, iy, iz)
-                            ix = iy = iz = None
-                        ix = float(parts[3])
-                    elif parts[2] == "Y_":
-                        iy = float(parts[3])
-                    elif parts[2] == "Z_":
-                        iz = float(parts[3])
-                        self.addinitial(self.map(nodenum), ix, iy, iz)
-                        ix = iy = iz = None
-                    inodenum = nodenum
+        with f:
+            for entry in trace.parse_ns2_script(f, self.file):
+                node_id = self.map(entry.node_id)
+                if entry.initial:
+                    self.addinitial(node_id, entry.x, entry.y, entry.z)
                 else:
-                    raise ValueError
-            except ValueError:
-                logging.exception(
-                    "skipping line %d of file %s '%s'", ln, self.file, line
-                )
-                continue
-        if ix is not None and iy is not None:
-            self.addinitial(self.map(inodenum), ix, iy, iz)
+                    self.addwaypoint(
+                        entry.time, node_id, entry.x, entry.y, entry.z, entry.speed
+                    )
+
+    def readtracefile(self, filename: str) -> None:
+        """
+        Memory map a compiled mobility trace, adding its initial positions.
+
+        :param filename: path of compiled trace
+        :return: nothing
+        """
+        logging.info("reading compiled mobility trace: %s", filename)
+        try:
+            self.trace = trace.MobilityTrace(filename)
+        except (ImportError, IOError, ValueError):
+            logging.exception(
+                "ns-2 scripted mobility failed to load trace: %s", self.file
+            )
+            return
+        for node_id, x, y, z in self.trace.initial_positions():
+            self.addinitial(self.map(node_id), x, y, z)
+
+    def queuetrace(self, now: float) -> None:
+        """
+        Queue the next window of waypoints from a compiled trace.
+
+        :param now: current timestamp
+        :return: nothing
+        """
+        if self.trace is None or self.trace_index >= len(self.trace):
+            return
+        end_time = now + trace.TRACE_WINDOW
+        # always queue the next waypoint, to know when to run next
+        if not self.queue:
+            end_time = max(end_time, float(self.trace.times[self.trace_index]))
+        waypoints, self.trace_index = self.trace.window(self.trace_index, end_time)
+        # waypoints are sorted and later than those queued, so remain a heap
+        for _time, node_id, x, y, z, speed in waypoints:
+            wp = WayPoint(_time, self.map(node_id), coords=(x, y, z), speed=speed)
+            self.queue.append(wp)
+
+    def updatepoints(self, now: float) -> None:
+        """
+        Queue the next window of waypoints from a compiled trace, then move
+        waypoints whose time has come.
+
+        :param now: current timestamp
+        :return: nothing
+        """
+        self.queuetrace(now)
+        super().updatepoints(now)
+
+    def copywaypoints(self) -> None:
+        """
+        Store backup copy of waypoints for looping and stopping, compiled traces
+        are read again from the start instead.
+
+        :return: nothing
+        """
+        if self.trace is None:
+            super().copywaypoints()
+
+    def loopwaypoints(self) -> bool:
+        """
+        Restore backup copy of waypoints when looping, compiled traces queue
+        their first window of waypoints again.
+
+        :return: nothing
+        """
+        if self.trace is None:
+            return super().loopwaypoints()
+        self.queue = []
+        self.trace_index = 0
+        self.queuetrace(0.0)
+        return self.loop
+
+    def setendtime(self) -> None:
+        """
+        Set self.endtime to the time of the last waypoint, see
+        WayPointMobility.setendtime().
+
+        :return: nothing
+        """
+        if self.trace is None:
+            super().setendtime()
+        else:
+            self.endtime = self.trace.end_time
 
     def findfile(self, file_name: str) -> str:
         """
@@ -0,0 +1,139 @@
+"""
+rangeengine.py: vectorized wireless range calculations, determining which interface
+pairs are within range for all pairs at once using numpy.
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.nodes.interface import CoreInterface
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    logging.debug("numpy is not installed, vectorized range engine not available")
+
+Position = Tuple[Optional[float], Optional[float], Optional[float]]
+LinkDelta = Tuple[CoreInterface, CoreInterface, bool]
+
+
+def is_available() -> bool:
+    """
+    Check if the vectorized range engine can be used.
+
+    :return: True if numpy is installed, False otherwise
+    """
+    return np is not None
+
+
+class NumpyRangeEngine:
+    """
+    Keeps interface positions in an array to calculate the distance between all
+    pairs at once, diffing which pairs are in range against the previous
+    calculation so that only changed links are provided.
+    """
+
+    def __init__(
+        self, is_linked: Callable[[CoreInterface, CoreInterface], bool]
+    ) -> None:
+        """
+        Create a NumpyRangeEngine instance.
+
+        :param is_linked: function to check if an ordered interface pair is
+            currently linked, used when interfaces are added
+        """
+        if np is None:
+            raise ImportError("numpy is required for the vectorized range engine")
+        self.is_linked: Callable[[CoreInterface, CoreInterface], bool] = is_linked
+        self.ifaces: List[CoreInterface] = []
+        self.index: Dict[CoreInterface, int] = {}
+        self.linked: "np.ndarray" = np.zeros((0, 0), dtype=bool)
+
+    def set_linked(
+        self, iface1: CoreInterface, iface2: CoreInterface, value: bool
+    ) -> None:
+        """
+        Update the known link state for an interface pair, for changes made
+        outside of this engine.
+
+        :param iface1: interface one
+        :param iface2: interface two
+        :param value: True if linked, False otherwise
+        :return: nothing
+        """
+        index1 = self.index.get(iface1)
+        index2 = self.index.get(iface2)
+        if index1 is None or index2 is None:
+            return
+        self.linked[index1, index2] = value
+        self.linked[index2, index1] = value
+
+    def _sync(self, ifaces: List[CoreInterface]) -> None:
+        """
+        Update the tracked interfaces, carrying over the known link state for
+        existing interfaces and looking up the state for new ones.
+
+        :param ifaces: current interfaces
+        :return: nothing
+        """
+        if ifaces == self.ifaces:
+            return
+        size = len(ifaces)
+        linked = np.zeros((size, size), dtype=bool)
+        previous = np.array([self.index.get(x, -1) for x in ifaces], dtype=int)
+        known = np.nonzero(previous >= 0)[0]
+        linked[np.ix_(known, known)] = self.linked[
+            np.ix_(previous[known], previous[known])
+        ]
+        for i in np.nonzero(previous < 0)[0]:
+            for j in range(size):
+                if i == j or (previous[j] < 0 and j < i):
+                    continue
+                a = min(ifaces[i], ifaces[j])
+                b = max(ifaces[i], ifaces[j])
+                value = self.is_linked(a, b)
+                linked[i, j] = value
+                linked[j, i] = value
+        self.ifaces = ifaces
+        self.index = {x: i for i, x in enumerate(ifaces)}
+        self.linked = linked
+
+    def calculate(
+        self, positions: Dict[CoreInterface, Position], max_range: float
+    ) -> List[LinkDelta]:
+        """
+        Calculate which interface pairs are within range and return the pairs
+        whose state changed since the previous calculation. Pairs where either
+        interface has no x or y position are left unchanged.
+
+        :param positions: interface positions
+        :param max_range: max distance for interfaces to be in range
+        :return: ordered interface pairs and if they should now be linked
+        """
+        self._sync(list(positions))
+        size = len(self.ifaces)
+        if size < 2:
+            return []
+        values = [positions[x] for x in self.ifaces]
+        coords = np.array(
+            [[np.nan if v is None else v for v in value] for value in values],
+            dtype=float,
+        )
+        valid = ~np.isnan(coords[:, 0]) & ~np.isnan(coords[:, 1])
+        delta = coords[:, np.newaxis, :] - coords[np.newaxis, :, :]
+        # z is only considered when both positions have it
+        delta[:, :, 2] = np.nan_to_num(delta[:, :, 2])
+        distance = np.sqrt(np.sum(delta * delta, axis=2))
+        in_range = distance <= max_range
+        changed = (in_range != self.linked) & valid[:, np.newaxis] & valid
+        changed = np.triu(changed, k=1)
+        deltas = []
+        for i, j in zip(*np.nonzero(changed)):
+            value = bool(in_range[i, j])
+            self.linked[i, j] = value
+            self.linked[j, i] = value
+            a = min(self.ifaces[i], self.ifaces[j])
+            b = max(self.ifaces[i], self.ifaces[j])
+            deltas.append((a, b, value))
+        return deltas
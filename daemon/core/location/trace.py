@@ -0,0 +1,253 @@
+"""
+trace.py: compiled mobility traces, converting ns-2 mobility scripts into a binary
+file of time sorted waypoints that is memory mapped for playback, so waypoints can
+be read a window of time at a time rather than parsing an entire script.
+"""
+
+import logging
+import struct
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    logging.debug("numpy is not installed, compiled mobility traces not available")
+
+# identifies a compiled trace file and its version
+TRACE_MAGIC: bytes = b"CORETRC1"
+# magic, number of initial positions, number of waypoints
+TRACE_HEADER: struct.Struct = struct.Struct("<8sQQ")
+# number of parsed waypoints converted to an array at once when compiling
+COMPILE_CHUNK: int = 100000
+# seconds of waypoints read ahead of the current time during playback
+TRACE_WINDOW: float = 10.0
+if np is not None:
+    TRACE_DTYPE = np.dtype(
+        [
+            ("time", "<f8"),
+            ("node_id", "<i4"),
+            ("x", "<f8"),
+            ("y", "<f8"),
+            ("z", "<f8"),
+            ("speed", "<f8"),
+        ]
+    )
+
+
+class ScriptEntry(NamedTuple):
+    """
+    An initial position or waypoint parsed from an ns-2 mobility script.
+    """
+
+    initial: bool
+    time: float
+    node_id: int
+    x: float
+    y: float
+    z: Optional[float]
+    speed: float
+
+
+def is_available() -> bool:
+    """
+    Check if compiled mobility traces can be used.
+
+    :return: True if numpy is installed, False otherwise
+    """
+    return np is not None
+
+
+def parse_ns2_script(lines: Iterable[str], file_name: str) -> Iterator[ScriptEntry]:
+    """
+    Parse the initial positions and waypoints from ns-2 mobility script lines,
+    skipping lines that are invalid.
+
+    :param lines: script lines to parse
+    :param file_name: name of script, used for logging
+    :return: parsed entries, in script order
+    """
+    ln = 0
+    ix = iy = iz = None
+    inodenum = None
+    for line in lines:
+        ln += 1
+        if line[:2] != "$n":
+            continue
+        try:
+            if line[:8] == "$ns_ at ":
+                if ix is not None and iy is not None:
+                    yield ScriptEntry(True, 0.0, int(inodenum), ix, iy, iz, 0.0)
+                    ix = iy = iz = None
+                # waypoints:
+                #    $ns_ at 1.00 "$node_(6) setdest 500.0 178.0 25.0"
+                parts = line.split()
+                time = float(parts[2])
+                nodenum = parts[3][1 + parts[3].index("(") : parts[3].index(")")]
+                x = float(parts[5])
+                y = float(parts[6])
+                speed = float(parts[7].strip('"'))
+                yield ScriptEntry(False, time, int(nodenum), x, y, None, speed)
+            elif line[:7] == "$node_(":
+                # initial position (time=0, speed=0):
+                #    $node_(6) set X_ 780.0
+                parts = line.split()
+                nodenum = parts[0][1 + parts[0].index("(") : parts[0].index(")")]
+                if parts[2] == "X_":
+                    if ix is not None and iy is not None:
+                        yield ScriptEntry(True, 0.0, int(inodenum), ix, iy, iz, 0.0)
+                        ix = iy = iz = None
+                    ix = float(parts[3])
+                elif parts[2] == "Y_":
+                    iy = float(parts[3])
+                elif parts[2] == "Z_":
+                    iz = float(parts[3])
+                    yield ScriptEntry(True, 0.0, int(nodenum), ix, iy, iz, 0.0)
+                    ix = iy = iz = None
+                inodenum = nodenum
+            else:
+                raise ValueError
+        except ValueError:
+            logging.exception("skipping line %d of file %s '%s'", ln, file_name, line)
+            continue
+    if ix is not None and iy is not None:
+        yield ScriptEntry(True, 0.0, int(inodenum), ix, iy, iz, 0.0)
+
+
+def is_trace_file(path: str) -> bool:
+    """
+    Check if a file is a compiled mobility trace.
+
+    :param path: path of file to check
+    :return: True if a compiled trace, False otherwise
+    """
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(TRACE_MAGIC)) == TRACE_MAGIC
+    except IOError:
+        return False
+
+
+def _to_array(rows: List[Tuple]) -> "np.ndarray":
+    return np.array(rows, dtype=TRACE_DTYPE)
+
+
+def compile_ns2_script(script_path: str, trace_path: str) -> Tuple[int, int]:
+    """
+    Compile an ns-2 mobility script into a trace file, with waypoints sorted by
+    time then node id.
+
+    :param script_path: path of ns-2 script to compile
+    :param trace_path: path of trace file to write
+    :return: number of initial positions and waypoints written
+    :raises ImportError: when numpy is not installed
+    """
+    if np is None:
+        raise ImportError("numpy is required for compiled mobility traces")
+    nan = float("nan")
+    initial = {}
+    chunks = []
+    rows = []
+    with open(script_path, "r") as f:
+        for entry in parse_ns2_script(f, script_path):
+            z = nan if entry.z is None else entry.z
+            row = (entry.time, entry.node_id, entry.x, entry.y, z, entry.speed)
+            if entry.initial:
+                initial[entry.node_id] = row
+                continue
+            rows.append(row)
+            if len(rows) == COMPILE_CHUNK:
+                chunks.append(_to_array(rows))
+                rows = []
+    chunks.append(_to_array(rows))
+    waypoints = np.concatenate(chunks)
+    waypoints = waypoints[np.lexsort((waypoints["node_id"], waypoints["time"]))]
+    initial = _to_array(list(initial.values()))
+    with open(trace_path, "wb") as f:
+        f.write(TRACE_HEADER.pack(TRACE_MAGIC, len(initial), len(waypoints)))
+        f.write(initial.tobytes())
+        f.write(waypoints.tobytes())
+    return len(initial), len(waypoints)
+
+
+def _position(value: float) -> Optional[float]:
+    return None if value != value else value
+
+
+class MobilityTrace:
+    """
+    A memory mapped compiled mobility trace, read a window of waypoints at a time.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Create a MobilityTrace instance.
+
+        :param path: path of compiled trace file
+        :raises ImportError: when numpy is not installed
+        :raises ValueError: when file is not a compiled trace
+        """
+        if np is None:
+            raise ImportError("numpy is required for compiled mobility traces")
+        with open(path, "rb") as f:
+            header = f.read(TRACE_HEADER.size)
+        if len(header) != TRACE_HEADER.size:
+            raise ValueError(f"invalid mobility trace: {path}")
+        magic, initial_count, waypoint_count = TRACE_HEADER.unpack(header)
+        if magic != TRACE_MAGIC:
+            raise ValueError(f"invalid mobility trace: {path}")
+        self.path: str = path
+        offset = TRACE_HEADER.size
+        self.initial: "np.ndarray" = self._map(offset, initial_count)
+        offset += initial_count * TRACE_DTYPE.itemsize
+        self.waypoints: "np.ndarray" = self._map(offset, waypoint_count)
+        self.times: "np.ndarray" = self.waypoints["time"]
+
+    def _map(self, offset: int, count: int) -> "np.ndarray":
+        if not count:
+            return np.zeros(0, dtype=TRACE_DTYPE)
+        return np.memmap(
+            self.path, dtype=TRACE_DTYPE, mode="r", offset=offset, shape=(count,)
+        )
+
+    def __len__(self) -> int:
+        return len(self.waypoints)
+
+    @property
+    def end_time(self) -> float:
+        """
+        Time of the last waypoint in the trace.
+
+        :return: last waypoint time, 0 when there are no waypoints
+        """
+        if not len(self.times):
+            return 0.0
+        return float(self.times[-1])
+
+    def initial_positions(self) -> Iterator[Tuple[int, float, float, Optional[float]]]:
+        """
+        Iterate over the initial positions in the trace.
+
+        :return: node id and x, y, z position
+        """
+        for row in self.initial.tolist():
+            _, node_id, x, y, z, _ = row
+            yield node_id, x, y, _position(z)
+
+    def window(
+        self, index: int, end_time: float
+    ) -> Tuple[List[Tuple[float, int, float, float, Optional[float], float]], int]:
+        """
+        Read waypoints starting from an index, up to and including a time.
+
+        :param index: index of first waypoint to read
+        :param end_time: time of last waypoints to read
+        :return: time, node id, x, y, z, and speed for each waypoint read, and the
+            index to read the next window from
+        """
+        end = int(np.searchsorted(self.times, end_time, side="right"))
+        end = max(end, index)
+        waypoints = []
+        for _time, node_id, x, y, z, speed in self.waypoints[index:end].tolist():
+            waypoints.append((_time, node_id, x, y, _position(z), speed))
+        return waypoints, end
@@ -0,0 +1,80 @@
+"""
+waypointengine.py: vectorized waypoint movement, advancing all nodes moving
+towards waypoints in a single step using numpy.
+"""
+
+import logging
+from typing import List, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    logging.debug("numpy is not installed, vectorized waypoint engine not available")
+
+Point = Tuple[float, float]
+
+
+def is_available() -> bool:
+    """
+    Check if the vectorized waypoint engine can be used.
+
+    :return: True if numpy is installed, False otherwise
+    """
+    return np is not None
+
+
+class NumpyWaypointEngine:
+    """
+    Moves nodes towards their waypoints at their waypoint speeds, calculating
+    the next position for all nodes at once.
+    """
+
+    def __init__(self) -> None:
+        """
+        Create a NumpyWaypointEngine instance.
+        """
+        if np is None:
+            raise ImportError("numpy is required for the vectorized waypoint engine")
+
+    def move(
+        self,
+        positions: List[Point],
+        targets: List[Point],
+        speeds: List[float],
+        dt: float,
+    ) -> Tuple[List[Point], List[bool], List[bool]]:
+        """
+        Calculate the next positions for nodes moving towards waypoints. Nodes with
+        a speed of zero move directly to their waypoint, otherwise nodes move
+        along the line to their waypoint without overshooting it, and are kept
+        from moving below zero.
+
+        :param positions: current x, y position for each node
+        :param targets: x, y waypoint position for each node
+        :param speeds: waypoint speed for each node
+        :param dt: time since the last move
+        :return: next x, y position for each node, if each node moved, and if each
+            node has reached its waypoint
+        """
+        current = np.array(positions, dtype=float).reshape(-1, 2)
+        target = np.array(targets, dtype=float).reshape(-1, 2)
+        speed = np.array(speeds, dtype=float)
+        delta = target - current
+        distance = np.hypot(delta[:, 0], delta[:, 1])
+        # direction of travel, nodes already at their waypoint do not move
+        direction = np.zeros_like(delta)
+        moving = distance > 0
+        direction[moving] = delta[moving] / distance[moving, np.newaxis]
+        step = direction * (speed * dt)[:, np.newaxis]
+        # prevent overshoot
+        overshoot = np.abs(step) > np.abs(delta)
+        step[overshoot] = delta[overshoot]
+        stopped = (step[:, 0] == 0.0) & (step[:, 1] == 0.0)
+        result = np.maximum(current + step, 0.0)
+        # instantaneous moves
+        instant = speed == 0
+        result[instant] = target[instant]
+        moved = instant | ~stopped
+        arrived = instant | stopped
+        return result.tolist(), moved.tolist(), arrived.tolist()
@@ -13,12 +13,15 @@ import netaddr
 
 from core import utils
 from core.configservice.dependencies import ConfigServiceDependencies
+from core.emulator.commandstats import command_name
 from core.emulator.data import InterfaceData, LinkData, LinkOptions
 from core.emulator.enumerations import LinkTypes, MessageFlags, NodeTypes
 from core.errors import CoreCommandError, CoreError
 from core.executables import MOUNT, VNODED
+from core.nodes.cgroup import NodeCgroup, cgroups_available
 from core.nodes.client import VnodeClient
 from core.nodes.interface import CoreInterface, TunTap, Veth
+from core.nodes.netbatch import active_batch
 from core.nodes.netclient import LinuxNetClient, get_net_client
 
 if TYPE_CHECKING:
@@ -73,10 +76,30 @@ class NodeBase(abc.ABC):
         self.icon: Optional[str] = None
         self.position: Position = Position()
         self.up: bool = False
+        run = self.host_cmd
+        if self.local_only():
+            run = self.session.deferred_run(run)
         self.net_client: LinuxNetClient = get_net_client(
-            self.session.use_ovs(), self.host_cmd
+            self.session.use_ovs(), run, self.use_netlink()
         )
 
+    def local_only(self) -> bool:
+        """
+        Check if host network configuration for this node only applies to the
+        local host.
+
+        :return: True if only on the local host, False otherwise
+        """
+        return self.server is None
+
+    def use_netlink(self) -> bool:
+        """
+        Check if network configuration for this node can be done over netlink.
+
+        :return: True if netlink can be used, False otherwise
+        """
+        return self.session.use_netlink() and self.local_only()
+
     @abc.abstractmethod
     def startup(self) -> None:
         """
@@ -115,9 +138,10 @@ class NodeBase(abc.ABC):
         :raises CoreCommandError: when a non-zero exit status occurs
         """
         if self.server is None:
-            return utils.cmd(args, env, cwd, wait, shell)
+            with self.session.track_cmd(args, self):
+                return utils.cmd(args, env, cwd, wait, shell)
         else:
-            return self.server.remote_cmd(args, env, cwd, wait)
+            return self.server.remote_cmd(args, env, cwd, wait, self)
 
     def setposition(self, x: float = None, y: float = None, z: float = None) -> bool:
         """
@@ -472,6 +496,9 @@ class CoreNode(CoreNodeBase):
         self.pid: Optional[int] = None
         self.lock: RLock = RLock()
         self._mounts: List[Tuple[str, str]] = []
+        self.cgroup: Optional[NodeCgroup] = None
+        self.cpu_limit: Optional[float] = None
+        self.memory_limit: Optional[int] = None
         self.node_net_client: LinuxNetClient = self.create_node_net_client(
             self.session.use_ovs()
         )
@@ -484,7 +511,10 @@ class CoreNode(CoreNodeBase):
         :param use_ovs: True for OVS bridges, False for Linux bridges
         :return: node network client
         """
-        return get_net_client(use_ovs, self.cmd)
+        run = self.cmd
+        if self.local_only():
+            run = self.session.deferred_run(run, f"node{self.id}")
+        return get_net_client(use_ovs, run, self.use_netlink(), lambda: self.pid)
 
     def alive(self) -> bool:
         """
@@ -525,9 +555,11 @@ class CoreNode(CoreNodeBase):
             output = self.host_cmd(vnoded, env=env)
             self.pid = int(output)
             logging.debug("node(%s) pid: %s", self.name, self.pid)
+            self.create_cgroup()
 
             # create vnode client
-            self.client = VnodeClient(self.name, self.ctrlchnlname)
+            use_executor = self.session.options.get_config("node_executor") == "1"
+            self.client = VnodeClient(self.name, self.ctrlchnlname, use_executor)
 
             # bring up the loopback interface
             logging.debug("bringing up loopback interface")
@@ -569,6 +601,9 @@ class CoreNode(CoreNodeBase):
                     self.host_cmd(f"kill -9 {self.pid}")
                 except CoreCommandError:
                     logging.exception("error killing process")
+                if self.cgroup:
+                    self.cgroup.remove()
+                    self.cgroup = None
 
                 # remove node directory if present
                 try:
@@ -579,12 +614,58 @@ class CoreNode(CoreNodeBase):
                 # clear interface data, close client, and mark self and not up
                 self.ifaces.clear()
                 self.client.close()
+                self.node_net_client.close()
                 self.up = False
             except OSError:
                 logging.exception("error during shutdown")
             finally:
                 self.rmnodedir()
 
+    def create_cgroup(self) -> None:
+        """
+        Place the node process within its own cgroup, for tracking resources used
+        by the node and applying its limits. Only local nodes are placed within
+        cgroups, when cgroup v2 is available.
+
+        :return: nothing
+        """
+        has_limits = self.cpu_limit or self.memory_limit
+        if self.server is not None or not cgroups_available():
+            if has_limits:
+                logging.warning(
+                    "node(%s) limits ignored, cgroup v2 is not available", self.name
+                )
+            return
+        cgroup = NodeCgroup(self.session.id, self.id)
+        try:
+            cgroup.create(self.pid)
+        except OSError:
+            logging.exception("node(%s) error creating cgroup", self.name)
+            if has_limits:
+                logging.warning("node(%s) limits ignored, no cgroup", self.name)
+            return
+        self.cgroup = cgroup
+        if has_limits:
+            self.set_limits(self.cpu_limit, self.memory_limit)
+
+    def set_limits(self, cpu: Optional[float], memory: Optional[int]) -> None:
+        """
+        Set resource limits for the node, applied to its cgroup when present.
+
+        :param cpu: number of cpus available, None for no limit
+        :param memory: memory available in megabytes, None for no limit
+        :return: nothing
+        """
+        self.cpu_limit = cpu
+        self.memory_limit = memory
+        if self.cgroup:
+            try:
+                self.cgroup.set_limits(cpu, memory)
+            except OSError:
+                logging.exception("node(%s) error setting limits", self.name)
+        elif self.up and (cpu or memory):
+            logging.warning("node(%s) limits ignored, no cgroup", self.name)
+
     def cmd(self, args: str, wait: bool = True, shell: bool = False) -> str:
         """
         Runs a command that is used to configure and setup the network within a
@@ -596,11 +677,27 @@ class CoreNode(CoreNodeBase):
         :return: combined stdout and stderr
         :raises CoreCommandError: when a non-zero exit status occurs
         """
+        name = f"node:{command_name(args)}"
         if self.server is None:
-            return self.client.check_cmd(args, wait=wait, shell=shell)
+            with self.session.track_cmd(args, self, name):
+                return self.client.check_cmd(args, wait=wait, shell=shell)
         else:
             args = self.client.create_cmd(args, shell)
-            return self.server.remote_cmd(args, wait=wait)
+            return self.server.remote_cmd(args, wait=wait, node=self, name=name)
+
+    def cmds(self, args: List[str], shell: bool = False) -> List[str]:
+        """
+        Runs a batch of commands in order within a local node, using a single
+        round trip when possible. Stops at the first non-zero exit status.
+
+        :param args: commands to run
+        :param shell: True to use shell, False otherwise
+        :return: combined stdout and stderr for each command
+        :raises CoreCommandError: when a non-zero exit status occurs
+        """
+        batch = "; ".join(args)
+        with self.session.track_cmd(batch, self, "node:batch", len(args)):
+            return self.client.check_cmds(args, shell)
 
     def termcmdstring(self, sh: str = "/bin/sh") -> str:
         """
@@ -696,24 +793,41 @@ class CoreNode(CoreNodeBase):
             veth.name = ifname
 
             if self.up:
-                flow_id = self.node_net_client.get_ifindex(veth.name)
-                veth.flow_id = int(flow_id)
-                logging.debug("interface flow index: %s - %s", veth.name, veth.flow_id)
-                mac = self.node_net_client.get_mac(veth.name)
-                logging.debug("interface mac: %s - %s", veth.name, mac)
-                veth.set_mac(mac)
+                net_batch = active_batch(self.node_net_client.run)
+                if net_batch:
+                    # device state can not be read until deferred commands are applied
+                    veth.set_mac(utils.random_mac())
+                    self.node_net_client.device_mac(veth.name, str(veth.mac))
+                    net_batch.after(self.set_flow_id, veth)
+                else:
+                    self.set_flow_id(veth)
+                    mac = self.node_net_client.get_mac(veth.name)
+                    logging.debug("interface mac: %s - %s", veth.name, mac)
+                    veth.set_mac(mac)
 
             try:
                 # add network interface to the node. If unsuccessful, destroy the
                 # network interface and raise exception.
                 self.add_iface(veth, iface_id)
+                if self.server is None:
+                    self.session.throughput.add_iface(veth.localname, self.id, iface_id)
             except ValueError as e:
                 veth.shutdown()
                 del veth
                 raise e
-
             return iface_id
 
+    def set_flow_id(self, iface: CoreInterface) -> None:
+        """
+        Set the flow id for an interface from its device index.
+
+        :param iface: interface to set flow id for
+        :return: nothing
+        """
+        flow_id = self.node_net_client.get_ifindex(iface.name)
+        iface.flow_id = int(flow_id)
+        logging.debug("interface flow index: %s - %s", iface.name, iface.flow_id)
+
     def newtuntap(self, iface_id: int = None, ifname: str = None) -> int:
         """
         Create a new tunnel tap.
@@ -837,9 +951,7 @@ class CoreNode(CoreNodeBase):
         logging.info("adding file from %s to %s", srcname, filename)
         directory = os.path.dirname(filename)
         if self.server is None:
-            self.client.check_cmd(f"mkdir -p {directory}")
-            self.client.check_cmd(f"mv {srcname} {filename}")
-            self.client.check_cmd("sync")
+            self.cmds([f"mkdir -p {directory}", f"mv {srcname} {filename}", "sync"])
         else:
             self.host_cmd(f"mkdir -p {directory}")
             self.server.remote_put(srcname, filename)
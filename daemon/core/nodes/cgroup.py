@@ -0,0 +1,192 @@
+"""
+cgroup.py: places node processes within a cgroup v2 hierarchy, to account for and
+optionally limit the cpu, memory, and processes used by each node.
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+CGROUP_ROOT: str = "/sys/fs/cgroup"
+CGROUP_CONTROLLERS: str = "+cpu +memory +pids"
+# period used for cpu limits, in microseconds
+CPU_PERIOD: int = 100000
+# time to wait for killed processes to leave a cgroup before removing it
+REMOVE_TIMEOUT: float = 2.0
+REMOVE_INTERVAL: float = 0.01
+
+
+@dataclass
+class CgroupStats:
+    """
+    Resource usage for a cgroup.
+    """
+
+    cpu_usage: int
+    memory: int
+    pids: int
+
+
+def cgroups_available() -> bool:
+    """
+    Check if a cgroup v2 hierarchy is mounted.
+
+    :return: True if available, False otherwise
+    """
+    return os.path.exists(os.path.join(CGROUP_ROOT, "cgroup.controllers"))
+
+
+def _write(path: str, value: str) -> None:
+    with open(path, "w") as f:
+        f.write(value)
+
+
+def _read(path: str) -> str:
+    with open(path, "r") as f:
+        return f.read().strip()
+
+
+def _enable_controllers(path: str) -> None:
+    """
+    Enable controllers for children of a cgroup, ignoring controllers the cgroup
+    does not have available.
+
+    :param path: cgroup path
+    :return: nothing
+    """
+    try:
+        _write(os.path.join(path, "cgroup.subtree_control"), CGROUP_CONTROLLERS)
+    except OSError:
+        logging.debug("unable to enable cgroup controllers: %s", path)
+
+
+class NodeCgroup:
+    """
+    A cgroup containing the processes for a single node, within a cgroup for its
+    session.
+    """
+
+    def __init__(self, session_id: int, node_id: int) -> None:
+        """
+        Create a NodeCgroup instance.
+
+        :param session_id: id of session node belongs to
+        :param node_id: id of node
+        """
+        self.core_path: str = os.path.join(CGROUP_ROOT, "core")
+        self.session_path: str = os.path.join(self.core_path, str(session_id))
+        self.path: str = os.path.join(self.session_path, f"node{node_id}")
+
+    def create(self, pid: int) -> None:
+        """
+        Create this cgroup and move the provided process into it, processes it
+        creates afterwards will also belong to the cgroup.
+
+        :param pid: process to move into cgroup
+        :return: nothing
+        :raises OSError: when the cgroup could not be created
+        """
+        parent = CGROUP_ROOT
+        for path in [self.core_path, self.session_path]:
+            _enable_controllers(parent)
+            os.makedirs(path, exist_ok=True)
+            parent = path
+        _enable_controllers(parent)
+        os.makedirs(self.path, exist_ok=True)
+        _write(os.path.join(self.path, "cgroup.procs"), str(pid))
+
+    def set_limits(self, cpu: Optional[float], memory: Optional[int]) -> None:
+        """
+        Limit the resources available to this cgroup.
+
+        :param cpu: number of cpus available, None for no limit
+        :param memory: memory available in megabytes, None for no limit
+        :return: nothing
+        :raises OSError: when limits could not be set
+        """
+        cpu_max = "max"
+        if cpu:
+            cpu_max = str(int(cpu * CPU_PERIOD))
+        _write(os.path.join(self.path, "cpu.max"), f"{cpu_max} {CPU_PERIOD}")
+        memory_max = "max"
+        if memory:
+            memory_max = str(memory * 1024 * 1024)
+        _write(os.path.join(self.path, "memory.max"), memory_max)
+
+    def stats(self) -> CgroupStats:
+        """
+        Read resource usage for this cgroup.
+
+        :return: cgroup resource usage
+        :raises OSError: when the cgroup does not exist
+        """
+        cpu_stat: Dict[str, int] = {}
+        for line in _read(os.path.join(self.path, "cpu.stat")).splitlines():
+            key, value = line.split()
+            cpu_stat[key] = int(value)
+        memory = int(_read(os.path.join(self.path, "memory.current")))
+        pids = int(_read(os.path.join(self.path, "pids.current")))
+        return CgroupStats(
+            cpu_usage=cpu_stat.get("usage_usec", 0), memory=memory, pids=pids
+        )
+
+    def kill(self) -> None:
+        """
+        Kill all processes remaining within this cgroup, when supported by the
+        kernel.
+
+        :return: nothing
+        """
+        path = os.path.join(self.path, "cgroup.kill")
+        if not os.path.exists(path):
+            return
+        try:
+            _write(path, "1")
+        except OSError:
+            logging.debug("unable to kill cgroup processes: %s", self.path)
+
+    def wait_empty(self, timeout: float = REMOVE_TIMEOUT) -> bool:
+        """
+        Wait for all processes to leave this cgroup, as killed processes are
+        only removed once they have exited.
+
+        :param timeout: maximum time to wait
+        :return: True if empty, False otherwise
+        """
+        end = time.monotonic() + timeout
+        while True:
+            try:
+                if not _read(os.path.join(self.path, "cgroup.procs")):
+                    return True
+            except OSError:
+                return True
+            if time.monotonic() >= end:
+                return False
+            time.sleep(REMOVE_INTERVAL)
+
+    def remove(self) -> None:
+        """
+        Remove this cgroup once its processes have exited, along with the session
+        and core cgroups when they are empty.
+
+        :return: nothing
+        """
+        self.kill()
+        if not self.wait_empty():
+            logging.warning("cgroup processes did not exit: %s", self.path)
+        try:
+            os.rmdir(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logging.warning("unable to remove cgroup: %s", self.path, exc_info=True)
+            return
+        # parents are still in use while other nodes or sessions are running
+        for path in [self.session_path, self.core_path]:
+            try:
+                os.rmdir(path)
+            except OSError:
+                logging.debug("cgroup still in use: %s", path)
+                break
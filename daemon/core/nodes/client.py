@@ -4,8 +4,14 @@ over a control channel to the vnoded process running in a network namespace.
 The control channel can be accessed via calls using the vcmd shell.
 """
 
+import logging
+import sys
+from typing import List, Optional
+
 from core import utils
+from core.errors import CoreCommandError
 from core.executables import BASH, VCMD
+from core.nodes.executor import ExecutorError, NodeExecutor, create_request
 
 
 class VnodeClient:
@@ -13,15 +19,50 @@ class VnodeClient:
     Provides client functionality for interacting with a virtual node.
     """
 
-    def __init__(self, name: str, ctrlchnlname: str) -> None:
+    def __init__(
+        self, name: str, ctrlchnlname: str, use_executor: bool = False
+    ) -> None:
         """
         Create a VnodeClient instance.
 
         :param name: name for client
         :param ctrlchnlname: control channel name
+        :param use_executor: True to run commands using a long running executor
+            within the node, False to run each command using vcmd
         """
         self.name: str = name
         self.ctrlchnlname: str = ctrlchnlname
+        self.executor: Optional[NodeExecutor] = None
+        if use_executor:
+            self.start_executor()
+
+    def start_executor(self) -> None:
+        """
+        Launch a long running executor within the node, using a single vcmd call,
+        that will be used to run commands instead of vcmd when running.
+
+        :return: nothing
+        """
+        launch = [VCMD, "-c", self.ctrlchnlname, "--"]
+        launch += [sys.executable, "-m", "core.nodes.executor"]
+        executor = NodeExecutor(launch)
+        try:
+            executor.start()
+            self.executor = executor
+        except ExecutorError:
+            logging.exception("node(%s) falling back to vcmd", self.name)
+
+    def _executor_failed(self) -> None:
+        """
+        Stop using a failed executor, falling back to running commands with vcmd.
+
+        :return: nothing
+        """
+        logging.exception("node(%s) executor failed, falling back to vcmd", self.name)
+        executor = self.executor
+        self.executor = None
+        if executor:
+            executor.close()
 
     def _verify_connection(self) -> None:
         """
@@ -47,7 +88,9 @@ class VnodeClient:
 
         :return: nothing
         """
-        pass
+        if self.executor:
+            self.executor.close()
+            self.executor = None
 
     def create_cmd(self, args: str, shell: bool = False) -> str:
         if shell:
@@ -65,5 +108,39 @@ class VnodeClient:
         :raises core.CoreCommandError: when there is a non-zero exit status
         """
         self._verify_connection()
+        if self.executor:
+            try:
+                return self.executor.run(args, wait, shell)
+            except ExecutorError:
+                self._executor_failed()
         args = self.create_cmd(args, shell)
         return utils.cmd(args, wait=wait, shell=shell)
+
+    def check_cmds(self, cmds: List[str], shell: bool = False) -> List[str]:
+        """
+        Run a batch of commands in order, using a single round trip to the executor
+        when one is running. Stops at the first command with a non-zero exit status.
+        When the executor fails during the batch, only the commands it did not run
+        are ran again using vcmd.
+
+        :param cmds: commands to run
+        :param shell: True to use shell, False otherwise
+        :return: combined stdout and stderr for each command
+        :raises core.CoreCommandError: when there is a non-zero exit status
+        """
+        self._verify_connection()
+        outputs = []
+        if self.executor:
+            requests = [create_request(x, shell=shell) for x in cmds]
+            try:
+                results = self.executor.run_batch(requests)
+            except ExecutorError as e:
+                results = e.results
+                self._executor_failed()
+            for args, (status, stdout, stderr) in zip(cmds, results):
+                if status != 0:
+                    raise CoreCommandError(status, args, stdout, stderr)
+                outputs.append(stdout)
+        for args in cmds[len(outputs) :]:
+            outputs.append(self.check_cmd(args, shell=shell))
+        return outputs
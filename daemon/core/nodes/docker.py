@@ -5,6 +5,7 @@ from tempfile import NamedTemporaryFile
 from typing import TYPE_CHECKING, Callable, Dict, Optional
 
 from core import utils
+from core.emulator.commandstats import command_name
 from core.emulator.distributed import DistributedServer
 from core.emulator.enumerations import NodeTypes
 from core.errors import CoreCommandError
@@ -146,12 +147,13 @@ class DockerNode(CoreNode):
             self.up = False
 
     def nsenter_cmd(self, args: str, wait: bool = True, shell: bool = False) -> str:
+        name = f"docker:{command_name(args)}"
+        args = self.client.create_ns_cmd(args)
         if self.server is None:
-            args = self.client.create_ns_cmd(args)
-            return utils.cmd(args, wait=wait, shell=shell)
+            with self.session.track_cmd(args, self, name):
+                return utils.cmd(args, wait=wait, shell=shell)
         else:
-            args = self.client.create_ns_cmd(args)
-            return self.server.remote_cmd(args, wait=wait)
+            return self.server.remote_cmd(args, wait=wait, node=self, name=name)
 
     def termcmdstring(self, sh: str = "/bin/sh") -> str:
         """
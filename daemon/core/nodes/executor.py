@@ -0,0 +1,390 @@
+"""
+executor.py: long running command executor for nodes. A single worker process is
+launched within a node's namespaces and runs commands sent to it over a pipe,
+avoiding the fork and exec of a vcmd process for every command run within a node.
+
+Requests and responses are framed as a 4 byte big endian length followed by a json
+payload. Every frame sent to the worker is a batch of requests tagged with an id,
+and batches run concurrently within the worker. A frame is returned for each
+command as it completes, tagged with the id of its batch, so the results received
+show which commands of a batch have run. A batch stops running at the first
+command with a non-zero exit status, so fewer results may be returned.
+"""
+
+import json
+import logging
+import os
+import shlex
+import struct
+import sys
+import threading
+from dataclasses import dataclass, field
+from subprocess import DEVNULL, PIPE, Popen
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+from core.errors import CoreCommandError
+from core.executables import BASH
+
+HEADER: struct.Struct = struct.Struct("!I")
+ExecutorRequest = Dict[str, Any]
+ExecutorResult = Tuple[int, str, str]
+
+
+class ExecutorError(Exception):
+    """
+    Used when the executor worker can no longer be communicated with.
+    """
+
+    def __init__(self, message: str, results: List[ExecutorResult] = None) -> None:
+        """
+        Create an ExecutorError instance.
+
+        :param message: error message
+        :param results: results received for a batch before the error, these
+            commands have already been run
+        """
+        super().__init__(message)
+        self.results: List[ExecutorResult] = results or []
+
+
+def write_frame(stream: IO[bytes], data: Any) -> None:
+    """
+    Write a json serializable value as a single frame.
+
+    :param stream: stream to write frame to
+    :param data: data to write
+    :return: nothing
+    """
+    payload = json.dumps(data).encode("utf-8")
+    stream.write(HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+
+def read_frame(stream: IO[bytes]) -> Optional[Any]:
+    """
+    Read a single frame and decode its json payload.
+
+    :param stream: stream to read frame from
+    :return: decoded frame data, None when the stream has been closed
+    """
+    header = _read_exact(stream, HEADER.size)
+    if header is None:
+        return None
+    (length,) = HEADER.unpack(header)
+    payload = _read_exact(stream, length)
+    if payload is None:
+        return None
+    return json.loads(payload.decode("utf-8"))
+
+
+def _read_exact(stream: IO[bytes], size: int) -> Optional[bytes]:
+    """
+    Read an exact number of bytes from a stream.
+
+    :param stream: stream to read from
+    :param size: number of bytes to read
+    :return: bytes read, None when the stream closed early
+    """
+    data = b""
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def create_request(
+    args: str, wait: bool = True, shell: bool = False
+) -> ExecutorRequest:
+    """
+    Create a request to run a command within the executor.
+
+    :param args: command to run
+    :param wait: True to wait for status, False otherwise
+    :param shell: True to use shell, False otherwise
+    :return: executor request
+    """
+    return dict(args=args, wait=wait, shell=shell)
+
+
+@dataclass
+class PendingBatch:
+    """
+    A batch of requests sent to the worker, waiting for its results.
+    """
+
+    results: List[ExecutorResult] = field(default_factory=list)
+    done: threading.Event = field(default_factory=threading.Event)
+    error: Optional[str] = None
+
+
+class NodeExecutor:
+    """
+    Client side of a long running executor worker process.
+    """
+
+    def __init__(self, launch: List[str]) -> None:
+        """
+        Create a NodeExecutor instance.
+
+        :param launch: command used to launch the worker process
+        """
+        self.launch: List[str] = launch
+        self.process: Optional[Popen] = None
+        # serializes writing frames to the worker
+        self.lock: threading.Lock = threading.Lock()
+        # protects batches waiting for results
+        self.pending_lock: threading.Lock = threading.Lock()
+        self.pending: Dict[int, PendingBatch] = {}
+        self.request_id: int = 0
+        self.reading: bool = False
+        self.reader: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Launch the worker process.
+
+        :return: nothing
+        :raises ExecutorError: when the worker could not be launched
+        """
+        logging.debug("starting node executor: %s", self.launch)
+        try:
+            self.process = Popen(self.launch, stdin=PIPE, stdout=PIPE, stderr=DEVNULL)
+        except OSError as e:
+            raise ExecutorError(f"failed to launch executor: {e}")
+        self.reading = True
+        self.reader = threading.Thread(
+            target=self.read_results, args=(self.process.stdout,), daemon=True
+        )
+        self.reader.start()
+
+    def read_results(self, stream: IO[bytes]) -> None:
+        """
+        Thread target reading results from the worker and passing them to the
+        batch they belong to, until the worker closes. Batches still waiting when
+        the worker closes are failed.
+
+        :param stream: stream to read results from
+        :return: nothing
+        """
+        while True:
+            try:
+                frame = read_frame(stream)
+            except (OSError, ValueError):
+                logging.exception("executor communication error")
+                break
+            if frame is None:
+                break
+            with self.pending_lock:
+                batch = self.pending.get(frame["id"])
+                if batch is None:
+                    continue
+                batch.results.append(tuple(frame["result"]))
+                if frame["last"]:
+                    self.pending.pop(frame["id"])
+                    batch.done.set()
+        with self.pending_lock:
+            self.reading = False
+            for batch in self.pending.values():
+                batch.error = "executor closed unexpectedly"
+                batch.done.set()
+            self.pending.clear()
+
+    def running(self) -> bool:
+        """
+        Check if the worker process is running.
+
+        :return: True if running, False otherwise
+        """
+        return self.process is not None and self.process.poll() is None
+
+    def run_batch(self, requests: List[ExecutorRequest]) -> List[ExecutorResult]:
+        """
+        Run a batch of commands within the worker, with a single round trip.
+        Commands run in order and stop at the first non-zero exit status. Other
+        batches may run within the worker at the same time.
+
+        :param requests: requests for commands to run
+        :return: exit status, stdout, and stderr for each request that was run
+        :raises ExecutorError: when the worker can not be communicated with,
+            containing the results of commands that were run
+        """
+        if not requests:
+            return []
+        batch = PendingBatch()
+        with self.pending_lock:
+            if not self.reading or not self.running():
+                raise ExecutorError("executor is not running")
+            self.request_id += 1
+            request_id = self.request_id
+            self.pending[request_id] = batch
+        error = None
+        with self.lock:
+            if self.process is None:
+                error = "executor is not running"
+            else:
+                try:
+                    frame = dict(id=request_id, requests=requests)
+                    write_frame(self.process.stdin, frame)
+                except (OSError, ValueError) as e:
+                    error = f"executor communication error: {e}"
+        if error:
+            with self.pending_lock:
+                self.pending.pop(request_id, None)
+            raise ExecutorError(error)
+        batch.done.wait()
+        if batch.error:
+            raise ExecutorError(batch.error, batch.results)
+        return batch.results
+
+    def run(self, args: str, wait: bool = True, shell: bool = False) -> str:
+        """
+        Run a command within the worker.
+
+        :param args: command to run
+        :param wait: True to wait for status, False otherwise
+        :param shell: True to use shell, False otherwise
+        :return: stdout
+        :raises CoreCommandError: when there is a non-zero exit status
+        :raises ExecutorError: when the worker can not be communicated with
+        """
+        request = create_request(args, wait, shell)
+        status, stdout, stderr = self.run_batch([request])[0]
+        if status != 0:
+            raise CoreCommandError(status, args, stdout, stderr)
+        return stdout
+
+    def close(self) -> None:
+        """
+        Stop the worker process.
+
+        :return: nothing
+        """
+        with self.lock:
+            if self.process is None:
+                return
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            try:
+                self.process.wait(timeout=1)
+            except Exception:
+                self.process.kill()
+                self.process.wait()
+            if self.reader:
+                self.reader.join()
+                self.reader = None
+            self.process.stdout.close()
+            self.process = None
+
+
+class ExecutorWorker:
+    """
+    Worker side of the executor, runs within the node namespaces.
+    """
+
+    def __init__(self, reader: IO[bytes], writer: IO[bytes]) -> None:
+        """
+        Create an ExecutorWorker instance.
+
+        :param reader: stream to read requests from
+        :param writer: stream to write results to
+        """
+        self.reader: IO[bytes] = reader
+        self.writer: IO[bytes] = writer
+        # serializes writing results from concurrent batches
+        self.lock: threading.Lock = threading.Lock()
+        self.detached: List[Popen] = []
+
+    def run_request(self, request: ExecutorRequest) -> ExecutorResult:
+        """
+        Run a single request.
+
+        :param request: request to run
+        :return: exit status, stdout, and stderr
+        """
+        args = request["args"]
+        wait = request.get("wait", True)
+        if request.get("shell", False):
+            args = [BASH, "-c", args]
+        else:
+            args = shlex.split(args)
+        try:
+            if not wait:
+                p = Popen(args, stdin=DEVNULL, stdout=DEVNULL, stderr=DEVNULL)
+                with self.lock:
+                    self.detached.append(p)
+                return 0, "", ""
+            p = Popen(args, stdin=DEVNULL, stdout=PIPE, stderr=PIPE)
+            stdout, stderr = p.communicate()
+            stdout = stdout.decode("utf-8", "replace").strip()
+            stderr = stderr.decode("utf-8", "replace").strip()
+            return p.returncode, stdout, stderr
+        except OSError as e:
+            return 1, "", e.strerror
+
+    def reap(self) -> None:
+        """
+        Reap any finished commands that were not waited on.
+
+        :return: nothing
+        """
+        with self.lock:
+            self.detached = [x for x in self.detached if x.poll() is None]
+
+    def run_batch(self, request_id: int, requests: List[ExecutorRequest]) -> None:
+        """
+        Run a batch of requests in order, writing the result of each as it
+        completes and stopping at the first non-zero exit status.
+
+        :param request_id: id of batch
+        :param requests: requests to run
+        :return: nothing
+        """
+        for index, request in enumerate(requests):
+            result = self.run_request(request)
+            last = result[0] != 0 or index == len(requests) - 1
+            with self.lock:
+                write_frame(self.writer, dict(id=request_id, result=result, last=last))
+            if last:
+                break
+        self.reap()
+
+    def serve(self) -> None:
+        """
+        Serve requests until the reader is closed, running each batch within its
+        own thread.
+
+        :return: nothing
+        """
+        threads = []
+        while True:
+            frame = read_frame(self.reader)
+            if frame is None:
+                break
+            thread = threading.Thread(
+                target=self.run_batch, args=(frame["id"], frame["requests"])
+            )
+            thread.start()
+            threads = [x for x in threads if x.is_alive()]
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+
+
+def main() -> None:
+    # take ownership of stdio, so commands never write into the framed stream
+    reader = os.fdopen(os.dup(sys.stdin.fileno()), "rb", buffering=0)
+    writer = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    null_fd = os.open(os.devnull, os.O_RDWR)
+    os.dup2(null_fd, sys.stdin.fileno())
+    os.dup2(null_fd, sys.stdout.fileno())
+    os.close(null_fd)
+    worker = ExecutorWorker(reader, writer)
+    worker.serve()
+
+
+if __name__ == "__main__":
+    main()
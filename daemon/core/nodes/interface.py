@@ -68,8 +68,13 @@ class CoreInterface:
         # id used to find flow data
         self.flow_id: Optional[int] = None
         self.server: Optional["DistributedServer"] = server
+        run = self.host_cmd
+        use_netlink = False
+        if self.server is None:
+            run = self.session.deferred_run(run)
+            use_netlink = self.session.use_netlink()
         self.net_client: LinuxNetClient = get_net_client(
-            self.session.use_ovs(), self.host_cmd
+            self.session.use_ovs(), run, use_netlink
         )
 
     def host_cmd(
@@ -92,9 +97,10 @@ class CoreInterface:
         :raises CoreCommandError: when a non-zero exit status occurs
         """
         if self.server is None:
-            return utils.cmd(args, env, cwd, wait, shell)
+            with self.session.track_cmd(args, self.node):
+                return utils.cmd(args, env, cwd, wait, shell)
         else:
-            return self.server.remote_cmd(args, env, cwd, wait)
+            return self.server.remote_cmd(args, env, cwd, wait, self.node)
 
     def startup(self) -> None:
         """
@@ -385,6 +391,7 @@ class Veth(CoreInterface):
             except CoreCommandError:
                 pass
         if self.localname:
+            self.session.throughput.remove(self.localname)
             try:
                 self.net_client.delete_device(self.localname)
             except CoreCommandError:
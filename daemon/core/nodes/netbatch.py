@@ -0,0 +1,295 @@
+"""
+netbatch.py: deferred application of network commands. While a session is being
+built, ip and tc commands are recorded per namespace rather than ran one at a time,
+then applied with a few batch invocations per namespace when the session is
+instantiated. Changes made to a running session can record to their own batch,
+bound to the threads making the changes, so commands ran by other threads are not
+deferred with them.
+"""
+
+import contextlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from core import utils
+from core.errors import CoreCommandError
+from core.executables import ETHTOOL, IP, SYSCTL, TC
+
+BATCH_TOOLS: Tuple[str, ...] = (IP, TC)
+DEFERRED_TOOLS: Tuple[str, ...] = (ETHTOOL, SYSCTL, "hostname")
+HOST_KEY: str = "host"
+# keep batches well under the kernel limit for a single command argument
+MAX_BATCH_SIZE: int = 65536
+BATCH_DELIMITER: str = "CORE_BATCH"
+Callback = Tuple[Callable[..., None], Tuple[Any, ...], Dict[str, Any]]
+# batch bound to the current thread, used in place of the session batch
+_bound: threading.local = threading.local()
+
+
+def chunk_lines(lines: List[str], size: int = MAX_BATCH_SIZE) -> List[str]:
+    """
+    Join lines into chunks no larger than the given size.
+
+    :param lines: lines to join
+    :param size: max size of a chunk
+    :return: joined chunks of lines
+    """
+    chunks = []
+    current = []
+    current_size = 0
+    for line in lines:
+        if current and current_size + len(line) + 1 > size:
+            chunks.append("\n".join(current))
+            current = []
+            current_size = 0
+        current.append(line)
+        current_size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class BatchNamespace:
+    """
+    Commands recorded for a single namespace.
+    """
+
+    def __init__(self, run: Callable[..., str]) -> None:
+        """
+        Create a BatchNamespace instance.
+
+        :param run: function used to run commands within the namespace
+        """
+        self.run: Callable[..., str] = run
+        self.batches: Dict[str, List[str]] = {x: [] for x in BATCH_TOOLS}
+        self.commands: List[str] = []
+
+    def apply(self) -> None:
+        """
+        Apply recorded commands, running each tool in batch mode followed by any
+        other deferred commands, in the order they were recorded.
+
+        :return: nothing
+        :raises CoreCommandError: when a non-zero exit status occurs
+        """
+        for tool in BATCH_TOOLS:
+            for chunk in chunk_lines(self.batches[tool]):
+                args = (
+                    f"{tool} -batch - <<'{BATCH_DELIMITER}'\n"
+                    f"{chunk}\n{BATCH_DELIMITER}"
+                )
+                self.run(args, shell=True)
+        for args in self.commands:
+            self.run(args)
+
+
+class BatchRunner:
+    """
+    Run function provided to net clients, recording commands while its batch is
+    active and running them directly otherwise.
+    """
+
+    def __init__(self, batch: "NetBatch", key: str, run: Callable[..., str]) -> None:
+        """
+        Create a BatchRunner instance.
+
+        :param batch: batch to record commands to
+        :param key: key for the namespace commands are ran within
+        :param run: function used to run commands
+        """
+        self.batch: "NetBatch" = batch
+        self.key: str = key
+        self.run: Callable[..., str] = run
+
+    def active_batch(self) -> Optional["NetBatch"]:
+        """
+        Retrieve the batch commands ran within the current thread are recorded to,
+        the batch bound to the thread when present, otherwise the session batch.
+
+        :return: batch being recorded to, None when commands are ran directly
+        """
+        batch = getattr(_bound, "batch", None)
+        if batch is None:
+            batch = self.batch
+        if batch.active:
+            return batch
+        return None
+
+    def __call__(self, args: str, wait: bool = True, shell: bool = False) -> str:
+        batch = self.active_batch()
+        if wait and not shell and batch and batch.record(self.key, self.run, args):
+            return ""
+        return self.run(args, wait=wait, shell=shell)
+
+
+def active_batch(run: Callable[..., str]) -> Optional["NetBatch"]:
+    """
+    Retrieve the batch commands ran now using the given run function would be
+    recorded to.
+
+    :param run: run function to check
+    :return: batch being recorded to, None when commands are ran directly
+    """
+    if isinstance(run, BatchRunner):
+        return run.active_batch()
+    return None
+
+
+class NetBatch:
+    """
+    Records network commands while a session is being built, to apply them at once
+    when the session is instantiated.
+    """
+
+    def __init__(self) -> None:
+        """
+        Create a NetBatch instance.
+        """
+        self.active: bool = False
+        self.lock: threading.RLock = threading.RLock()
+        self.namespaces: Dict[str, BatchNamespace] = {}
+        self.callbacks: List[Callback] = []
+
+    def runner(self, key: str, run: Callable[..., str]) -> BatchRunner:
+        """
+        Create a run function for net clients that records to this batch.
+
+        :param key: key for the namespace commands are ran within
+        :param run: function used to run commands
+        :return: batch run function
+        """
+        return BatchRunner(self, key, run)
+
+    def start(self) -> None:
+        """
+        Start recording commands.
+
+        :return: nothing
+        """
+        with self.lock:
+            logging.info("deferring network commands")
+            self.active = True
+
+    @contextlib.contextmanager
+    def bind(self) -> Iterator[None]:
+        """
+        Record commands ran by net clients within the current thread to this batch,
+        in place of the session batch, while within this context.
+
+        :return: nothing
+        """
+        previous = getattr(_bound, "batch", None)
+        _bound.batch = self
+        try:
+            yield
+        finally:
+            _bound.batch = previous
+
+    def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Call a function with this batch bound to the current thread.
+
+        :param func: function to call
+        :param args: arguments to call function with
+        :param kwargs: keyword arguments to call function with
+        :return: function result
+        """
+        with self.bind():
+            return func(*args, **kwargs)
+
+    def record(self, key: str, run: Callable[..., str], args: str) -> bool:
+        """
+        Record a command to run later. Commands that can not be deferred, such as
+        those that read state, will first apply everything recorded so far.
+
+        :param key: key for the namespace command is ran within
+        :param run: function used to run commands within namespace
+        :param args: command to record
+        :return: True if the command was recorded, False if it should be ran now
+        :raises CoreCommandError: when a non-zero exit status occurs
+        """
+        with self.lock:
+            if not self.active:
+                return False
+            fields = args.split()
+            tool = fields[0] if fields else None
+            if tool in BATCH_TOOLS and "show" not in fields:
+                namespace = self._namespace(key, run)
+                namespace.batches[tool].append(args[len(tool) :].strip())
+                return True
+            elif tool in DEFERRED_TOOLS:
+                namespace = self._namespace(key, run)
+                namespace.commands.append(args)
+                return True
+            callbacks = self._apply()
+        self._run_callbacks(callbacks)
+        return False
+
+    def after(self, func: Callable[..., None], *args: Any) -> None:
+        """
+        Register a function to run once recorded commands have been applied, or
+        run it now when commands are not being deferred.
+
+        :param func: function to run
+        :param args: arguments to run function with
+        :return: nothing
+        """
+        with self.lock:
+            if self.active:
+                self.callbacks.append((func, args, {}))
+                return
+        func(*args)
+
+    def apply(self) -> None:
+        """
+        Stop recording and apply all recorded commands.
+
+        :return: nothing
+        :raises CoreCommandError: when a non-zero exit status occurs
+        """
+        with self.lock:
+            self.active = False
+            callbacks = self._apply()
+        self._run_callbacks(callbacks)
+
+    def reset(self) -> None:
+        """
+        Stop recording and apply anything recorded, logging any failures, so that
+        node shutdown will find the devices it expects.
+
+        :return: nothing
+        """
+        try:
+            self.apply()
+        except CoreCommandError:
+            logging.exception("error applying deferred network commands")
+
+    def _namespace(self, key: str, run: Callable[..., str]) -> BatchNamespace:
+        namespace = self.namespaces.get(key)
+        if namespace is None:
+            namespace = BatchNamespace(run)
+            self.namespaces[key] = namespace
+        return namespace
+
+    def _apply(self) -> List[Callback]:
+        namespaces = self.namespaces
+        callbacks = self.callbacks
+        self.namespaces = {}
+        self.callbacks = []
+        if namespaces:
+            logging.info("applying deferred network commands: %s", len(namespaces))
+            # host devices need to exist before being configured within nodes
+            host = namespaces.pop(HOST_KEY, None)
+            if host:
+                host.apply()
+            funcs = [(x.apply, (), {}) for x in namespaces.values()]
+            _, exceptions = utils.threadpool(funcs)
+            if exceptions:
+                raise exceptions[0]
+        return callbacks
+
+    @staticmethod
+    def _run_callbacks(callbacks: List[Callback]) -> None:
+        if callbacks:
+            utils.threadpool(callbacks)
@@ -1,11 +1,40 @@
 """
 Clients for dealing with bridge/interface commands.
 """
-from typing import Callable
+import socket
+import struct
+import threading
+from typing import Callable, Optional
 
 import netaddr
 
+from core.errors import CoreError
 from core.executables import ETHTOOL, IP, OVS_VSCTL, SYSCTL, TC
+from core.nodes import netlink
+from core.nodes.netlink import (
+    NetlinkSocket,
+    attr,
+    attr_nested,
+    attr_str,
+    attr_u8,
+    attr_u16,
+    attr_u32,
+    attr_u64,
+    ifinfomsg,
+)
+
+
+def tc_parent(parent: Optional[str]) -> str:
+    """
+    Create the tc parent argument for a parent handle.
+
+    :param parent: parent handle, None for root
+    :return: tc parent argument
+    """
+    if parent is None:
+        return "root"
+    else:
+        return f"parent {parent}"
 
 
 class LinuxNetClient:
@@ -151,6 +180,82 @@ class LinuxNetClient:
         """
         self.run(f"{TC} qdisc delete dev {device} root")
 
+    def set_tbf(self, device: str, rate: int, burst: int, limit: int) -> None:
+        """
+        Create or replace the root token bucket filter used to limit bandwidth.
+
+        :param device: device to limit
+        :param rate: rate in bits per second
+        :param burst: bucket size in bytes
+        :param limit: bytes that can be queued waiting for tokens
+        :return: nothing
+        """
+        self.run(
+            f"{TC} qdisc replace dev {device} root handle 1: "
+            f"tbf rate {rate} burst {burst} limit {limit}"
+        )
+
+    def set_netem(
+        self,
+        device: str,
+        parent: Optional[str],
+        delay: Optional[int],
+        jitter: Optional[int],
+        loss: Optional[float],
+        duplicate: Optional[int],
+    ) -> None:
+        """
+        Create or replace the netem queuing discipline used to emulate delay, jitter,
+        loss, and duplication.
+
+        :param device: device to configure
+        :param parent: parent handle, None for root
+        :param delay: delay in microseconds
+        :param jitter: jitter in microseconds
+        :param loss: loss percentage
+        :param duplicate: duplicate percentage
+        :return: nothing
+        """
+        netem = "netem"
+        # jitter and delay use the same delay statement
+        if delay is not None:
+            netem += f" delay {delay}us"
+        if jitter is not None:
+            if delay is None:
+                netem += f" delay 0us {jitter}us 25%"
+            else:
+                netem += f" {jitter}us 25%"
+        if loss is not None and loss > 0:
+            netem += f" loss {min(loss, 100)}%"
+        if duplicate is not None and duplicate > 0:
+            netem += f" duplicate {min(duplicate, 100)}%"
+        parent = tc_parent(parent)
+        self.run(f"{TC} qdisc replace dev {device} {parent} handle 10: {netem}")
+
+    def delete_qdisc(
+        self, device: str, parent: Optional[str], handle: str = None
+    ) -> None:
+        """
+        Delete a queuing discipline from a device.
+
+        :param device: device to delete queuing discipline from
+        :param parent: parent handle, None for root
+        :param handle: handle of queuing discipline, default is None
+        :return: nothing
+        """
+        cmd = f"{TC} qdisc delete dev {device} {tc_parent(parent)}"
+        if handle is not None:
+            cmd += f" handle {handle}"
+        self.run(cmd)
+
+    def close(self) -> None:
+        """
+        Release any resources held by the client.
+
+        :return: nothing
+        """
+        pass
+
     def checksums_off(self, iface_name: str) -> None:
         """
         Turns interface checksums off.
@@ -370,15 +475,280 @@ class OvsNetClient(LinuxNetClient):
         self.run(f"{OVS_VSCTL} set bridge {name} other_config:mac-aging-time=0")
 
 
-def get_net_client(use_ovs: bool, run: Callable[..., str]) -> LinuxNetClient:
+class NetlinkNetClient(LinuxNetClient):
+    """
+    Client for creating Linux bridges and ip interfaces for nodes, configuring
+    links, addresses, and queuing disciplines over a netlink socket rather than
+    running ip and tc commands. Anything else still uses the provided run function.
+    """
+
+    def __init__(
+        self, run: Callable[..., str], netns_pid: Callable[[], int] = None
+    ) -> None:
+        """
+        Create NetlinkNetClient instance.
+
+        :param run: function to run commands with
+        :param netns_pid: function returning the process id whose network namespace
+            is configured, default is None for the host namespace
+        """
+        super().__init__(run)
+        self.netns_pid: Optional[Callable[[], int]] = netns_pid
+        self._socket: Optional[NetlinkSocket] = None
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def socket(self) -> NetlinkSocket:
+        """
+        Retrieve the netlink socket for the configured network namespace.
+
+        :return: netlink socket
+        :raises CoreError: when the namespace process is not running
+        """
+        if self.netns_pid is None:
+            return netlink.host_socket()
+        pid = self.netns_pid()
+        if pid is None:
+            raise CoreError("netlink namespace process is not running")
+        with self._lock:
+            if self._socket is None or self._socket.pid != pid:
+                if self._socket is not None:
+                    self._socket.close()
+                self._socket = NetlinkSocket(pid)
+            return self._socket
+
+    def close(self) -> None:
+        """
+        Close the namespace netlink socket, so it does not keep the namespace alive.
+
+        :return: nothing
+        """
+        with self._lock:
+            if self._socket is not None:
+                self._socket.close()
+                self._socket = None
+
+    def device_up(self, device: str) -> None:
+        self.socket.set_link(device, flags=netlink.IFF_UP, change=netlink.IFF_UP)
+
+    def device_down(self, device: str) -> None:
+        self.socket.set_link(device, flags=0, change=netlink.IFF_UP)
+
+    def device_name(self, device: str, name: str) -> None:
+        self.socket.set_link(device, attr_str(netlink.IFLA_IFNAME, name))
+
+    def get_mac(self, device: str) -> str:
+        _, attrs = self.socket.get_link(device)
+        mac = attrs.get(netlink.IFLA_ADDRESS, b"")
+        return ":".join(f"{x:02x}" for x in mac)
+
+    def get_ifindex(self, device: str) -> str:
+        return str(self.socket.ifindex(device))
+
+    def device_ns(self, device: str, namespace: str) -> None:
+        value = attr_u32(netlink.IFLA_NET_NS_PID, int(namespace))
+        self.socket.set_link(device, value)
+
+    def device_flush(self, device: str) -> None:
+        sock = self.socket
+        for address in sock.addresses(device):
+            sock.request(netlink.RTM_DELADDR, 0, address, f"flush addr {device}")
+
+    def device_mac(self, device: str, mac: str) -> None:
+        value = attr(netlink.IFLA_ADDRESS, netaddr.EUI(mac).packed)
+        self.socket.set_link(device, value)
+
+    def delete_device(self, device: str) -> None:
+        self.socket.delete_link(device)
+
+    def delete_tc(self, device: str) -> None:
+        self.delete_qdisc(device, None)
+
+    def _address_request(
+        self, msg_type: int, flags: int, device: str, address: str, broadcast: str
+    ) -> None:
+        ip = netaddr.IPNetwork(address)
+        family = socket.AF_INET if ip.version == 4 else socket.AF_INET6
+        sock = self.socket
+        index = sock.ifindex(device)
+        payload = netlink.IFADDRMSG.pack(family, ip.prefixlen, 0, 0, index)
+        payload += attr(netlink.IFA_LOCAL, ip.ip.packed)
+        payload += attr(netlink.IFA_ADDRESS, ip.ip.packed)
+        if broadcast is not None and ip.version == 4:
+            if broadcast == "+":
+                broadcast = ip.broadcast
+            else:
+                broadcast = netaddr.IPAddress(broadcast)
+            if broadcast is not None:
+                payload += attr(netlink.IFA_BROADCAST, broadcast.packed)
+        sock.request(msg_type, flags, payload, f"addr {address} dev {device}")
+
+    def create_address(self, device: str, address: str, broadcast: str = None) -> None:
+        flags = netlink.NLM_F_CREATE | netlink.NLM_F_EXCL
+        self._address_request(netlink.RTM_NEWADDR, flags, device, address, broadcast)
+        if netaddr.valid_ipv6(address.split("/")[0]):
+            # IPv6 addresses are removed by default on interface down.
+            # Make sure that the IPv6 address we add is not removed
+            self.run(f"{SYSCTL} -w net.ipv6.conf.{device}.keep_addr_on_down=1")
+
+    def delete_address(self, device: str, address: str) -> None:
+        self._address_request(netlink.RTM_DELADDR, 0, device, address, None)
+
+    def create_veth(self, name: str, peer: str) -> None:
+        peer_info = ifinfomsg() + attr_str(netlink.IFLA_IFNAME, peer)
+        self.socket.add_link(name, "veth", attr(netlink.VETH_INFO_PEER, peer_info))
+
+    def create_gretap(
+        self, device: str, address: str, local: str, ttl: int, key: int
+    ) -> None:
+        data = [
+            attr(netlink.IFLA_GRE_REMOTE, netaddr.IPAddress(address).packed),
+            attr_u8(netlink.IFLA_GRE_PMTUDISC, 1),
+        ]
+        if local is not None:
+            local = netaddr.IPAddress(local).packed
+            data.append(attr(netlink.IFLA_GRE_LOCAL, local))
+        if ttl is not None:
+            data.append(attr_u8(netlink.IFLA_GRE_TTL, int(ttl)))
+        if key is not None:
+            flags = struct.pack("!H", netlink.GRE_KEY)
+            key = struct.pack("!I", int(key))
+            data.append(attr(netlink.IFLA_GRE_IFLAGS, flags))
+            data.append(attr(netlink.IFLA_GRE_OFLAGS, flags))
+            data.append(attr(netlink.IFLA_GRE_IKEY, key))
+            data.append(attr(netlink.IFLA_GRE_OKEY, key))
+        self.socket.add_link(device, "gretap", *data)
+
+    def create_bridge(self, name: str) -> None:
+        self.socket.add_link(
+            name,
+            "bridge",
+            attr_u32(netlink.IFLA_BR_STP_STATE, 0),
+            attr_u32(netlink.IFLA_BR_FORWARD_DELAY, 0),
+            attr_u8(netlink.IFLA_BR_MCAST_SNOOPING, 0),
+            attr_u16(netlink.IFLA_BR_GROUP_FWD_MASK, 65528),
+        )
+        self.device_up(name)
+
+    def delete_bridge(self, name: str) -> None:
+        self.device_down(name)
+        self.socket.delete_link(name)
+
+    def set_iface_master(self, bridge_name: str, iface_name: str) -> None:
+        sock = self.socket
+        index = sock.ifindex(bridge_name)
+        sock.set_link(iface_name, attr_u32(netlink.IFLA_MASTER, index))
+        self.device_up(iface_name)
+
+    def delete_iface(self, bridge_name: str, iface_name: str) -> None:
+        self.socket.set_link(iface_name, attr_u32(netlink.IFLA_MASTER, 0))
+
+    def disable_mac_learning(self, name: str) -> None:
+        info = attr_nested(
+            netlink.IFLA_LINKINFO,
+            attr_str(netlink.IFLA_INFO_KIND, "bridge"),
+            attr_nested(
+                netlink.IFLA_INFO_DATA, attr_u32(netlink.IFLA_BR_AGEING_TIME, 0)
+            ),
+        )
+        self.socket.set_link(name, info)
+
+    def set_tbf(self, device: str, rate: int, burst: int, limit: int) -> None:
+        rate = rate // 8
+        buffer = 0
+        if rate > 0:
+            buffer = (burst * 1_000_000_000 // rate) >> netlink.PSCHED_SHIFT
+        ratespec = netlink.TC_RATESPEC.pack(
+            0, netlink.TC_LINKLAYER_ETHERNET, 0, -1, 0, min(rate, netlink.U32_MAX)
+        )
+        peakrate = netlink.TC_RATESPEC.pack(0, 0, 0, 0, 0, 0)
+        params = ratespec + peakrate
+        params += struct.pack("=III", limit, min(buffer, netlink.U32_MAX), 0)
+        options = attr_nested(
+            netlink.TCA_OPTIONS,
+            attr(netlink.TCA_TBF_PARMS, params),
+            attr_u64(netlink.TCA_TBF_RATE64, rate),
+            attr_u32(netlink.TCA_TBF_BURST, burst),
+        )
+        flags = netlink.NLM_F_CREATE | netlink.NLM_F_REPLACE
+        self.socket.qdisc(
+            netlink.RTM_NEWQDISC,
+            flags,
+            device,
+            None,
+            "1:",
+            attr_str(netlink.TCA_KIND, "tbf"),
+            options,
+        )
+
+    def set_netem(
+        self,
+        device: str,
+        parent: Optional[str],
+        delay: Optional[int],
+        jitter: Optional[int],
+        loss: Optional[float],
+        duplicate: Optional[int],
+    ) -> None:
+        latency = (delay or 0) * 1000
+        jitter_ns = (jitter or 0) * 1000
+        loss = netlink.tc_percent(loss) if loss is not None and loss > 0 else 0
+        if duplicate is not None and duplicate > 0:
+            duplicate = netlink.tc_percent(duplicate)
+        else:
+            duplicate = 0
+        qopt = netlink.TC_NETEM_QOPT.pack(
+            min(latency >> netlink.PSCHED_SHIFT, netlink.U32_MAX),
+            netlink.NETEM_LIMIT,
+            loss,
+            0,
+            duplicate,
+            min(jitter_ns >> netlink.PSCHED_SHIFT, netlink.U32_MAX),
+        )
+        # netem options are the fixed struct followed by attributes, not nested
+        data = qopt
+        if jitter is not None:
+            corr = netlink.TC_NETEM_CORR.pack(netlink.tc_percent(25), 0, 0)
+            data += attr(netlink.TCA_NETEM_CORR, corr)
+        data += attr(netlink.TCA_NETEM_LATENCY64, struct.pack("=q", latency))
+        data += attr(netlink.TCA_NETEM_JITTER64, struct.pack("=q", jitter_ns))
+        flags = netlink.NLM_F_CREATE | netlink.NLM_F_REPLACE
+        self.socket.qdisc(
+            netlink.RTM_NEWQDISC,
+            flags,
+            device,
+            parent,
+            "10:",
+            attr_str(netlink.TCA_KIND, "netem"),
+            attr(netlink.TCA_OPTIONS, data),
+        )
+
+    def delete_qdisc(
+        self, device: str, parent: Optional[str], handle: str = None
+    ) -> None:
+        self.socket.qdisc(netlink.RTM_DELQDISC, 0, device, parent, handle)
+
+
+def get_net_client(
+    use_ovs: bool,
+    run: Callable[..., str],
+    use_netlink: bool = False,
+    netns_pid: Callable[[], int] = None,
+) -> LinuxNetClient:
     """
     Retrieve desired net client for running network commands.
 
     :param use_ovs: True for OVS bridges, False for Linux bridges
     :param run: function used to run net client commands
+    :param use_netlink: True to configure Linux bridges and interfaces over
+        netlink, False to run commands, default is False
+    :param netns_pid: function returning the process id whose network namespace
+        netlink will configure, default is None for the host namespace
     :return: net client class
     """
     if use_ovs:
         return OvsNetClient(run)
+    elif use_netlink:
+        return NetlinkNetClient(run, netns_pid)
     else:
         return LinuxNetClient(run)
@@ -0,0 +1,449 @@
+"""
+netlink.py: minimal rtnetlink support for configuring links, addresses, and queuing
+disciplines directly over a netlink socket, instead of running ip and tc commands.
+"""
+
+import ctypes
+import errno
+import logging
+import os
+import socket
+import struct
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from core.errors import CoreCommandError
+
+NETLINK_ROUTE: int = 0
+CLONE_NEWNET: int = 0x40000000
+
+# netlink message types and flags
+NLMSG_ERROR: int = 2
+NLMSG_DONE: int = 3
+NLM_F_REQUEST: int = 0x1
+NLM_F_ACK: int = 0x4
+NLM_F_REPLACE: int = 0x100
+NLM_F_EXCL: int = 0x200
+NLM_F_CREATE: int = 0x400
+NLM_F_DUMP: int = 0x300
+
+# rtnetlink message types
+RTM_NEWLINK: int = 16
+RTM_DELLINK: int = 17
+RTM_GETLINK: int = 18
+RTM_NEWADDR: int = 20
+RTM_DELADDR: int = 21
+RTM_GETADDR: int = 22
+RTM_NEWQDISC: int = 36
+RTM_DELQDISC: int = 37
+
+# link attributes
+IFF_UP: int = 0x1
+IFLA_ADDRESS: int = 1
+IFLA_IFNAME: int = 3
+IFLA_MTU: int = 4
+IFLA_MASTER: int = 10
+IFLA_LINKINFO: int = 18
+IFLA_NET_NS_PID: int = 19
+IFLA_STATS64: int = 23
+IFLA_INFO_KIND: int = 1
+IFLA_INFO_DATA: int = 2
+VETH_INFO_PEER: int = 1
+IFLA_BR_FORWARD_DELAY: int = 1
+IFLA_BR_AGEING_TIME: int = 4
+IFLA_BR_STP_STATE: int = 5
+IFLA_BR_GROUP_FWD_MASK: int = 9
+IFLA_BR_MCAST_SNOOPING: int = 23
+IFLA_GRE_IFLAGS: int = 2
+IFLA_GRE_OFLAGS: int = 3
+IFLA_GRE_IKEY: int = 4
+IFLA_GRE_OKEY: int = 5
+IFLA_GRE_LOCAL: int = 6
+IFLA_GRE_REMOTE: int = 7
+IFLA_GRE_TTL: int = 8
+IFLA_GRE_PMTUDISC: int = 10
+GRE_KEY: int = 0x2000
+
+# address attributes
+IFA_ADDRESS: int = 1
+IFA_LOCAL: int = 2
+IFA_BROADCAST: int = 4
+
+# traffic control attributes
+TC_H_ROOT: int = 0xFFFFFFFF
+TCA_KIND: int = 1
+TCA_OPTIONS: int = 2
+TCA_TBF_PARMS: int = 1
+TCA_TBF_RATE64: int = 4
+TCA_TBF_BURST: int = 6
+TCA_NETEM_CORR: int = 1
+TCA_NETEM_LATENCY64: int = 10
+TCA_NETEM_JITTER64: int = 11
+TC_LINKLAYER_ETHERNET: int = 1
+NETEM_LIMIT: int = 1000
+PSCHED_SHIFT: int = 6
+U32_MAX: int = 0xFFFFFFFF
+
+NLMSGHDR: struct.Struct = struct.Struct("=IHHII")
+RTATTR: struct.Struct = struct.Struct("=HH")
+IFINFOMSG: struct.Struct = struct.Struct("=BxHiII")
+IFADDRMSG: struct.Struct = struct.Struct("=BBBBI")
+TCMSG: struct.Struct = struct.Struct("=BxxxiIII")
+NLMSGERR: struct.Struct = struct.Struct("=i")
+TC_RATESPEC: struct.Struct = struct.Struct("=BBHhHI")
+TC_NETEM_QOPT: struct.Struct = struct.Struct("=IIIIII")
+TC_NETEM_CORR: struct.Struct = struct.Struct("=III")
+# leading rtnl_link_stats64 counters: rx/tx packets, bytes, errors, and dropped
+LINK_STATS64: struct.Struct = struct.Struct("=8Q")
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def attr(attr_type: int, data: bytes) -> bytes:
+    """
+    Encode a netlink attribute.
+
+    :param attr_type: attribute type
+    :param data: attribute payload
+    :return: encoded attribute, padded for alignment
+    """
+    length = RTATTR.size + len(data)
+    padding = b"\0" * (_align(length) - length)
+    return RTATTR.pack(length, attr_type) + data + padding
+
+
+def attr_str(attr_type: int, value: str) -> bytes:
+    return attr(attr_type, value.encode("utf-8") + b"\0")
+
+
+def attr_u8(attr_type: int, value: int) -> bytes:
+    return attr(attr_type, struct.pack("=B", value))
+
+
+def attr_u16(attr_type: int, value: int) -> bytes:
+    return attr(attr_type, struct.pack("=H", value))
+
+
+def attr_u32(attr_type: int, value: int) -> bytes:
+    return attr(attr_type, struct.pack("=I", value))
+
+
+def attr_u64(attr_type: int, value: int) -> bytes:
+    return attr(attr_type, struct.pack("=Q", value))
+
+
+def attr_nested(attr_type: int, *attrs: bytes) -> bytes:
+    return attr(attr_type, b"".join(attrs))
+
+
+def parse_attrs(data: bytes) -> Dict[int, bytes]:
+    """
+    Parse a buffer of netlink attributes.
+
+    :param data: buffer to parse
+    :return: dict of attribute type to payload
+    """
+    attrs = {}
+    offset = 0
+    while offset + RTATTR.size <= len(data):
+        length, attr_type = RTATTR.unpack_from(data, offset)
+        if length < RTATTR.size:
+            break
+        attrs[attr_type & 0x7FFF] = data[offset + RTATTR.size : offset + length]
+        offset += _align(length)
+    return attrs
+
+
+def ifinfomsg(index: int = 0, flags: int = 0, change: int = 0) -> bytes:
+    return IFINFOMSG.pack(socket.AF_UNSPEC, 0, index, flags, change)
+
+
+def tc_handle(value: Optional[str]) -> int:
+    """
+    Convert a tc style handle, such as "1:" or "1:1", to its numeric value.
+
+    :param value: handle to convert, None for root
+    :return: numeric handle
+    """
+    if value is None:
+        return TC_H_ROOT
+    major, minor = value.split(":")
+    major = int(major, 16) if major else 0
+    minor = int(minor, 16) if minor else 0
+    return (major << 16) | minor
+
+
+def tc_percent(value: float) -> int:
+    """
+    Convert a percentage to the fixed point probability used by netem.
+
+    :param value: percentage to convert
+    :return: netem probability value
+    """
+    value = min(max(value, 0.0), 100.0)
+    return int(round(value / 100.0 * U32_MAX))
+
+
+class NetlinkSocket:
+    """
+    Route netlink socket bound to a network namespace, used to send requests and
+    wait for their acknowledgement.
+    """
+
+    def __init__(self, pid: int = None) -> None:
+        """
+        Create a NetlinkSocket instance.
+
+        :param pid: process id whose network namespace the socket will be opened
+            within, None for the current namespace
+        """
+        self.pid: Optional[int] = pid
+        self.lock: threading.Lock = threading.Lock()
+        self.seq: int = 0
+        if pid is None:
+            self.sock: socket.socket = self._open()
+        else:
+            self.sock: socket.socket = self._open_netns(pid)
+
+    @staticmethod
+    def _open() -> socket.socket:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024 * 1024)
+        sock.bind((0, 0))
+        return sock
+
+    def _open_netns(self, pid: int) -> socket.socket:
+        """
+        Open a socket within another network namespace. The namespace is entered
+        from a short lived thread, as network namespaces are per thread and the
+        socket stays bound to the namespace it was created within.
+
+        :param pid: process id whose network namespace to use
+        :return: socket within namespace
+        :raises CoreCommandError: when the socket could not be opened
+        """
+        result = {}
+
+        def enter() -> None:
+            try:
+                libc = ctypes.CDLL(None, use_errno=True)
+                fd = os.open(f"/proc/{pid}/ns/net", os.O_RDONLY)
+                try:
+                    if libc.setns(fd, CLONE_NEWNET) != 0:
+                        error = ctypes.get_errno()
+                        raise OSError(error, os.strerror(error))
+                finally:
+                    os.close(fd)
+                result["sock"] = self._open()
+            except OSError as e:
+                result["error"] = e
+
+        thread = threading.Thread(target=enter)
+        thread.start()
+        thread.join()
+        if "error" in result:
+            e = result["error"]
+            raise CoreCommandError(e.errno or 1, f"netlink netns {pid}", "", str(e))
+        return result["sock"]
+
+    def close(self) -> None:
+        """
+        Close the socket, releasing its reference to the network namespace.
+
+        :return: nothing
+        """
+        self.sock.close()
+
+    def request(
+        self, msg_type: int, flags: int, payload: bytes, description: str
+    ) -> List[Tuple[int, bytes]]:
+        """
+        Send a request and collect all messages returned until it is acknowledged.
+
+        :param msg_type: netlink message type
+        :param flags: netlink message flags, request and ack are always added
+        :param payload: message payload
+        :param description: description used for errors
+        :return: message type and payload for each returned message
+        :raises CoreCommandError: when the kernel returns an error
+        """
+        flags |= NLM_F_REQUEST | NLM_F_ACK
+        with self.lock:
+            self.seq = (self.seq + 1) & U32_MAX
+            seq = self.seq
+            header = NLMSGHDR.pack(
+                NLMSGHDR.size + len(payload), msg_type, flags, seq, 0
+            )
+            self.sock.send(header + payload)
+            messages = []
+            while True:
+                data = self.sock.recv(65536)
+                offset = 0
+                while offset + NLMSGHDR.size <= len(data):
+                    length, rtype, _, rseq, _ = NLMSGHDR.unpack_from(data, offset)
+                    body = data[offset + NLMSGHDR.size : offset + length]
+                    offset += _align(length)
+                    if rseq != seq:
+                        continue
+                    if rtype == NLMSG_DONE:
+                        return messages
+                    if rtype == NLMSG_ERROR:
+                        (error,) = NLMSGERR.unpack_from(body)
+                        if error == 0:
+                            return messages
+                        error = -error
+                        raise CoreCommandError(
+                            error, f"netlink {description}", "", os.strerror(error)
+                        )
+                    messages.append((rtype, body))
+
+    def get_link(self, name: str) -> Tuple[int, Dict[int, bytes]]:
+        """
+        Retrieve link information for a device.
+
+        :param name: device name
+        :return: device index and link attributes
+        :raises CoreCommandError: when the device does not exist
+        """
+        payload = ifinfomsg() + attr_str(IFLA_IFNAME, name)
+        messages = self.request(RTM_GETLINK, 0, payload, f"get link {name}")
+        for _, body in messages:
+            _, _, index, _, _ = IFINFOMSG.unpack_from(body)
+            return index, parse_attrs(body[IFINFOMSG.size :])
+        raise CoreCommandError(errno.ENODEV, f"netlink get link {name}", "", "")
+
+    def ifindex(self, name: str) -> int:
+        """
+        Retrieve the index for a device.
+
+        :param name: device name
+        :return: device index
+        """
+        index, _ = self.get_link(name)
+        return index
+
+    def link_stats(self) -> Dict[int, Tuple[str, Tuple[int, ...]]]:
+        """
+        Retrieve counters for all devices with a single dump request.
+
+        :return: dict of device index to device name and counters, counters are
+            rx/tx packets, rx/tx bytes, rx/tx errors, and rx/tx dropped
+        """
+        messages = self.request(RTM_GETLINK, NLM_F_DUMP, ifinfomsg(), "link stats")
+        stats = {}
+        for _, body in messages:
+            _, _, index, _, _ = IFINFOMSG.unpack_from(body)
+            attrs = parse_attrs(body[IFINFOMSG.size :])
+            name = attrs.get(IFLA_IFNAME)
+            counters = attrs.get(IFLA_STATS64)
+            if name is None or counters is None or len(counters) < LINK_STATS64.size:
+                continue
+            name = name.rstrip(b"\0").decode("utf-8")
+            stats[index] = (name, LINK_STATS64.unpack_from(counters))
+        return stats
+
+    def set_link(
+        self, name: str, *attrs: bytes, flags: int = 0, change: int = 0
+    ) -> None:
+        """
+        Modify an existing device.
+
+        :param name: device name
+        :param attrs: encoded link attributes to set
+        :param flags: interface flags to set
+        :param change: mask of interface flags being changed
+        :return: nothing
+        """
+        index = self.ifindex(name)
+        payload = ifinfomsg(index, flags, change) + b"".join(attrs)
+        self.request(RTM_NEWLINK, 0, payload, f"set link {name}")
+
+    def add_link(self, name: str, kind: str, *data: bytes) -> None:
+        """
+        Create a new device.
+
+        :param name: device name
+        :param kind: device kind
+        :param data: encoded attributes for kind specific data
+        :return: nothing
+        """
+        info = [attr_str(IFLA_INFO_KIND, kind)]
+        if data:
+            info.append(attr_nested(IFLA_INFO_DATA, *data))
+        payload = ifinfomsg() + attr_str(IFLA_IFNAME, name)
+        payload += attr_nested(IFLA_LINKINFO, *info)
+        flags = NLM_F_CREATE | NLM_F_EXCL
+        self.request(RTM_NEWLINK, flags, payload, f"add link {name} type {kind}")
+
+    def delete_link(self, name: str) -> None:
+        """
+        Delete a device.
+
+        :param name: device name
+        :return: nothing
+        """
+        index = self.ifindex(name)
+        self.request(RTM_DELLINK, 0, ifinfomsg(index), f"delete link {name}")
+
+    def addresses(self, name: str) -> List[bytes]:
+        """
+        Retrieve the address messages for a device.
+
+        :param name: device name
+        :return: address message payloads
+        """
+        index = self.ifindex(name)
+        payload = IFADDRMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+        messages = self.request(RTM_GETADDR, NLM_F_DUMP, payload, f"show addr {name}")
+        addresses = []
+        for _, body in messages:
+            _, _, _, _, addr_index = IFADDRMSG.unpack_from(body)
+            if addr_index == index:
+                addresses.append(body)
+        return addresses
+
+    def qdisc(
+        self,
+        msg_type: int,
+        flags: int,
+        name: str,
+        parent: Optional[str],
+        handle: Optional[str],
+        *attrs: bytes,
+    ) -> None:
+        """
+        Create, replace, or delete a queuing discipline.
+
+        :param msg_type: new or delete qdisc message type
+        :param flags: netlink message flags
+        :param name: device name
+        :param parent: parent handle, None for root
+        :param handle: qdisc handle, None for kernel assigned
+        :param attrs: encoded qdisc attributes
+        :return: nothing
+        """
+        index = self.ifindex(name)
+        handle = tc_handle(handle) if handle is not None else 0
+        payload = TCMSG.pack(socket.AF_UNSPEC, index, handle, tc_handle(parent), 0)
+        payload += b"".join(attrs)
+        self.request(msg_type, flags, payload, f"qdisc dev {name}")
+
+
+_host_socket: Optional[NetlinkSocket] = None
+_host_socket_lock: threading.Lock = threading.Lock()
+
+
+def host_socket() -> NetlinkSocket:
+    """
+    Retrieve the netlink socket shared for the host network namespace.
+
+    :return: host netlink socket
+    """
+    global _host_socket
+    with _host_socket_lock:
+        if _host_socket is None:
+            logging.debug("opening host netlink socket")
+            _host_socket = NetlinkSocket()
+        return _host_socket
@@ -5,7 +5,18 @@ Defines network nodes used within core.
 import logging
 import threading
 import time
-from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Type
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+)
 
 import netaddr
 
@@ -19,7 +30,7 @@ from core.emulator.enumerations import (
     RegisterTlvs,
 )
 from core.errors import CoreCommandError, CoreError
-from core.executables import EBTABLES, TC
+from core.executables import EBTABLES, EBTABLES_RESTORE, EBTABLES_SAVE, NFT
 from core.nodes.base import CoreNetworkBase
 from core.nodes.interface import CoreInterface, GreTap, Veth
 from core.nodes.netclient import get_net_client
@@ -32,6 +43,24 @@ if TYPE_CHECKING:
     WirelessModelType = Type[WirelessModel]
 
 ebtables_lock = threading.Lock()
+EBTABLES_DELIMITER: str = "CORE_EBTABLES"
+NFT_DELIMITER: str = "CORE_NFT"
+IfacePair = Tuple[CoreInterface, CoreInterface]
+RuleChange = Tuple["CoreNetwork", List[str], List[str]]
+
+
+@dataclass
+class EbtablesMetrics:
+    """
+    Counters for ebtables updates, to track the amount of work done per update.
+    """
+
+    commits: int = 0
+    rules_added: int = 0
+    rules_deleted: int = 0
+    last_added: int = 0
+    last_deleted: int = 0
+    last_duration: float = 0.0
 
 
 class EbtablesQueue:
@@ -39,8 +68,14 @@ class EbtablesQueue:
     Helper class for queuing up ebtables commands into rate-limited
     atomic commits. This improves performance and reliability when there are
     many WLAN link updates.
+
+    Only interface pairs that changed since the last update are inspected, and
+    the resulting rules for all pending WLANs are applied with a single
+    ebtables-restore, falling back to an atomic file when restore is not
+    available or a WLAN spans distributed servers.
     """
 
+    name: str = "ebtables"
     # update rate is every 300ms
     rate: float = 0.3
     # ebtables
@@ -53,15 +88,23 @@ class EbtablesQueue:
         """
         self.doupdateloop: bool = False
         self.updatethread: Optional[threading.Thread] = None
-        # this lock protects cmds and updates lists
+        # this lock protects the WLAN update state below
         self.updatelock: threading.Lock = threading.Lock()
+        # wakes the update thread early when stopping
+        self.stop_event: threading.Event = threading.Event()
         # list of pending ebtables commands
         self.cmds: List[str] = []
-        # list of WLANs requiring update
-        self.updates: List["CoreNetwork"] = []
+        # WLANs requiring update
+        self.updates: Set["CoreNetwork"] = set()
         # timestamps of last WLAN update; this keeps track of WLANs that are
         # using this queue
         self.last_update_time: Dict["CoreNetwork", float] = {}
+        # interface pairs changed since last update, None to check all pairs
+        self.changes: Dict["CoreNetwork", Optional[Set[IfacePair]]] = {}
+        # rules currently applied for each WLAN, keyed by interface pair
+        self.rules: Dict["CoreNetwork", Dict[FrozenSet[CoreInterface], List[str]]] = {}
+        self.use_restore: Optional[bool] = None
+        self.metrics: EbtablesMetrics = EbtablesMetrics()
 
     def startupdateloop(self, wlan: "CoreNetwork") -> None:
         """
@@ -71,11 +114,13 @@ class EbtablesQueue:
         """
         with self.updatelock:
             self.last_update_time[wlan] = time.monotonic()
-        if self.doupdateloop:
-            return
-        self.doupdateloop = True
-        self.updatethread = threading.Thread(target=self.updateloop, daemon=True)
-        self.updatethread.start()
+            self.rules[wlan] = {}
+            if self.doupdateloop:
+                return
+            self.doupdateloop = True
+            self.stop_event.clear()
+            self.updatethread = threading.Thread(target=self.updateloop, daemon=True)
+            self.updatethread.start()
 
     def stopupdateloop(self, wlan: "CoreNetwork") -> None:
         """
@@ -90,12 +135,17 @@ class EbtablesQueue:
                 logging.exception(
                     "error deleting last update time for wlan, ignored before: %s", wlan
                 )
-        if len(self.last_update_time) > 0:
-            return
-        self.doupdateloop = False
-        if self.updatethread:
-            self.updatethread.join()
+            self.updates.discard(wlan)
+            self.changes.pop(wlan, None)
+            self.rules.pop(wlan, None)
+            if len(self.last_update_time) > 0:
+                return
+            self.doupdateloop = False
+            self.stop_event.set()
+            updatethread = self.updatethread
             self.updatethread = None
+        if updatethread and updatethread is not threading.current_thread():
+            updatethread.join()
 
     def ebatomiccmd(self, cmd: str) -> str:
         """
@@ -129,36 +179,120 @@ class EbtablesQueue:
         :return: nothing
         """
         self.last_update_time[wlan] = time.monotonic()
-        self.updates.remove(wlan)
+        self.updates.discard(wlan)
+
+    def wlan_rate(self, wlan: "CoreNetwork") -> float:
+        """
+        Retrieve the rate limit for updating a WLAN.
+
+        :param wlan: wlan entity
+        :return: minimum time between updates
+        """
+        if wlan.update_rate is None:
+            return self.rate
+        return wlan.update_rate
 
     def updateloop(self) -> None:
         """
-        Thread target that looks for WLANs needing update, and
-        rate limits the amount of ebtables activity. Only one userspace program
-        should use ebtables at any given time, or results can be unpredictable.
+        Thread target that looks for WLANs needing update, and rate limits the
+        amount of activity for each WLAN. Rules are applied outside of the update
+        lock, so WLAN changes can still be queued during a commit.
 
         :return: nothing
         """
-        while self.doupdateloop:
+        thread = threading.current_thread()
+        while self.doupdateloop and self.updatethread is thread:
+            ready = []
+            delay = self.rate
             with self.updatelock:
-                for wlan in self.updates:
-                    # Check if wlan is from a previously closed session. Because of the
-                    # rate limiting scheme employed here, this may happen if a new session
-                    # is started soon after closing a previous session.
-                    # TODO: if these are WlanNodes, this will never throw an exception
-                    try:
-                        wlan.session
-                    except Exception:
-                        # Just mark as updated to remove from self.updates.
-                        self.updated(wlan)
+                for wlan in list(self.updates):
+                    # ignore wlans that have been shutdown since they were queued
+                    if wlan not in self.last_update_time:
+                        self.updates.discard(wlan)
                         continue
-
-                    if self.lastupdate(wlan) > self.rate:
-                        self.buildcmds(wlan)
-                        self.ebcommit(wlan)
+                    remaining = self.wlan_rate(wlan) - self.lastupdate(wlan)
+                    if remaining < 0:
+                        ready.append(wlan)
                         self.updated(wlan)
+                    else:
+                        delay = min(delay, remaining)
+            if ready:
+                try:
+                    self.commit(ready)
+                except CoreCommandError:
+                    logging.exception("error updating %s", self.name)
+            self.stop_event.wait(delay)
+
+    def commit(self, wlans: List["CoreNetwork"]) -> None:
+        """
+        Apply rule changes for the provided WLANs.
+
+        :param wlans: wlans to update
+        :return: nothing
+        """
+        start = time.monotonic()
+        added_count = 0
+        deleted_count = 0
+        changes = []
+        for wlan in wlans:
+            added, deleted = self.buildcmds(wlan)
+            added_count += len(added)
+            deleted_count += len(deleted)
+            if added or deleted or not wlan.has_ebtables_chain:
+                changes.append((wlan, added, deleted))
+        if changes:
+            self.apply(changes)
+            for wlan, _, _ in changes:
+                wlan.has_ebtables_chain = True
+        duration = time.monotonic() - start
+        metrics = self.metrics
+        metrics.commits += 1
+        metrics.rules_added += added_count
+        metrics.rules_deleted += deleted_count
+        metrics.last_added = added_count
+        metrics.last_deleted = deleted_count
+        metrics.last_duration = duration
+        logging.debug(
+            "%s update wlans(%s) added(%s) deleted(%s) time(%.4f)",
+            self.name,
+            len(wlans),
+            added_count,
+            deleted_count,
+            duration,
+        )
+
+    def apply(self, changes: List[RuleChange]) -> None:
+        """
+        Apply rules added and deleted for WLANs, using a single ebtables-restore
+        for all local WLANs when available.
+
+        :param changes: wlans with their rules added and deleted
+        :return: nothing
+        """
+        if self.use_restore is None:
+            self.use_restore = utils.which(EBTABLES_RESTORE, required=False) is not None
+        restore = []
+        for wlan, added, deleted in changes:
+            if self.use_restore and wlan.local_only():
+                restore.append(wlan)
+            else:
+                self.cmds = self.atomiccmds(wlan, added, deleted)
+                self.ebcommit(wlan)
+        if restore:
+            self.ebrestore(restore)
+
+    def delete_chain(self, wlan: "CoreNetwork") -> None:
+        """
+        Remove the chain created for a WLAN.
 
-            time.sleep(self.rate)
+        :param wlan: wlan to remove chain for
+        :return: nothing
+        """
+        cmds = [
+            f"{EBTABLES} -D FORWARD --logical-in {wlan.brname} -j {wlan.brname}",
+            f"{EBTABLES} -X {wlan.brname}",
+        ]
+        ebtablescmds(wlan.host_cmd, cmds)
 
     def ebcommit(self, wlan: "CoreNetwork") -> None:
         """
@@ -166,76 +300,366 @@ class EbtablesQueue:
 
         :return: nothing
         """
-        # save kernel ebtables snapshot to a file
-        args = self.ebatomiccmd("--atomic-save")
-        wlan.host_cmd(args)
+        with ebtables_lock:
+            # save kernel ebtables snapshot to a file
+            args = self.ebatomiccmd("--atomic-save")
+            wlan.host_cmd(args)
+
+            # modify the table file using queued ebtables commands
+            for c in self.cmds:
+                args = self.ebatomiccmd(c)
+                wlan.host_cmd(args)
+            self.cmds = []
 
-        # modify the table file using queued ebtables commands
-        for c in self.cmds:
-            args = self.ebatomiccmd(c)
+            # commit the table file to the kernel
+            args = self.ebatomiccmd("--atomic-commit")
             wlan.host_cmd(args)
-        self.cmds = []
 
-        # commit the table file to the kernel
-        args = self.ebatomiccmd("--atomic-commit")
-        wlan.host_cmd(args)
+            try:
+                wlan.host_cmd(f"rm -f {self.atomic_file}")
+            except CoreCommandError:
+                logging.exception("error removing atomic file: %s", self.atomic_file)
 
-        try:
-            wlan.host_cmd(f"rm -f {self.atomic_file}")
-        except CoreCommandError:
-            logging.exception("error removing atomic file: %s", self.atomic_file)
+    def ebrestore(self, wlans: List["CoreNetwork"]) -> None:
+        """
+        Replace the chains for the provided WLANs with their current rules, using a
+        single save and restore of the ebtables filter table.
 
-    def ebchange(self, wlan: "CoreNetwork") -> None:
+        :param wlans: wlans to replace chains for
+        :return: nothing
+        """
+        session = wlans[0].session
+        with ebtables_lock:
+            output = session.host_cmd(EBTABLES_SAVE)
+            chains = {}
+            for wlan in wlans:
+                rules = [f"-A FORWARD --logical-in {wlan.brname} -j {wlan.brname}"]
+                for pair_rules in self.rules.get(wlan, {}).values():
+                    rules.extend(f"-A {wlan.brname} {x}" for x in pair_rules)
+                chains[wlan.brname] = (f":{wlan.brname} {wlan.policy.value}", rules)
+            table = build_ebtables_table(output, chains)
+            args = f"{EBTABLES_RESTORE} <<'{EBTABLES_DELIMITER}'\n{table}\n"
+            args += EBTABLES_DELIMITER
+            session.host_cmd(args, shell=True)
+
+    def ebchange(
+        self,
+        wlan: "CoreNetwork",
+        iface1: CoreInterface = None,
+        iface2: CoreInterface = None,
+    ) -> None:
         """
         Flag a change to the given WLAN's _linked dict, so the ebtables
-        chain will be rebuilt at the next interval.
+        chain will be updated at the next interval.
 
+        :param wlan: wlan that changed
+        :param iface1: interface one of changed pair, default is None to check
+            all pairs
+        :param iface2: interface two of changed pair, default is None to check
+            all pairs
         :return: nothing
         """
         with self.updatelock:
-            if wlan not in self.updates:
-                self.updates.append(wlan)
+            self.updates.add(wlan)
+            if iface1 is None or iface2 is None:
+                self.changes[wlan] = None
+            elif wlan not in self.changes:
+                self.changes[wlan] = {(iface1, iface2)}
+            elif self.changes[wlan] is not None:
+                self.changes[wlan].add((iface1, iface2))
 
-    def buildcmds(self, wlan: "CoreNetwork") -> None:
+    def buildcmds(self, wlan: "CoreNetwork") -> Tuple[List[str], List[str]]:
         """
-        Inspect a _linked dict from a wlan, and rebuild the ebtables chain for that WLAN.
+        Inspect changed pairs within a _linked dict from a wlan, and update the
+        rules tracked for that WLAN.
 
-        :return: nothing
+        :return: rules added and rules deleted
         """
+        added = []
+        deleted = []
+        with self.updatelock:
+            if wlan in self.changes:
+                changes = self.changes.pop(wlan)
+            else:
+                changes = set()
+            rules = self.rules.setdefault(wlan, {})
         with wlan._linked_lock:
-            if wlan.has_ebtables_chain:
-                # flush the chain
-                self.cmds.append(f"-F {wlan.brname}")
+            if changes is None:
+                # check all pairs, along with any that may no longer exist
+                changes = set()
+                for iface1, v in wlan._linked.items():
+                    for iface2 in v:
+                        changes.add((iface1, iface2))
+                current = {frozenset(x) for x in changes}
+                for key in list(rules):
+                    if key not in current:
+                        deleted.extend(rules.pop(key))
+            for iface1, iface2 in changes:
+                key = frozenset((iface1, iface2))
+                linked = wlan._linked.get(iface1, {}).get(iface2)
+                if wlan.policy == NetworkPolicy.DROP and linked:
+                    target = "ACCEPT"
+                elif wlan.policy == NetworkPolicy.ACCEPT and linked is False:
+                    target = "DROP"
+                else:
+                    target = None
+                if target is None:
+                    deleted.extend(rules.pop(key, []))
+                elif key not in rules:
+                    pair_rules = self.pair_rules(iface1, iface2, target)
+                    rules[key] = pair_rules
+                    added.extend(pair_rules)
+        return added, deleted
+
+    def pair_rules(
+        self, iface1: CoreInterface, iface2: CoreInterface, target: str
+    ) -> List[str]:
+        """
+        Create the rules for filtering traffic between an interface pair.
+
+        :param iface1: interface one
+        :param iface2: interface two
+        :param target: target for traffic between the interfaces
+        :return: rules for the interface pair
+        """
+        return [
+            f"-i {iface1.localname} -o {iface2.localname} -j {target}",
+            f"-o {iface1.localname} -i {iface2.localname} -j {target}",
+        ]
+
+    def atomiccmds(
+        self, wlan: "CoreNetwork", added: List[str], deleted: List[str]
+    ) -> List[str]:
+        """
+        Create the ebtables commands to apply rule changes for a WLAN.
+
+        :param wlan: wlan to create commands for
+        :param added: rules added
+        :param deleted: rules deleted
+        :return: ebtables commands
+        """
+        cmds = []
+        if not wlan.has_ebtables_chain:
+            cmds.extend(
+                [
+                    f"-N {wlan.brname} -P {wlan.policy.value}",
+                    f"-A FORWARD --logical-in {wlan.brname} -j {wlan.brname}",
+                ]
+            )
+        cmds.extend(f"-D {wlan.brname} {x}" for x in deleted)
+        cmds.extend(f"-A {wlan.brname} {x}" for x in added)
+        return cmds
+
+
+def build_ebtables_table(output: str, chains: Dict[str, Tuple[str, List[str]]]) -> str:
+    """
+    Rebuild ebtables-save output, replacing the given chains within the filter
+    table and keeping everything else as is.
+
+    :param output: ebtables-save output
+    :param chains: chain name mapped to its declaration and rules
+    :return: table for ebtables-restore
+    """
+    tables = []
+    current = None
+    for line in output.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("*"):
+            current = (line, [], [], [])
+            tables.append(current)
+        elif current is None:
+            continue
+        elif line.startswith(":"):
+            current[1].append(line)
+        elif line == "COMMIT":
+            current[3].append(line)
+        else:
+            current[2].append(line)
+    filter_table = None
+    for table in tables:
+        if table[0] == "*filter":
+            filter_table = table
+    if filter_table is None:
+        filter_table = (
+            "*filter",
+            [":INPUT ACCEPT", ":FORWARD ACCEPT", ":OUTPUT ACCEPT"],
+            [],
+            [],
+        )
+        tables.append(filter_table)
+    _, declarations, rules, _ = filter_table
+    declarations[:] = [x for x in declarations if x[1:].split()[0] not in chains]
+    kept = []
+    for rule in rules:
+        fields = rule.split()
+        if len(fields) >= 2 and fields[1] in chains:
+            continue
+        if fields[-2:-1] == ["-j"] and fields[-1] in chains:
+            continue
+        kept.append(rule)
+    rules[:] = kept
+    for declaration, chain_rules in chains.values():
+        declarations.append(declaration)
+        rules.extend(chain_rules)
+    lines = []
+    for name, table_declarations, table_rules, commit in tables:
+        lines.append(name)
+        lines.extend(table_declarations)
+        lines.extend(table_rules)
+        lines.extend(commit)
+    return "\n".join(lines)
+
+
+class NftablesQueue(EbtablesQueue):
+    """
+    Rate-limited WLAN filtering using an nftables bridge table for each session.
+
+    Each WLAN has a set of interface pairs and a chain that accepts or drops
+    traffic between pairs in the set, depending on the WLAN policy. Bridges are
+    mapped to their chain using a verdict map, so link changes only add or delete
+    set elements, which are applied within a single nft transaction per update.
+    """
+
+    name: str = "nftables"
+
+    def apply(self, changes: List[RuleChange]) -> None:
+        """
+        Apply set elements added and deleted for WLANs within a single nft
+        transaction for local WLANs, and one transaction per distributed WLAN.
+
+        :param changes: wlans with their set elements added and deleted
+        :return: nothing
+        """
+        local = []
+        for wlan, added, deleted in changes:
+            cmds = self.nftcmds(wlan, added, deleted)
+            if wlan.local_only():
+                local.extend(cmds)
             else:
-                wlan.has_ebtables_chain = True
-                self.cmds.extend(
-                    [
-                        f"-N {wlan.brname} -P {wlan.policy.value}",
-                        f"-A FORWARD --logical-in {wlan.brname} -j {wlan.brname}",
-                    ]
-                )
-            # rebuild the chain
-            for iface1, v in wlan._linked.items():
-                for oface2, linked in v.items():
-                    if wlan.policy == NetworkPolicy.DROP and linked:
-                        self.cmds.extend(
-                            [
-                                f"-A {wlan.brname} -i {iface1.localname} -o {oface2.localname} -j ACCEPT",
-                                f"-A {wlan.brname} -o {iface1.localname} -i {oface2.localname} -j ACCEPT",
-                            ]
-                        )
-                    elif wlan.policy == NetworkPolicy.ACCEPT and not linked:
-                        self.cmds.extend(
-                            [
-                                f"-A {wlan.brname} -i {iface1.localname} -o {oface2.localname} -j DROP",
-                                f"-A {wlan.brname} -o {iface1.localname} -i {oface2.localname} -j DROP",
-                            ]
-                        )
-
-
-# a global object because all WLANs share the same queue
-# cannot have multiple threads invoking the ebtables commnd
-ebq: EbtablesQueue = EbtablesQueue()
+                wlan.host_cmd(self.nft_script(cmds), shell=True)
+        if local:
+            session = changes[0][0].session
+            session.host_cmd(self.nft_script(local), shell=True)
+
+    def delete_chain(self, wlan: "CoreNetwork") -> None:
+        """
+        Remove the chain and set created for a WLAN, along with the session table
+        when no other WLANs are using it.
+
+        :param wlan: wlan to remove chain for
+        :return: nothing
+        """
+        family_table = f"bridge {self.table(wlan)}"
+        chain = self.chain(wlan)
+        cmds = [
+            f'delete element {family_table} wlans {{ "{wlan.brname}" }}',
+            f"delete chain {family_table} {chain}",
+            f"delete set {family_table} {chain}",
+        ]
+        with self.updatelock:
+            tables = {self.table(x) for x in self.last_update_time}
+        if self.table(wlan) not in tables:
+            cmds = [f"delete table {family_table}"]
+        wlan.host_cmd(self.nft_script(cmds), shell=True)
+
+    def pair_rules(
+        self, iface1: CoreInterface, iface2: CoreInterface, target: str
+    ) -> List[str]:
+        """
+        Create the set elements for an interface pair, the set contains allowed
+        pairs for a drop policy and denied pairs for an accept policy.
+
+        :param iface1: interface one
+        :param iface2: interface two
+        :param target: target for traffic between the interfaces
+        :return: set elements for the interface pair
+        """
+        return [
+            f'"{iface1.localname}" . "{iface2.localname}"',
+            f'"{iface2.localname}" . "{iface1.localname}"',
+        ]
+
+    def nftcmds(
+        self, wlan: "CoreNetwork", added: List[str], deleted: List[str]
+    ) -> List[str]:
+        """
+        Create the nft commands to apply set element changes for a WLAN.
+
+        :param wlan: wlan to create commands for
+        :param added: set elements added
+        :param deleted: set elements deleted
+        :return: nft commands
+        """
+        family_table = f"bridge {self.table(wlan)}"
+        chain = self.chain(wlan)
+        cmds = []
+        if not wlan.has_ebtables_chain:
+            if wlan.policy == NetworkPolicy.DROP:
+                pair_verdict, verdict = "accept", "drop"
+            else:
+                pair_verdict, verdict = "drop", "accept"
+            cmds.extend(
+                [
+                    f"add table {family_table}",
+                    f"add chain {family_table} forward "
+                    "{ type filter hook forward priority 0; policy accept; }",
+                    f"add map {family_table} wlans {{ type ifname : verdict; }}",
+                    f"flush chain {family_table} forward",
+                    f"add rule {family_table} forward meta ibrname vmap @wlans",
+                    f"add set {family_table} {chain} {{ type ifname . ifname; }}",
+                    f"flush set {family_table} {chain}",
+                    f"add chain {family_table} {chain}",
+                    f"flush chain {family_table} {chain}",
+                    f"add rule {family_table} {chain} "
+                    f"iifname . oifname @{chain} {pair_verdict}",
+                    f"add rule {family_table} {chain} {verdict}",
+                    f'add element {family_table} wlans {{ "{wlan.brname}" : '
+                    f"jump {chain} }}",
+                ]
+            )
+            # the set was flushed, so add all current pairs
+            added = [x for v in self.rules.get(wlan, {}).values() for x in v]
+            deleted = []
+        if deleted:
+            elements = ", ".join(deleted)
+            cmds.append(f"delete element {family_table} {chain} {{ {elements} }}")
+        if added:
+            elements = ", ".join(added)
+            cmds.append(f"add element {family_table} {chain} {{ {elements} }}")
+        return cmds
+
+    @staticmethod
+    def nft_script(cmds: List[str]) -> str:
+        """
+        Create a shell command to apply nft commands as a single transaction.
+
+        :param cmds: nft commands
+        :return: shell command
+        """
+        script = "\n".join(cmds)
+        return f"{NFT} -f - <<'{NFT_DELIMITER}'\n{script}\n{NFT_DELIMITER}"
+
+    @staticmethod
+    def table(wlan: "CoreNetwork") -> str:
+        """
+        Name of the table for the session a WLAN belongs to.
+
+        :param wlan: wlan to get table for
+        :return: table name
+        """
+        return f"core_{wlan.session.short_session_id()}"
+
+    @staticmethod
+    def chain(wlan: "CoreNetwork") -> str:
+        """
+        Name of the chain and set for a WLAN.
+
+        :param wlan: wlan to get chain for
+        :return: chain name
+        """
+        return f"wlan{wlan.id}"
 
 
 def ebtablescmds(call: Callable[..., str], cmds: List[str]) -> None:
@@ -285,6 +709,10 @@ class CoreNetwork(CoreNetworkBase):
         sessionid = self.session.short_session_id()
         self.brname: str = f"b.{self.id}.{sessionid}"
         self.has_ebtables_chain: bool = False
+        self.filter_queue: EbtablesQueue = self.session.ebtables_queue
+        # minimum time between link filtering updates, None for the queue default,
+        # configured using the basic range model update_rate option
+        self.update_rate: Optional[float] = None
 
     def host_cmd(
         self,
@@ -307,10 +735,23 @@ class CoreNetwork(CoreNetworkBase):
         :raises CoreCommandError: when a non-zero exit status occurs
         """
         logging.debug("network node(%s) cmd", self.name)
-        output = utils.cmd(args, env, cwd, wait, shell)
-        self.session.distributed.execute(lambda x: x.remote_cmd(args, env, cwd, wait))
+        with self.session.track_cmd(args, self):
+            output = utils.cmd(args, env, cwd, wait, shell)
+        self.session.distributed.execute(
+            lambda x: x.remote_cmd(args, env, cwd, wait, self)
+        )
         return output
 
+    def local_only(self) -> bool:
+        """
+        Check if host network configuration for this node only applies to the
+        local host, which is not the case when it is also replicated to
+        distributed servers.
+
+        :return: True if only on the local host, False otherwise
+        """
+        return super().local_only() and not self.session.distributed.servers
+
     def startup(self) -> None:
         """
         Linux bridge starup logic.
@@ -320,8 +761,14 @@ class CoreNetwork(CoreNetworkBase):
         """
         self.net_client.create_bridge(self.brname)
         self.has_ebtables_chain = False
+        if self.session.use_nftables():
+            self.filter_queue = self.session.nftables_queue
+        else:
+            self.filter_queue = self.session.ebtables_queue
         self.up = True
-        ebq.startupdateloop(self)
+        self.filter_queue.startupdateloop(self)
+        if self.server is None:
+            self.session.throughput.add_bridge(self.brname, self.id)
 
     def shutdown(self) -> None:
         """
@@ -332,16 +779,13 @@ class CoreNetwork(CoreNetworkBase):
         if not self.up:
             return
 
-        ebq.stopupdateloop(self)
+        self.filter_queue.stopupdateloop(self)
+        self.session.throughput.remove(self.brname)
 
         try:
             self.net_client.delete_bridge(self.brname)
             if self.has_ebtables_chain:
-                cmds = [
-                    f"{EBTABLES} -D FORWARD --logical-in {self.brname} -j {self.brname}",
-                    f"{EBTABLES} -X {self.brname}",
-                ]
-                ebtablescmds(self.host_cmd, cmds)
+                self.filter_queue.delete_chain(self)
         except CoreCommandError:
             logging.exception("error during shutdown")
 
@@ -418,7 +862,7 @@ class CoreNetwork(CoreNetworkBase):
                 return
             self._linked[iface1][iface2] = False
 
-        ebq.ebchange(self)
+        self.filter_queue.ebchange(self, iface1, iface2)
 
     def link(self, iface1: CoreInterface, iface2: CoreInterface) -> None:
         """
@@ -434,7 +878,7 @@ class CoreNetwork(CoreNetworkBase):
                 return
             self._linked[iface1][iface2] = True
 
-        ebq.ebchange(self)
+        self.filter_queue.ebchange(self, iface1, iface2)
 
     def linkconfig(
         self, iface: CoreInterface, options: LinkOptions, iface2: CoreInterface = None
@@ -448,8 +892,7 @@ class CoreNetwork(CoreNetworkBase):
         :return: nothing
         """
         devname = iface.localname
-        tc = f"{TC} qdisc replace dev {devname}"
-        parent = "root"
+        parent = None
         changed = False
         bw = options.bandwidth
         if iface.setparam("bw", bw):
@@ -457,24 +900,20 @@ class CoreNetwork(CoreNetworkBase):
             burst = max(2 * iface.mtu, int(bw / 1000))
             # max IP payload
             limit = 0xFFFF
-            tbf = f"tbf rate {bw} burst {burst} limit {limit}"
             if bw > 0:
                 if self.up:
-                    cmd = f"{tc} {parent} handle 1: {tbf}"
-                    iface.host_cmd(cmd)
+                    iface.net_client.set_tbf(devname, bw, burst, limit)
                 iface.setparam("has_tbf", True)
                 changed = True
             elif iface.getparam("has_tbf") and bw <= 0:
                 if self.up:
-                    cmd = f"{TC} qdisc delete dev {devname} {parent}"
-                    iface.host_cmd(cmd)
+                    iface.net_client.delete_qdisc(devname, parent)
                 iface.setparam("has_tbf", False)
                 # removing the parent removes the child
                 iface.setparam("has_netem", False)
                 changed = True
         if iface.getparam("has_tbf"):
-            parent = "parent 1:1"
-        netem = "netem"
+            parent = "1:1"
         delay = options.delay
         changed = max(changed, iface.setparam("delay", delay))
         loss = options.loss
@@ -489,19 +928,6 @@ class CoreNetwork(CoreNetworkBase):
         changed = max(changed, iface.setparam("jitter", jitter))
         if not changed:
             return
-        # jitter and delay use the same delay statement
-        if delay is not None:
-            netem += f" delay {delay}us"
-        if jitter is not None:
-            if delay is None:
-                netem += f" delay 0us {jitter}us 25%"
-            else:
-                netem += f" {jitter}us 25%"
-
-        if loss is not None and loss > 0:
-            netem += f" loss {min(loss, 100)}%"
-        if duplicate is not None and duplicate > 0:
-            netem += f" duplicate {min(duplicate, 100)}%"
 
         delay_check = delay is None or delay <= 0
         jitter_check = jitter is None or jitter <= 0
@@ -512,13 +938,13 @@ class CoreNetwork(CoreNetworkBase):
             if not iface.getparam("has_netem"):
                 return
             if self.up:
-                cmd = f"{TC} qdisc delete dev {devname} {parent} handle 10:"
-                iface.host_cmd(cmd)
+                iface.net_client.delete_qdisc(devname, parent, "10:")
             iface.setparam("has_netem", False)
-        elif len(netem) > 1:
+        else:
             if self.up:
-                cmd = f"{TC} qdisc replace dev {devname} {parent} handle 10: {netem}"
-                iface.host_cmd(cmd)
+                iface.net_client.set_netem(
+                    devname, parent, delay, jitter, loss, duplicate
+                )
             iface.setparam("has_netem", True)
 
     def linknet(self, net: CoreNetworkBase) -> CoreInterface:
@@ -759,7 +1185,9 @@ class CtrlNet(CoreNetwork):
         use_ovs = self.session.use_ovs()
         address = self.prefix[index]
         current = f"{address}/{self.prefix.prefixlen}"
-        net_client = get_net_client(use_ovs, utils.cmd)
+        net_client = get_net_client(
+            use_ovs, self.session.host_cmd, self.session.use_netlink()
+        )
         net_client.create_address(self.brname, current)
         servers = self.session.distributed.servers
         for name in servers:
@@ -1003,7 +1431,7 @@ class WlanNode(CoreNetwork):
         """
         super().startup()
         self.net_client.disable_mac_learning(self.brname)
-        ebq.ebchange(self)
+        self.filter_queue.ebchange(self)
 
     def attach(self, iface: CoreInterface) -> None:
         """
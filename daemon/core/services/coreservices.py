@@ -7,18 +7,20 @@ a list of available services to the GUI and for configuring individual
 services.
 """
 
+import concurrent.futures
 import enum
 import logging
-import time
 from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple, Type
 
 from core import utils
 from core.emulator.data import FileData
 from core.emulator.enumerations import ExceptionLevels, MessageFlags, RegisterTlvs
+from core.emulator.profiler import SERVICE_DIRS, SERVICE_FILES, SERVICE_STARTUP
 from core.errors import CoreCommandError, CoreError
 from core.nodes.base import CoreNode
 
 if TYPE_CHECKING:
+    from core.emulator.bootscheduler import BootScheduler, BootStep
     from core.emulator.session import Session
 
 
@@ -479,6 +481,50 @@ class CoreServices:
         if exceptions:
             raise ServiceBootError(*exceptions)
 
+    def add_boot_steps(
+        self, scheduler: "BootScheduler", node: CoreNode, dependencies: List["BootStep"]
+    ) -> List["BootStep"]:
+        """
+        Add steps for starting all services on a node to a boot scheduler, where
+        each service depends on the services it requires.
+
+        :param scheduler: scheduler to add steps to
+        :param node: node to start services on
+        :param dependencies: steps that must complete before any service starts
+        :return: created service steps
+        :raises ValueError: when service dependencies are invalid
+        """
+        boot_paths = ServiceDependencies(node.services).boot_paths()
+        steps = {}
+        for boot_path in boot_paths:
+            for service in boot_path:
+                if service.name in steps:
+                    continue
+                service_dependencies = list(dependencies)
+                service_dependencies.extend(steps[x] for x in service.dependencies)
+                steps[service.name] = scheduler.add_step(
+                    f"node({node.name}) service({service.name})",
+                    self._boot_step,
+                    (node, service.name),
+                    service_dependencies,
+                    node,
+                )
+        return list(steps.values())
+
+    def _boot_step(
+        self, node: CoreNode, name: str
+    ) -> Optional[concurrent.futures.Future]:
+        """
+        Start a service on a node, using any custom configuration for it.
+
+        :param node: node to start service on
+        :param name: name of service to start
+        :return: future completed when service is validated, None when already
+            validated
+        """
+        service = self.get_service(node.id, name, default_service=True)
+        return self.start_service(node, service)
+
     def _start_boot_paths(self, node: CoreNode, boot_path: List["CoreService"]) -> None:
         """
         Start all service boot paths found, based on dependencies.
@@ -509,6 +555,23 @@ class CoreServices:
         :param service: service to start
         :return: nothing
         """
+        future = self.start_service(node, service)
+        if future:
+            future.result()
+
+    def start_service(
+        self, node: CoreNode, service: "CoreService"
+    ) -> Optional[concurrent.futures.Future]:
+        """
+        Start a service on a node. Create private dirs, generate config
+        files, and execute startup commands, scheduling validation based on
+        validation mode rather than waiting for it.
+
+        :param node: node to boot services on
+        :param service: service to start
+        :return: future completed when service is validated, None when already
+            validated
+        """
         logging.info(
             "starting node(%s) service(%s) validation(%s)",
             node.name,
@@ -516,24 +579,28 @@ class CoreServices:
             service.validation_mode.name,
         )
 
+        profiler = self.session.profiler
         # create service directories
-        for directory in service.dirs:
-            try:
-                node.privatedir(directory)
-            except (CoreCommandError, ValueError) as e:
-                logging.warning(
-                    "error mounting private dir '%s' for service '%s': %s",
-                    directory,
-                    service.name,
-                    e,
-                )
+        with profiler.service_stage(node, service.name, SERVICE_DIRS):
+            for directory in service.dirs:
+                try:
+                    node.privatedir(directory)
+                except (CoreCommandError, ValueError) as e:
+                    logging.warning(
+                        "error mounting private dir '%s' for service '%s': %s",
+                        directory,
+                        service.name,
+                        e,
+                    )
 
         # create service files
-        self.create_service_files(node, service)
+        with profiler.service_stage(node, service.name, SERVICE_FILES):
+            self.create_service_files(node, service)
 
         # run startup
         wait = service.validation_mode == ServiceMode.BLOCKING
-        status = self.startup_service(node, service, wait)
+        with profiler.service_stage(node, service.name, SERVICE_STARTUP):
+            status = self.startup_service(node, service, wait)
         if status:
             raise ServiceBootError(
                 "node(%s) service(%s) error during startup" % (node.name, service.name)
@@ -541,28 +608,25 @@ class CoreServices:
 
         # blocking mode is finished
         if wait:
-            return
+            return None
 
-        # timer mode, sleep and return
+        validation = self.session.validation
+        # timer mode, complete after validation timer
         if service.validation_mode == ServiceMode.TIMER:
-            time.sleep(service.validation_timer)
-        # non-blocking, attempt to validate periodically, up to validation_timer time
-        elif service.validation_mode == ServiceMode.NON_BLOCKING:
-            start = time.monotonic()
-            while True:
-                status = self.validate_service(node, service)
-                if not status:
-                    break
-
-                if time.monotonic() - start > service.validation_timer:
-                    break
-
-                time.sleep(service.validation_period)
-
-            if status:
-                raise ServiceBootError(
-                    "node(%s) service(%s) failed validation" % (node.name, service.name)
-                )
+            future = validation.delay(service.validation_timer)
+        else:
+            # non-blocking, attempt to validate periodically, up to validation_timer
+            error = ServiceBootError(
+                "node(%s) service(%s) failed validation" % (node.name, service.name)
+            )
+            future = validation.schedule(
+                lambda: not self.validate_service(node, service),
+                service.validation_period,
+                service.validation_timer,
+                error,
+            )
+        profiler.service_validation(node, service.name, future)
+        return future
 
     def copy_service_file(self, node: CoreNode, filename: str, cfg: str) -> bool:
         """
@@ -420,6 +420,32 @@ def threadpool(
     return results, exceptions
 
 
+def threadpool_results(
+    funcs: List[Tuple[Callable, Iterable[Any], Dict[Any, Any]]], workers: int = 10
+) -> List[Tuple[Any, Optional[Exception]]]:
+    """
+    Run provided functions, arguments, and keywords within a threadpool
+    collecting the result or exception of each function, in the order provided.
+
+    :param funcs: iterable that provides a func, args, kwargs
+    :param workers: number of workers for the threadpool
+    :return: result and exception for each function, one of which will be None
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for func, args, kwargs in funcs:
+            future = executor.submit(func, *args, **kwargs)
+            futures.append(future)
+        results = []
+        for future in futures:
+            try:
+                results.append((future.result(), None))
+            except Exception as e:
+                logging.exception("thread pool exception")
+                results.append((None, e))
+    return results
+
+
 def random_mac() -> str:
     """
     Create a random mac address using Xen OID 00:16:3E.
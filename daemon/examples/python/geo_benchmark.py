@@ -0,0 +1,74 @@
+"""
+This is a standalone script comparing the per point cost of converting positions
+between x,y,z and lat,lon,alt one point at a time against converting all points
+together, and will not interact with the GUI.
+"""
+
+import argparse
+import logging
+import random
+import time
+
+from core.location.geo import GeoLocation
+
+POINTS = 10000
+ROUNDS = 5
+
+
+def per_point(func, count: int, rounds: int) -> float:
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return best / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark geo conversions")
+    parser.add_argument("-p", "--points", type=int, default=POINTS)
+    parser.add_argument("-r", "--rounds", type=int, default=ROUNDS)
+    args = parser.parse_args()
+
+    # location with the same reference point as the default gui canvas
+    location = GeoLocation()
+    location.setrefgeo(47.57917, -122.13232, 2.0)
+    location.refscale = 150.0
+    xs = [random.uniform(0, 1000) for _ in range(args.points)]
+    ys = [random.uniform(0, 750) for _ in range(args.points)]
+    zs = [0.0] * args.points
+    lats, lons, alts = zip(*location.getgeo_many(xs, ys, zs))
+
+    def getgeo_single():
+        for x, y, z in zip(xs, ys, zs):
+            location.getgeo(x, y, z)
+
+    def getxyz_single():
+        for lat, lon, alt in zip(lats, lons, alts):
+            location.getxyz(lat, lon, alt)
+
+    results = [
+        ("getgeo", per_point(getgeo_single, args.points, args.rounds)),
+        (
+            "getgeo_many",
+            per_point(
+                lambda: location.getgeo_many(xs, ys, zs), args.points, args.rounds
+            ),
+        ),
+        ("getxyz", per_point(getxyz_single, args.points, args.rounds)),
+        (
+            "getxyz_many",
+            per_point(
+                lambda: location.getxyz_many(lats, lons, alts), args.points, args.rounds
+            ),
+        ),
+    ]
+    logging.info("%s points, best of %s rounds", args.points, args.rounds)
+    for name, cost in results:
+        logging.info("%-12s %8.3f us/point", name, cost)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -10,8 +10,12 @@ import pytest
 
 from core.emulator.data import IpPrefixes, NodeOptions
 from core.emulator.enumerations import MessageFlags
+from core.emulator.eventbus import EventBus
 from core.emulator.session import Session
+from core.emulator.throughput import ThroughputSubscriber
 from core.errors import CoreCommandError
+from core.location.event import EventLoop
+from core.location.geo import GeoLocation
 from core.location.mobility import BasicRangeModel, Ns2ScriptedMobility
 from core.nodes.base import CoreNode, NodeBase
 from core.nodes.network import HubNode, PtpNet, SwitchNode, WlanNode
@@ -219,3 +223,140 @@ class TestCore:
 
         # validate we receive a node message for updating its location
         assert event.wait(5)
+
+    def test_event_bus(self):
+        # given
+        event_bus = EventBus()
+        release = threading.Event()
+        received = threading.Event()
+
+        def slow_handler(_):
+            release.wait(5)
+
+        def fast_handler(_):
+            received.set()
+
+        # when
+        event_bus.publish([slow_handler, fast_handler], "data")
+        fast_received = received.wait(5)
+        release.set()
+        event_bus.join()
+
+        # then
+        assert fast_received
+        stats = event_bus.stats()
+        assert len(stats) == 2
+        assert all(x.dispatched == 1 and x.pending == 0 for x in stats)
+
+    def test_event_bus_dropped(self):
+        # given
+        event_bus = EventBus(queue_size=2)
+        release = threading.Event()
+        received = []
+
+        def slow_handler(data):
+            release.wait(5)
+            received.append(data)
+
+        # when
+        for data in range(5):
+            event_bus.publish([slow_handler], data)
+        release.set()
+        event_bus.join()
+
+        # then
+        stats = event_bus.stats()[0]
+        assert received[-2:] == [3, 4]
+        assert stats.dropped == len(range(5)) - len(received)
+        assert stats.dispatched == len(received)
+
+    def test_throughput_subscriber(self):
+        # given
+        subscriber = ThroughputSubscriber(interval=1.0)
+        key = (1, 0)
+        counters1 = {key: (0, 0, 0, 0, 0, 0, 0, 0)}
+        counters2 = {key: (10, 20, 1000, 2000, 0, 0, 1, 2)}
+
+        # when
+        subscriber.offer(0.0, counters1)
+        subscriber.offer(0.5, counters2)
+        early = subscriber.get(timeout=0)
+        subscriber.offer(2.0, counters2)
+        throughputs = subscriber.get(timeout=0)
+
+        # then
+        assert early is None
+        assert len(throughputs) == 1
+        throughput = throughputs[0]
+        assert throughput.node_id == 1
+        assert throughput.iface_id == 0
+        assert throughput.rx == 4000.0
+        assert throughput.tx == 8000.0
+        assert throughput.rx_packets == 5.0
+        assert throughput.tx_dropped == 1.0
+
+    def test_event_loop(self):
+        # given
+        event_loop = EventLoop()
+        results = []
+        done = threading.Event()
+        event_loop.add_event(0.03, results.append, 3)
+        event_loop.add_event(0.01, results.append, 1)
+        canceled = event_loop.add_event(0.02, results.append, 0)
+        rescheduled = event_loop.add_event(1.0, results.append, 2)
+
+        # when
+        event_loop.run()
+        event_loop.cancel(canceled)
+        event_loop.reschedule(rescheduled, 0.02)
+        event_loop.add_event(0.05, done.set)
+        finished = done.wait(5)
+        stats = event_loop.stats()
+        event_loop.stop()
+
+        # then
+        assert finished
+        assert results == [1, 2, 3]
+        assert stats.events == 4
+        assert stats.pending == 0
+        assert event_loop.thread is None
+
+    def test_event_loop_cancel_ran(self):
+        # given
+        event_loop = EventLoop()
+        done = threading.Event()
+        event_loop.run()
+        ran = event_loop.add_event(0.0, done.set)
+        finished = done.wait(5)
+
+        # when
+        event_loop.cancel(ran)
+        event_loop.add_event(10.0, done.clear)
+        canceled = event_loop.canceled
+        stats = event_loop.stats()
+        event_loop.stop()
+
+        # then
+        assert finished
+        assert canceled == 0
+        assert stats.pending == 1
+
+    def test_geo_many(self):
+        # given
+        location = GeoLocation()
+        location.setrefgeo(47.57917, -122.13232, 2.0)
+        location.refscale = 150.0
+        points = [(0.0, 0.0, 0.0), (100.0, 250.0, 10.0), (1000.0, 500.0, None)]
+        xs, ys, zs = zip(*points)
+
+        # when
+        geos = location.getgeo_many(xs, ys, zs)
+        lats, lons, alts = zip(*geos)
+        positions = location.getxyz_many(lats, lons, alts)
+
+        # then
+        assert location.getgeo_many([], [], []) == []
+        assert location.getxyz_many([], [], []) == []
+        for point, geo, position in zip(points, geos, positions):
+            assert geo == pytest.approx(location.getgeo(*point))
+            assert position == pytest.approx(location.getxyz(*geo))
@@ -1,6 +1,13 @@
+import os
+import sys
+from subprocess import PIPE, Popen
+
 from core.emulator.data import NodeOptions
+from core.emulator.distributed import DistributedServer
+from core.emulator.remoteagent import command_request, file_request
 from core.emulator.session import Session
 from core.nodes.base import CoreNode
+from core.nodes.executor import read_frame, write_frame
 from core.nodes.network import HubNode
 
 
@@ -21,6 +28,25 @@ class TestDistributed:
         assert node.server.name == server_name
         assert node.server.host == host
 
+    def test_remote_commands_tracked(self, session: Session):
+        # given
+        session.options.set_config("command_stats", "1")
+        server = DistributedServer("core2", "127.0.0.1", session=session)
+        node = session.add_node(CoreNode)
+
+        # when
+        with server.track_cmd("ip link show", None, None):
+            pass
+        with server.track_cmd("vcmd -c ctrl -- ip link show", node, "node:ip"):
+            pass
+
+        # then
+        stats, _ = session.command_stats.get_stats()
+        counts = {x.name: x.count for x in stats}
+        assert counts["remote:ip"] == 1
+        assert counts["remote:node:ip"] == 1
+        assert "ip" not in counts
+
     def test_remote_bridge(self, session: Session):
         # given
         server_name = "core2"
@@ -38,3 +64,41 @@ class TestDistributed:
         assert node.server.name == server_name
         assert node.server.host == host
         assert len(session.distributed.tunnels) > 0
+
+
+class TestRemoteAgent:
+    def test_agent_batches(self, tmpdir):
+        # given
+        agent = Popen(
+            [sys.executable, "-m", "core.emulator.remoteagent"], stdin=PIPE, stdout=PIPE
+        )
+        path = os.path.join(tmpdir, "agent.txt")
+        slow = [command_request("sleep 0.5 && echo slow")]
+        batch = [
+            command_request("echo $((1 + 1))"),
+            command_request("false"),
+            command_request("echo three"),
+        ]
+        files = [
+            file_request(path, b"data", 0o600),
+            command_request("cat agent.txt", cwd=str(tmpdir)),
+        ]
+
+        # when
+        write_frame(agent.stdin, dict(id=0, requests=slow))
+        write_frame(agent.stdin, dict(id=1, requests=batch))
+        write_frame(agent.stdin, dict(id=2, requests=files))
+        results = {}
+        for _ in range(3):
+            frame = read_frame(agent.stdout)
+            results[frame["id"]] = [tuple(x) for x in frame["results"]]
+        agent.stdin.close()
+        agent.wait()
+
+        # then
+        assert results[0] == [(0, "slow", "")]
+        assert len(results[1]) == 2
+        assert results[1][0] == (0, "2", "")
+        assert results[1][1][0] != 0
+        assert results[2][1] == (0, "data", "")
+        assert os.stat(path).st_mode & 0o777 == 0o600
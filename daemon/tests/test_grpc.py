@@ -1,7 +1,8 @@
+import os
 import time
 from queue import Queue
 from tempfile import TemporaryFile
-from typing import Optional
+from typing import List, Optional
 
 import grpc
 import pytest
@@ -10,16 +11,25 @@ from mock import patch
 from core.api.grpc import core_pb2
 from core.api.grpc.client import CoreGrpcClient, InterfaceHelper
 from core.api.grpc.emane_pb2 import EmaneModelConfig
+from core.api.grpc.events import EventBuffer
 from core.api.grpc.mobility_pb2 import MobilityAction, MobilityConfig
 from core.api.grpc.server import CoreGrpcServer
 from core.api.grpc.services_pb2 import ServiceAction, ServiceConfig, ServiceFileConfig
 from core.api.grpc.wlan_pb2 import WlanConfig
 from core.api.tlv.dataconversion import ConfigShim
 from core.api.tlv.enumerations import ConfigFlags
+from core.emane.emanemanager import EmaneManager, EmaneState
 from core.emane.ieee80211abg import EmaneIeee80211abgModel
 from core.emane.nodes import EmaneNet
 from core.emulator.data import EventData, IpPrefixes, NodeData, NodeOptions
-from core.emulator.enumerations import EventTypes, ExceptionLevels, NodeTypes
+from core.emulator.enumerations import (
+    EventTypes,
+    ExceptionLevels,
+    MessageFlags,
+    NodeTypes,
+)
+from core.emulator.profiler import PROFILE_FILE
+from core.emulator.session import Session
 from core.errors import CoreError
 from core.location.mobility import BasicRangeModel, Ns2ScriptedMobility
 from core.nodes.base import CoreNode
@@ -217,6 +227,31 @@ class TestGrpc:
         assert len(response.session.nodes) == 1
         assert len(response.session.links) == 0
 
+    def test_get_session_changes(
+        self, grpc_server: CoreGrpcServer, ip_prefixes: IpPrefixes
+    ):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        node = session.add_node(CoreNode)
+        switch = session.add_node(SwitchNode)
+        with client.context_connect():
+            client.get_session(session.id)
+
+        # when
+        iface_data = ip_prefixes.create_iface(node)
+        session.add_link(node.id, switch.id, iface_data)
+        session.edit_node(node.id, NodeOptions(x=10, y=20))
+        with client.context_connect():
+            response = client.get_session(session.id)
+
+        # then
+        assert len(response.session.nodes) == 2
+        assert len(response.session.links) == 1
+        node_proto = [x for x in response.session.nodes if x.id == node.id][0]
+        assert node_proto.position.x == 10
+        assert node_proto.position.y == 20
+
     def test_get_sessions(self, grpc_server: CoreGrpcServer):
         # given
         client = CoreGrpcClient()
@@ -265,6 +300,129 @@ class TestGrpc:
         assert response.location.lon == 0
         assert response.location.alt == 0
 
+    def test_get_session_profile(self, request, grpc_server: CoreGrpcServer):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        session.set_state(EventTypes.CONFIGURATION_STATE)
+        options = NodeOptions(model="Host")
+        node = session.add_node(CoreNode, options=options)
+        start_time = time.time()
+        session.instantiate()
+
+        # when
+        with client.context_connect():
+            response = client.get_session_profile(session.id)
+            time.sleep(0.01)
+            second_response = client.get_session_profile(session.id)
+
+        # then
+        assert response.profile.start_time >= start_time
+        assert response.profile.duration == second_response.profile.duration
+        phases = [x.name for x in response.profile.phases]
+        assert "boot nodes" in phases
+        node_ids = [x.node_id for x in response.profile.nodes]
+        assert node.id in node_ids
+        services = [x for x in response.profile.services if x.node_id == node.id]
+        assert len(services) == len(node.services)
+        if not request.config.getoption("mock"):
+            profile_path = os.path.join(session.session_dir, PROFILE_FILE)
+            assert os.path.exists(profile_path)
+
+    def test_session_profile_after_startup(self, session: Session):
+        # given
+        session.add_node(CoreNode)
+        with patch.object(
+            EmaneManager,
+            "startup",
+            side_effect=[EmaneState.NOT_READY, EmaneState.NOT_NEEDED],
+        ):
+            session.instantiate()
+            session.instantiate()
+        profile = session.profiler.profile()
+
+        # when
+        with session.profiler.phase("edit links"):
+            session.profiler.command(None)
+        after = session.profiler.profile()
+        session.profiler.begin()
+        restarted = session.profiler.profile()
+
+        # then
+        phases = [x.name for x in profile.phases]
+        assert phases.count("emane") == 2
+        assert phases.count("boot nodes") == 1
+        assert after.phases == profile.phases
+        assert after.commands == profile.commands
+        assert after.duration == profile.duration
+        assert not restarted.phases
+
+    def test_get_command_stats(self, grpc_server: CoreGrpcServer):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        session.options.set_config("command_stats", "1")
+        session.set_state(EventTypes.CONFIGURATION_STATE)
+        options = NodeOptions(model="Host")
+        session.add_node(CoreNode, options=options)
+        session.instantiate()
+
+        # then
+        with client.context_connect():
+            response = client.get_command_stats(session.id, reset=True)
+            reset_response = client.get_command_stats(session.id)
+
+        # then
+        assert len(response.buckets) > 0
+        assert len(response.stats) > 0
+        for stat in response.stats:
+            assert stat.count > 0
+            assert sum(stat.buckets) == stat.count
+            assert len(stat.buckets) == len(response.buckets) + 1
+        assert len(reset_response.stats) == 0
+
+    def test_get_event_bus_stats(self, grpc_server: CoreGrpcServer):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        session.options.set_config("async_broadcast", "1")
+        received = []
+        session.event_handlers.append(received.append)
+        session.broadcast_event(EventData(event_type=EventTypes.RUNTIME_STATE))
+        session.event_bus.join()
+
+        # when
+        with client.context_connect():
+            response = client.get_event_bus_stats(session.id)
+
+        # then
+        assert len(received) == 1
+        assert len(response.handlers) == 1
+        handler = response.handlers[0]
+        assert handler.dispatched == 1
+        assert handler.pending == 0
+        assert handler.dropped == 0
+
+    def test_get_distributed_stats(self, grpc_server: CoreGrpcServer):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        server_name = "core2"
+        host = "127.0.0.1"
+        session.distributed.add_server(server_name, host)
+
+        # then
+        with client.context_connect():
+            response = client.get_distributed_stats(session.id)
+
+        # then
+        assert len(response.servers) == 1
+        server = response.servers[0]
+        assert server.name == server_name
+        assert server.host == host
+        assert not server.agent
+        assert server.batches == 0
+
     def test_set_session_location(self, grpc_server: CoreGrpcServer):
         # given
         client = CoreGrpcClient()
@@ -368,6 +526,24 @@ class TestGrpc:
         assert response.node_id is not None
         assert session.get_node(response.node_id, CoreNode) is not None
 
+    def test_add_nodes(self, grpc_server: CoreGrpcServer):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        nodes = [core_pb2.Node(), core_pb2.Node(), core_pb2.Node(id=1)]
+
+        # then
+        with client.context_connect():
+            response = client.add_nodes(session.id, nodes)
+
+        # then
+        assert len(response.results) == 3
+        node_ids = {x.node_id for x in response.results}
+        assert len(node_ids) == 3
+        for result in response.results:
+            assert result.result is True
+            assert session.get_node(result.node_id, CoreNode) is not None
+
     def test_get_node(self, grpc_server: CoreGrpcServer):
         # given
         client = CoreGrpcClient()
@@ -630,6 +806,69 @@ class TestGrpc:
         assert response.result is True
         assert len(link_node.links()) == 0
 
+    def test_add_links(
+        self, grpc_server: CoreGrpcServer, iface_helper: InterfaceHelper
+    ):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        switch = session.add_node(SwitchNode)
+        node1 = session.add_node(CoreNode)
+        node2 = session.add_node(CoreNode)
+        links = []
+        for node_id in [node1.id, node2.id, 100]:
+            iface = iface_helper.create_iface(node_id, 0)
+            link = core_pb2.Link(
+                type=core_pb2.LinkType.WIRED,
+                node1_id=node_id,
+                node2_id=switch.id,
+                iface1=iface,
+            )
+            links.append(link)
+
+        # then
+        with client.context_connect():
+            response = client.add_links(session.id, links)
+
+        # then
+        assert [x.result for x in response.results] == [True, True, False]
+        assert response.results[2].error
+        assert response.results[0].iface1.node_id == node1.id
+        assert len(switch.links()) == 2
+
+    def test_edit_delete_links(
+        self, grpc_server: CoreGrpcServer, ip_prefixes: IpPrefixes
+    ):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        switch = session.add_node(SwitchNode)
+        links = []
+        for _ in range(3):
+            node = session.add_node(CoreNode)
+            iface_data = ip_prefixes.create_iface(node)
+            session.add_link(node.id, switch.id, iface_data)
+            iface = core_pb2.Interface(id=iface_data.id)
+            options = core_pb2.LinkOptions(bandwidth=5000)
+            link = core_pb2.Link(
+                type=core_pb2.LinkType.WIRED,
+                node1_id=node.id,
+                node2_id=switch.id,
+                iface1=iface,
+                options=options,
+            )
+            links.append(link)
+
+        # then
+        with client.context_connect():
+            edit_response = client.edit_links(session.id, links)
+            delete_response = client.delete_links(session.id, links)
+
+        # then
+        assert all(x.result for x in edit_response.results)
+        assert all(x.result for x in delete_response.results)
+        assert len(switch.links()) == 0
+
     def test_get_wlan_config(self, grpc_server: CoreGrpcServer):
         # given
         client = CoreGrpcClient()
@@ -1021,6 +1260,77 @@ class TestGrpc:
             # then
             queue.get(timeout=5)
 
+    def test_node_position_events(self, grpc_server: CoreGrpcServer):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        node1 = session.add_node(CoreNode)
+        node2 = session.add_node(CoreNode)
+        queue = Queue()
+
+        def handle_event(event_data):
+            assert event_data.session_id == session.id
+            assert event_data.HasField("node_events")
+            queue.put(event_data)
+
+        # then
+        with client.context_connect():
+            client.events(session.id, handle_event, position_window=200)
+            time.sleep(0.1)
+            for node in [node1, node2, node1]:
+                session.broadcast_node(node)
+
+            # then
+            event_data = queue.get(timeout=5)
+            node_ids = [x.node.id for x in event_data.node_events.events]
+            assert node_ids == [node2.id, node1.id]
+            assert queue.empty()
+
+    def test_get_event_streams(self, grpc_server: CoreGrpcServer):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+
+        # then
+        with client.context_connect():
+            client.events(session.id, lambda x: None, queue_size=10)
+            time.sleep(0.1)
+            response = client.get_event_streams(session.id)
+
+        # then
+        assert len(response.streams) == 1
+        assert response.streams[0].queue_size == 10
+        assert response.streams[0].overflow == core_pb2.EventOverflow.DROP_OLDEST
+
+    @pytest.mark.parametrize(
+        "overflow,expected,dropped",
+        [
+            (core_pb2.EventOverflow.DROP_OLDEST, [0, 2], 2),
+            (core_pb2.EventOverflow.COALESCE, [0, 2], 2),
+            (core_pb2.EventOverflow.DISCONNECT, [0, 1], 2),
+        ],
+    )
+    def test_event_buffer(
+        self, session: Session, overflow: int, expected: List[int], dropped: int
+    ):
+        # given
+        nodes = [session.add_node(CoreNode) for _ in range(3)]
+        event_buffer = EventBuffer(2, overflow)
+
+        # when
+        for index in [0, 1, 0, 2]:
+            node_data = NodeData(node=nodes[index], message_type=MessageFlags.NONE)
+            event_buffer.put(node_data)
+        events = event_buffer.get(0)
+
+        # then
+        assert [nodes.index(x.node) for x in events] == expected
+        assert event_buffer.dropped + event_buffer.coalesced == dropped
+        assert event_buffer.overflowed == (
+            overflow == core_pb2.EventOverflow.DISCONNECT
+        )
+        assert event_buffer.max_lag == 2
+
     def test_link_events(self, grpc_server: CoreGrpcServer, ip_prefixes: IpPrefixes):
         # given
         client = CoreGrpcClient()
@@ -1189,6 +1499,94 @@ class TestGrpc:
         assert node.position.x == x
         assert node.position.y == y
 
+    def test_move_nodes_all_applied(self, grpc_server: CoreGrpcServer):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        node = session.add_node(CoreNode)
+        positions = [(10.0, 15.0), (20.0, 25.0), (30.0, 35.0)]
+        source = "test"
+        moved = []
+
+        def node_handler(node_data: NodeData):
+            position = node_data.node.position
+            moved.append((position.x, position.y, node_data.source))
+
+        session.node_handlers.append(node_handler)
+
+        def move_iter():
+            for x, y in positions:
+                yield core_pb2.MoveNodesRequest(
+                    session_id=session.id,
+                    node_id=node.id,
+                    source=source,
+                    position=core_pb2.Position(x=x, y=y),
+                )
+
+        # when
+        with client.context_connect():
+            client.move_nodes(move_iter())
+
+        # then
+        assert moved == [(x, y, source) for x, y in positions]
+
+    def test_move_nodes_failed(self, grpc_server: CoreGrpcServer):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        node1 = session.add_node(CoreNode)
+        node2 = session.add_node(CoreNode)
+        x, y = 10.0, 15.0
+
+        def move_iter():
+            for node in [node1, node2]:
+                yield core_pb2.MoveNodesRequest(
+                    session_id=session.id,
+                    node_id=node.id,
+                    position=core_pb2.Position(x=x, y=y),
+                )
+
+        # when
+        with patch.object(node1, "setposition", side_effect=CoreError):
+            with client.context_connect():
+                client.move_nodes(move_iter())
+
+        # then
+        assert node2.position.x == x
+        assert node2.position.y == y
+
+    def test_update_links(self, grpc_server: CoreGrpcServer, ip_prefixes: IpPrefixes):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        switch = session.add_node(SwitchNode)
+        node = session.add_node(CoreNode)
+        iface_data = ip_prefixes.create_iface(node)
+        iface, _ = session.add_link(node.id, switch.id, iface_data)
+        bandwidths = [10000, 20000, 30000]
+
+        def update_iter():
+            for bandwidth in bandwidths:
+                yield core_pb2.UpdateLinksRequest(
+                    session_id=session.id,
+                    node1_id=node.id,
+                    node2_id=switch.id,
+                    iface1_id=iface_data.id,
+                    options=core_pb2.LinkOptions(bandwidth=bandwidth),
+                    interval=60000,
+                )
+
+        # then
+        with client.context_connect():
+            response = client.update_links(update_iter())
+
+        # then
+        assert response.received == 3
+        assert response.applied == 1
+        assert response.dropped == 2
+        assert response.failed == 0
+        assert iface.getparam("bw") == bandwidths[-1]
+
     def test_move_nodes_geo(self, grpc_server: CoreGrpcServer):
         # given
         client = CoreGrpcClient()
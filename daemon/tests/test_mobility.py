@@ -1,10 +1,26 @@
+import threading
+
 import pytest
 
-from core.location.mobility import WayPoint
+from core.emulator.data import IpPrefixes, NodeData, NodeOptions
+from core.emulator.session import Session
+from core.location import rangeengine, trace, waypointengine
+from core.location.mobility import BasicRangeModel, Ns2ScriptedMobility, WayPoint
+from core.location.rangeengine import NumpyRangeEngine
+from core.location.waypointengine import NumpyWaypointEngine
+from core.nodes.base import CoreNode
+from core.nodes.interface import CoreInterface
+from core.nodes.network import EbtablesQueue, WlanNode
 
 POSITION = (0.0, 0.0, 0.0)
 
 
+def is_linked(
+    wlan_node: WlanNode, iface1: CoreInterface, iface2: CoreInterface
+) -> bool:
+    return wlan_node.linked(min(iface1, iface2), max(iface1, iface2))
+
+
 class TestMobility:
     @pytest.mark.parametrize(
         "wp1, wp2, expected",
@@ -17,3 +33,160 @@ class TestMobility:
     )
     def test_waypoint_lessthan(self, wp1, wp2, expected):
         assert (wp1 < wp2) == expected
+
+    def test_basic_range_links(self, session: Session, ip_prefixes: IpPrefixes):
+        # given
+        wlan_node = session.add_node(WlanNode)
+        session.mobility.set_model(wlan_node, BasicRangeModel, {"range": "100"})
+        ifaces = []
+        for x in [0, 50, 1000]:
+            options = NodeOptions()
+            options.set_position(x, 0)
+            node = session.add_node(CoreNode, options=options)
+            iface_data = ip_prefixes.create_iface(node)
+            session.add_link(node.id, wlan_node.id, iface1_data=iface_data)
+            ifaces.append(node.get_iface(iface_data.id))
+        iface1, iface2, iface3 = ifaces
+        linked_before = is_linked(wlan_node, iface1, iface2)
+        far_before = is_linked(wlan_node, iface1, iface3)
+
+        # when
+        iface3.node.setposition(25, 0)
+        iface2.node.setposition(1000, 1000)
+
+        # then
+        assert linked_before
+        assert not far_before
+        assert is_linked(wlan_node, iface1, iface3)
+        assert not is_linked(wlan_node, iface1, iface2)
+        assert not is_linked(wlan_node, iface2, iface3)
+
+    def test_basic_range_update_rate(self, session: Session):
+        # given
+        wlan_node = session.add_node(WlanNode)
+        session.mobility.set_model(wlan_node, BasicRangeModel)
+        default_rate = wlan_node.update_rate
+
+        # when
+        session.mobility.set_model(wlan_node, BasicRangeModel, {"update_rate": "0.05"})
+
+        # then
+        assert default_rate == EbtablesQueue.rate
+        assert wlan_node.update_rate == 0.05
+        assert wlan_node.filter_queue.wlan_rate(wlan_node) == 0.05
+
+    @pytest.mark.skipif(not rangeengine.is_available(), reason="requires numpy")
+    def test_numpy_range_engine(self):
+        # given
+        engine = NumpyRangeEngine(lambda x, y: False)
+        positions = {1: (0, 0, None), 2: (50, 0, None), 3: (1000, 0, None)}
+        first = engine.calculate(positions, 100)
+
+        # when
+        positions[2] = (500, 0, None)
+        positions[3] = (0, 10, 5)
+        positions[4] = (None, None, None)
+        second = engine.calculate(positions, 100)
+        third = engine.calculate(positions, 100)
+
+        # then
+        assert first == [(1, 2, True)]
+        assert sorted(second) == [(1, 2, False), (1, 3, True)]
+        assert third == []
+
+    @pytest.mark.skipif(not trace.is_available(), reason="requires numpy")
+    def test_compiled_trace(self, tmpdir):
+        # given
+        script_file = tmpdir.join("mobility.scen")
+        script_file.write(
+            "$node_(1) set X_ 10.0\n"
+            "$node_(1) set Y_ 20.0\n"
+            "$node_(1) set Z_ 0.0\n"
+            '$ns_ at 5.00 "$node_(2) setdest 50.0 60.0 5.0"\n'
+            '$ns_ at 1.00 "$node_(1) setdest 30.0 40.0 10.0"\n'
+            '$ns_ at 5.00 "$node_(1) setdest 70.0 80.0 10.0"\n'
+        )
+        trace_file = tmpdir.join("mobility.trace")
+
+        # when
+        counts = trace.compile_ns2_script(str(script_file), str(trace_file))
+        mobility_trace = trace.MobilityTrace(str(trace_file))
+        first, index = mobility_trace.window(0, 1.0)
+        second, index = mobility_trace.window(index, 10.0)
+
+        # then
+        assert counts == (1, 3)
+        assert trace.is_trace_file(str(trace_file))
+        assert not trace.is_trace_file(str(script_file))
+        assert list(mobility_trace.initial_positions()) == [(1, 10.0, 20.0, 0.0)]
+        assert mobility_trace.end_time == 5.0
+        assert first == [(1.0, 1, 30.0, 40.0, None, 10.0)]
+        assert [x[:2] for x in second] == [(5.0, 1), (5.0, 2)]
+        assert index == len(mobility_trace)
+
+    @pytest.mark.skipif(not trace.is_available(), reason="requires numpy")
+    def test_compiled_trace_loop(
+        self, session: Session, ip_prefixes: IpPrefixes, tmpdir
+    ):
+        # given
+        node = session.add_node(CoreNode)
+        wlan_node = session.add_node(WlanNode)
+        iface_data = ip_prefixes.create_iface(node)
+        session.add_link(node.id, wlan_node.id, iface1_data=iface_data)
+        script_file = tmpdir.join("mobility.scen")
+        script_file.write(
+            f"$node_({node.id}) set X_ 10.0\n"
+            f"$node_({node.id}) set Y_ 20.0\n"
+            f"$node_({node.id}) set Z_ 0.0\n"
+            f'$ns_ at 0.05 "$node_({node.id}) setdest 30.0 40.0 0.0"\n'
+        )
+        trace_file = tmpdir.join("mobility.trace")
+        trace.compile_ns2_script(str(script_file), str(trace_file))
+        config = {
+            "file": str(trace_file),
+            "refresh_ms": "10",
+            "loop": "on",
+            "autostart": "0.0",
+            "map": "",
+            "script_start": "",
+            "script_pause": "",
+            "script_stop": "",
+        }
+        session.mobility.set_model(wlan_node, Ns2ScriptedMobility, config)
+        arrivals = []
+        looped = threading.Event()
+
+        def node_handler(node_data: NodeData) -> None:
+            position = node_data.node.position
+            if node_data.node.id == node.id and (position.x, position.y) == (30, 40):
+                arrivals.append(position.x)
+                if len(arrivals) > 1:
+                    looped.set()
+
+        session.node_handlers.append(node_handler)
+
+        # when
+        session.instantiate()
+
+        # then
+        assert looped.wait(5)
+
+    @pytest.mark.skipif(not waypointengine.is_available(), reason="requires numpy")
+    def test_numpy_waypoint_engine(self):
+        # given
+        engine = NumpyWaypointEngine()
+        positions = [(0.0, 0.0), (0.0, 0.0), (10.0, 10.0), (5.0, 5.0), (1.0, 0.0)]
+        targets = [(30.0, 40.0), (3.0, 4.0), (20.0, 20.0), (5.0, 5.0), (-10.0, 0.0)]
+        speeds = [5.0, 10.0, 0.0, 5.0, 5.0]
+
+        # when
+        results, moved, arrived = engine.move(positions, targets, speeds, 1.0)
+
+        # then
+        assert results[0] == pytest.approx([3.0, 4.0])
+        assert results[1] == pytest.approx([3.0, 4.0])
+        assert results[2] == [20.0, 20.0]
+        assert results[3] == [5.0, 5.0]
+        assert results[4] == [0.0, 0.0]
+        assert moved == [True, True, True, False, True]
+        assert arrived == [False, False, True, True, False]
@@ -1,10 +1,34 @@
+import os
+import sys
+import threading
+
 import pytest
+from mock import patch
 
 from core.emulator.data import InterfaceData, NodeOptions
 from core.emulator.session import Session
-from core.errors import CoreError
+from core.errors import CoreCommandError, CoreError
 from core.nodes.base import CoreNode
-from core.nodes.network import HubNode, SwitchNode, WlanNode
+from core.nodes.cgroup import NodeCgroup
+from core.nodes.client import VnodeClient
+from core.nodes.docker import DockerNode
+from core.nodes.executor import NodeExecutor, create_request
+from core.nodes.netbatch import HOST_KEY, NetBatch
+from core.nodes.netclient import (
+    LinuxNetClient,
+    NetlinkNetClient,
+    OvsNetClient,
+    get_net_client,
+)
+from core.nodes.netlink import TC_H_ROOT, attr_str, attr_u32, parse_attrs, tc_handle
+from core.nodes.network import (
+    EbtablesQueue,
+    HubNode,
+    NftablesQueue,
+    SwitchNode,
+    WlanNode,
+    build_ebtables_table,
+)
 
 MODELS = ["router", "host", "PC", "mdr"]
 NET_TYPES = [SwitchNode, HubNode, WlanNode]
@@ -24,6 +48,71 @@ class TestNodes:
         assert node.alive()
         assert node.up
 
+    def test_node_limits(self, session: Session):
+        # given
+        options = NodeOptions(cpu_limit=0.5, memory_limit=64)
+
+        # when
+        node = session.add_node(CoreNode, options=options)
+
+        # then
+        assert node.cpu_limit == 0.5
+        assert node.memory_limit == 64
+        if node.cgroup:
+            stats = node.cgroup.stats()
+            assert stats.pids > 0
+            with open(os.path.join(node.cgroup.path, "cpu.max")) as f:
+                assert f.read().split() == ["50000", "100000"]
+
+    def test_cgroup_wait_empty(self, tmpdir):
+        # given
+        cgroup = NodeCgroup(1, 1)
+        cgroup.path = str(tmpdir)
+        procs = tmpdir.join("cgroup.procs")
+        procs.write("1000\n")
+
+        # when
+        busy = cgroup.wait_empty(timeout=0.05)
+        procs.write("")
+        empty = cgroup.wait_empty(timeout=0.05)
+
+        # then
+        assert not busy
+        assert empty
+
+    def test_node_addfile_tracked(self, session: Session):
+        # given
+        session.options.set_config("command_stats", "1")
+        node = session.add_node(CoreNode)
+        commands = session.profiler.profile().commands
+
+        # when
+        with patch.object(VnodeClient, "check_cmds", return_value=["", "", ""]):
+            node.addfile("/tmp/source", "/tmp/dir/file")
+
+        # then
+        stats, _ = session.command_stats.get_stats()
+        counts = {x.name: x.count for x in stats}
+        assert counts["node:batch"] == 1
+        assert session.profiler.profile().commands == commands + 3
+
+    def test_docker_node_commands_tracked(self, session: Session):
+        # given
+        session.options.set_config("command_stats", "1")
+
+        # when
+        with patch("core.utils.cmd", return_value="1"):
+            with patch.object(DockerNode, "makenodedir"):
+                node = session.add_node(DockerNode)
+                node.node_net_client.device_up("lo")
+                session.delete_node(node.id)
+
+        # then
+        stats, _ = session.command_stats.get_stats()
+        counts = {x.name: x.count for x in stats}
+        assert counts["docker"] > 0
+        assert counts["docker:ip"] == 1
+
     def test_node_update(self, session: Session):
         # given
         node = session.add_node(CoreNode)
@@ -130,3 +219,296 @@ class TestNodes:
         # then
         assert node
         assert node.up
+
+
+class TestNodeExecutor:
+    def test_executor_run(self):
+        # given
+        executor = NodeExecutor([sys.executable, "-m", "core.nodes.executor"])
+        executor.start()
+
+        # when
+        output = executor.run("echo hello")
+        shell_output = executor.run("echo $((1 + 1))", shell=True)
+        executor.close()
+
+        # then
+        assert output == "hello"
+        assert shell_output == "2"
+        assert not executor.running()
+
+    def test_executor_batch(self):
+        # given
+        executor = NodeExecutor([sys.executable, "-m", "core.nodes.executor"])
+        executor.start()
+        requests = [
+            create_request("echo one"),
+            create_request("false"),
+            create_request("echo three"),
+        ]
+
+        # when
+        results = executor.run_batch(requests)
+        with pytest.raises(CoreCommandError):
+            executor.run("false")
+        executor.close()
+
+        # then
+        assert len(results) == 2
+        assert results[0] == (0, "one", "")
+        assert results[1][0] != 0
+
+    def test_executor_concurrent(self):
+        # given
+        executor = NodeExecutor([sys.executable, "-m", "core.nodes.executor"])
+        executor.start()
+        slow = threading.Thread(target=executor.run, args=("sleep 1",))
+
+        # when
+        slow.start()
+        output = executor.run("echo fast")
+        slow_running = slow.is_alive()
+        slow.join()
+        executor.close()
+
+        # then
+        assert output == "fast"
+        assert slow_running
+
+    def test_client_resumes_failed_batch(self):
+        # given
+        client = VnodeClient("node", "/tmp/ctrl")
+        client.executor = NodeExecutor([sys.executable, "-m", "core.nodes.executor"])
+        client.executor.start()
+        client.check_cmd = lambda args, wait=True, shell=False: f"vcmd {args}"
+        cmds = ["echo one", "kill -9 $PPID", "echo three"]
+
+        # when
+        outputs = client.check_cmds(cmds, shell=True)
+
+        # then
+        assert outputs == ["one", "vcmd kill -9 $PPID", "vcmd echo three"]
+        assert client.executor is None
+
+
+class TestNetClient:
+    @pytest.mark.parametrize(
+        "use_ovs,use_netlink,expected",
+        [
+            (False, False, LinuxNetClient),
+            (False, True, NetlinkNetClient),
+            (True, True, OvsNetClient),
+        ],
+    )
+    def test_get_net_client(self, use_ovs: bool, use_netlink: bool, expected: type):
+        # when
+        net_client = get_net_client(use_ovs, lambda x: x, use_netlink)
+
+        # then
+        assert type(net_client) is expected
+
+    def test_netlink_attrs(self):
+        # given
+        data = attr_str(3, "eth0") + attr_u32(10, 5)
+
+        # when
+        attrs = parse_attrs(data)
+
+        # then
+        assert attrs[3] == b"eth0\0"
+        assert attrs[10] == (5).to_bytes(4, sys.byteorder)
+        assert tc_handle(None) == TC_H_ROOT
+        assert tc_handle("1:") == 0x10000
+        assert tc_handle("1:1") == 0x10001
+        assert tc_handle("10:") == 0x100000
+
+
+class TestNetBatch:
+    def test_batch_apply(self):
+        # given
+        host_cmds = []
+        node_cmds = []
+        net_batch = NetBatch()
+        host_client = LinuxNetClient(
+            net_batch.runner(HOST_KEY, lambda x, **kwargs: host_cmds.append(x))
+        )
+        node_client = LinuxNetClient(
+            net_batch.runner("node1", lambda x, **kwargs: node_cmds.append(x))
+        )
+        net_batch.start()
+
+        # when
+        node_client.device_up("lo")
+        node_client.set_hostname("n1")
+        host_client.create_veth("veth1", "veth1p")
+        host_client.device_ns("veth1p", "100")
+        host_client.set_tbf("veth1", 1000, 2000, 3000)
+        recorded = not host_cmds and not node_cmds
+        net_batch.apply()
+
+        # then
+        assert recorded
+        assert len(host_cmds) == 2
+        assert host_cmds[0].startswith("ip -batch -")
+        assert "link add name veth1 type veth peer name veth1p" in host_cmds[0]
+        assert "link set veth1p netns 100" in host_cmds[0]
+        assert host_cmds[1].startswith("tc -batch -")
+        assert len(node_cmds) == 2
+        assert "link set lo up" in node_cmds[0]
+        assert node_cmds[1] == "hostname n1"
+
+    def test_batch_read_applies(self):
+        # given
+        cmds = []
+        net_batch = NetBatch()
+        net_client = LinuxNetClient(
+            net_batch.runner(HOST_KEY, lambda x, **kwargs: cmds.append(x))
+        )
+        net_batch.start()
+
+        # when
+        net_client.device_up("eth0")
+        net_client.get_ifindex("eth0")
+
+        # then
+        assert net_batch.active
+        assert len(cmds) == 2
+        assert cmds[0].startswith("ip -batch -")
+        assert cmds[1] == "cat /sys/class/net/eth0/ifindex"
+
+    def test_bound_batch(self):
+        # given
+        cmds = []
+        session_batch = NetBatch()
+        net_client = LinuxNetClient(
+            session_batch.runner(HOST_KEY, lambda x, **kwargs: cmds.append(x))
+        )
+        net_batch = NetBatch()
+        net_batch.start()
+        other = threading.Thread(target=net_client.device_up, args=("eth0",))
+
+        # when
+        net_batch.call(net_client.device_up, "eth1")
+        other.start()
+        other.join()
+        direct_cmds = list(cmds)
+        net_batch.apply()
+
+        # then
+        assert direct_cmds == ["ip link set eth0 up"]
+        assert len(cmds) == 2
+        assert cmds[1].startswith("ip -batch -")
+        assert "link set eth1 up" in cmds[1]
+
+
+class TestEbtables:
+    def test_buildcmds_delta(self, session: Session):
+        # given
+        wlan = session.add_node(WlanNode)
+        node1 = session.add_node(CoreNode)
+        node2 = session.add_node(CoreNode)
+        iface1 = node1.new_iface(wlan, InterfaceData())
+        iface2 = node2.new_iface(wlan, InterfaceData())
+        iface1, iface2 = min(iface1, iface2), max(iface1, iface2)
+        queue = EbtablesQueue()
+        wlan.link(iface1, iface2)
+        queue.ebchange(wlan, iface1, iface2)
+
+        # when
+        added, deleted = queue.buildcmds(wlan)
+        wlan.unlink(iface1, iface2)
+        queue.ebchange(wlan, iface1, iface2)
+        unlink_added, unlink_deleted = queue.buildcmds(wlan)
+
+        # then
+        assert len(added) == 2
+        assert not deleted
+        assert not unlink_added
+        assert unlink_deleted == added
+        assert not queue.rules[wlan]
+
+    def test_update_loop(self, session: Session):
+        # given
+        wlan = session.add_node(WlanNode)
+        wlan.update_rate = 0.0
+        queue = EbtablesQueue()
+        committed = []
+        done = threading.Event()
+
+        def commit(wlans):
+            committed.append(wlans)
+            done.set()
+
+        queue.commit = commit
+
+        # when
+        queue.startupdateloop(wlan)
+        queue.ebchange(wlan)
+        queue.ebchange(wlan)
+        done.wait(timeout=5)
+        queue.stopupdateloop(wlan)
+
+        # then
+        assert committed[0] == [wlan]
+        assert not queue.updates
+        assert queue.updatethread is None
+        assert session.ebtables_queue is not queue
+
+    def test_nftables_cmds(self, session: Session):
+        # given
+        wlan = session.add_node(WlanNode)
+        node1 = session.add_node(CoreNode)
+        node2 = session.add_node(CoreNode)
+        iface1 = node1.new_iface(wlan, InterfaceData())
+        iface2 = node2.new_iface(wlan, InterfaceData())
+        iface1, iface2 = min(iface1, iface2), max(iface1, iface2)
+        queue = NftablesQueue()
+        wlan.link(iface1, iface2)
+        queue.ebchange(wlan, iface1, iface2)
+        added, deleted = queue.buildcmds(wlan)
+
+        # when
+        setup_cmds = queue.nftcmds(wlan, added, deleted)
+        wlan.has_ebtables_chain = True
+        wlan.unlink(iface1, iface2)
+        queue.ebchange(wlan, iface1, iface2)
+        added, deleted = queue.buildcmds(wlan)
+        cmds = queue.nftcmds(wlan, added, deleted)
+
+        # then
+        chain = queue.chain(wlan)
+        element = f'"{iface1.localname}" . "{iface2.localname}"'
+        assert f"add chain bridge {queue.table(wlan)} {chain}" in setup_cmds
+        assert element in setup_cmds[-1]
+        assert len(cmds) == 1
+        assert cmds[0].startswith(f"delete element bridge {queue.table(wlan)}")
+        assert element in cmds[0]
+
+    def test_build_table(self):
+        # given
+        output = "\n".join(
+            [
+                "*nat",
+                ":PREROUTING ACCEPT",
+                "*filter",
+                ":INPUT ACCEPT",
+                ":FORWARD ACCEPT",
+                ":OUTPUT ACCEPT",
+                ":b.1.1 DROP",
+                "-A FORWARD --logical-in b.1.1 -j b.1.1",
+                "-A FORWARD -j ACCEPT",
+                "-A b.1.1 -i veth1 -o veth2 -j ACCEPT",
+            ]
+        )
+        rules = ["-A FORWARD --logical-in b.1.1 -j b.1.1"]
+        chains = {"b.1.1": (":b.1.1 DROP", rules)}
+
+        # when
+        table = build_ebtables_table(output, chains).splitlines()
+
+        # then
+        assert table[:2] == ["*nat", ":PREROUTING ACCEPT"]
+        assert table.count(":b.1.1 DROP") == 1
+        assert table.count(rules[0]) == 1
+        assert "-A FORWARD -j ACCEPT" in table
+        assert "-A b.1.1 -i veth1 -o veth2 -j ACCEPT" not in table
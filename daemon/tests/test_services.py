@@ -3,7 +3,9 @@ import os
 import pytest
 from mock import MagicMock
 
+from core.emulator.bootscheduler import BootScheduler
 from core.emulator.session import Session
+from core.emulator.validation import Validation, ValidationScheduler
 from core.errors import CoreCommandError
 from core.nodes.base import CoreNode
 from core.services.coreservices import CoreService, ServiceDependencies, ServiceManager
@@ -287,3 +289,97 @@ class TestServices:
         # when, then
         with pytest.raises(ValueError):
             ServiceDependencies(services).boot_paths()
+
+    def test_services_boot_steps(self, session: Session):
+        # given
+        node = session.add_node(CoreNode)
+        node.services = [ServiceA, ServiceB, ServiceC, ServiceD, ServiceF]
+        services = {x.name: x for x in node.services}
+        scheduler = BootScheduler()
+
+        # when
+        steps = session.services.add_boot_steps(scheduler, node, [])
+
+        # then
+        assert len(steps) == 5
+        names = {step: step.args[1] for step in steps}
+        for step in steps:
+            dependencies = {names[x] for x in step.dependencies}
+            assert dependencies == set(services[names[step]].dependencies)
+
+    def test_boot_scheduler_failure(self):
+        # given
+        scheduler = BootScheduler(2)
+        ran = []
+
+        def fail():
+            raise ValueError("failed")
+
+        step1 = scheduler.add_step("one", fail, key=1)
+        scheduler.add_step("two", ran.append, (2,), [step1], key=1)
+        step3 = scheduler.add_step("three", ran.append, (3,), key=2)
+        scheduler.add_step("four", ran.append, (4,), [step3], key=2)
+
+        # when
+        failed = scheduler.run()
+
+        # then
+        assert failed == [step1]
+        assert ran == [3, 4]
+        assert list(scheduler.errors()) == [1]
+        assert scheduler.steps[1].skipped
+        assert scheduler.steps[3].duration is not None
+
+    def test_boot_scheduler_future(self):
+        # given
+        scheduler = BootScheduler(1)
+        validation = ValidationScheduler()
+        ran = []
+        step1 = scheduler.add_step("one", validation.delay, (0.1,))
+        scheduler.add_step("two", ran.append, (2,), [step1])
+
+        # when
+        failed = scheduler.run()
+        validation.shutdown()
+
+        # then
+        assert not failed
+        assert ran == [2]
+        assert step1.duration >= 0.1
+
+    def test_validation_scheduler(self):
+        # given
+        scheduler = ValidationScheduler()
+        attempts = []
+
+        def check():
+            attempts.append(True)
+            return len(attempts) == 3
+
+        # when
+        passed = scheduler.schedule(check, 0.01, 5)
+        timeout = scheduler.schedule(lambda: False, 0.01, 0, ValueError("failed"))
+        result = passed.result(timeout=5)
+        with pytest.raises(ValueError):
+            timeout.result(timeout=5)
+        scheduler.shutdown()
+
+        # then
+        assert result is True
+        assert len(attempts) == 3
+
+    def test_validation_scheduler_cancelled(self):
+        # given
+        scheduler = ValidationScheduler()
+
+        def check():
+            validation.future.cancel()
+            return True
+
+        validation = Validation(check, 0.01, 0, None)
+
+        # when
+        scheduler._attempt(validation)
+
+        # then
+        assert validation.future.cancelled()